@@ -2,16 +2,34 @@
 An AI player for Othello. 
 """
 
+import ast
+import json
+import math
+import multiprocessing
 import random
 import sys
+import threading
 import time
 
-# You can use the functions in othello_shared to write your AI
-from othello_shared import find_lines, get_possible_moves, get_score, play_move
+# You can use the functions in othello_shared to write your AI. othello_bitboard
+# provides faster bitboard versions with the same signatures.
+from othello_bitboard import Board, find_lines, get_possible_moves, get_score, play_move, popcount
 
-# Keys: board state tuples (board, color)
-# Values: the best move and minimax value of the board state tuples (best_move, minmax)
-cache = dict()
+from othello_book import OpeningBook
+from othello_endgame import EndgameSolver, SolverTimeout
+from othello_features import stable_disks
+from othello_stats import SearchStats
+from othello_protocol import BOARD, FINAL, UPDATE, decode_board, decode_update, encode_move, introduction, read_frame
+from othello_transposition import (EXACT, LOWER, UPPER, UNLIMITED, TranspositionTable, canonical_hash, inverse_move,
+                                   symmetric_hash, transform_move, update_hash, update_symmetric_hash, zobrist_hash)
+
+# Transposition table shared by all searches, keyed by the Zobrist hash of the
+# board and the player to move. TT_SIZE bounds the number of entries.
+TT_SIZE = 1 << 18
+tt = TranspositionTable(TT_SIZE)
+
+# Statistics of the search for the current move (see othello_stats)
+stats = SearchStats()
 
 
 def eprint(*args, **kwargs): #you can use this for debugging, as it will print to sterr and not stdout
@@ -31,136 +49,402 @@ def compute_utility(board, color):
         return result[1] - result[0]
 
 
+# Keys: board dimension
+# Values: bitboards of the (corner, near-corner, edge) squares used by compute_heuristic
+heuristic_masks = dict()
+
+
+def get_heuristic_masks(d):
+    if d not in heuristic_masks:
+        corners = [(0, 0), (d - 1, 0), (0, d - 1), (d - 1, d - 1)]
+        near_corners = [(1, 0), (0, 1), (1, d - 1), (d - 1, 1), (0, d - 2), (d - 2, 0), (d - 1, d - 2), (d - 2, d - 1)]
+        edges = []
+        for i in range(2, d - 2):
+            edges += [(0, i), (i, 0), (i, d - 1), (d - 1, i)]
+        masks = []
+        for squares in (corners, near_corners, edges):
+            mask = 0
+            for (column, row) in squares:
+                mask |= 1 << (row * d + column)
+            masks.append(mask)
+        heuristic_masks[d] = tuple(masks)
+    return heuristic_masks[d]
+
+
+# Weights of the terms of compute_heuristic, in the order of
+# HEURISTIC_FEATURES. othello_tuning.py fits them to self-play games; run_ai
+# loads fitted weights from a weights=<file> field.
+HEURISTIC_FEATURES = ("disks", "mobility", "corners", "near_corners", "edges")
+HEURISTIC_WEIGHTS = (1, 1, 500, -50, 50)
+heuristic_weights = HEURISTIC_WEIGHTS
+
+# Weights of the stable disk and frontier disk differences that
+# compute_stability_heuristic adds to compute_heuristic
+STABILITY_FEATURES = ("stable", "frontier")
+STABILITY_WEIGHTS = (100, -10)
+stability_weights = STABILITY_WEIGHTS
+
+
+def load_heuristic_weights(path, dimension = None):
+    """
+    Return the weights in a file written by othello_tuning.py: the
+    compute_heuristic weights, followed by the stability weights if they
+    were fitted too. If dimension is given, the weights must have been
+    fitted on boards of that dimension.
+    """
+    with open(path) as f:
+        saved = json.load(f)
+    features = tuple(saved["features"])
+    if features not in (HEURISTIC_FEATURES, HEURISTIC_FEATURES + STABILITY_FEATURES):
+        raise ValueError("{} has weights for {}, expected {}".format(path, saved["features"], HEURISTIC_FEATURES))
+    if dimension is not None and saved.get("dimension", dimension) != dimension:
+        raise ValueError("{} has weights for {}x{} boards, not {}x{}".format(path, saved["dimension"], saved["dimension"], dimension, dimension))
+    return tuple(saved["weights"])
+
+
+def use_heuristic_weights(weights):
+    """
+    Set the compute_heuristic weights, and the stability weights if weights
+    has them, and return the evaluation function that uses all of them.
+    """
+    global heuristic_weights, stability_weights
+    heuristic_weights = tuple(weights[:len(HEURISTIC_FEATURES)])
+    if len(weights) > len(HEURISTIC_FEATURES):
+        stability_weights = tuple(weights[len(HEURISTIC_FEATURES):])
+        return compute_stability_heuristic
+    return compute_heuristic
+
+
 # Better heuristic value of board
 def compute_heuristic(board, color): #not implemented, optional
     # IMPLEMENT
+    # Disk counts and legal moves are kept up to date by the Board, so this
+    # only needs a few bit operations
+    if not isinstance(board, Board):
+        board = Board.from_tuple(board)
+    opponent = 3 - color
+
     # Board size
-    d = len(board)
+    d = board.dimension
+    disk_weight, mobility_weight, corner_weight, near_corner_weight, edge_weight = heuristic_weights
 
     # Minimize the number of disks the opponent
-    result = get_score(board)
-    if color == 1:
-        utility = result[0] - result[1]
-    else:
-        utility = result[1] - result[0]
+    utility = disk_weight * (board.counts[color] - board.counts[opponent])
 
     # Minimize the number of moves the opponent can make
-    dark_moves = len(get_possible_moves(board, 1))
-    light_moves = len(get_possible_moves(board, 2))
-    if color == 1:
-        mobility = dark_moves - light_moves
-    else:
-        mobility = light_moves - dark_moves
+    mobility = mobility_weight * (board.mobility_count(color) - board.mobility_count(opponent))
 
     # Check board size to prevent index out of range
     if d < 4:
         return utility + mobility
 
     # Now the rest satisfies board size >= 4
-    dark = 0
-    light = 0
+    own = board.disks[color]
+    opp = board.disks[opponent]
+    corners, near_corners, edges = get_heuristic_masks(d)
 
     # Highly value taking corner fields
-    corners = [(0, 0), (d - 1, 0), (0, d - 1), (d - 1, d - 1)]
-    for (column, row) in corners:
-        if board[column][row] == 1:
-            dark += 500
-        elif board[column][row] == 2:
-            light += 500
+    weight = corner_weight * (popcount(own & corners) - popcount(opp & corners))
 
     # Highly penalize taking the fields next to the corners
-    near_corners = [(1, 0), (0, 1), (1, d - 1), (d - 1, 1), (0, d - 2), (d - 2, 0), (d - 1, d - 2), (d - 2, d - 1)]
-    for (column, row) in near_corners:
-        if board[column][row] == 1:
-            dark -= 50
-        elif board[column][row] == 2:
-            light -= 50
+    weight += near_corner_weight * (popcount(own & near_corners) - popcount(opp & near_corners))
 
     # Value other border tiles than remaining tiles
-    for i in range(2, d - 2):
-        edges = [(0, i), (i, 0), (i, d - 1), (d - 1, i)]
-        for (column, row) in edges:
-            if board[column][row] == 1:
-                dark += 50
-            elif board[column][row] == 2:
-                light += 50
-
-    if color == 1:
-        weight = dark - light
-    else:
-        weight = light - dark
+    weight += edge_weight * (popcount(own & edges) - popcount(opp & edges))
 
     return utility + mobility + weight
 
 
-############ MINIMAX ###############################
-def minimax_min_node(board, color, limit, caching = 0):
-    # IMPLEMENT (and replace the line below)
-    # Get the opponent
+# compute_heuristic plus disk stability and frontier size (see othello_features)
+def compute_stability_heuristic(board, color):
+    if not isinstance(board, Board):
+        board = Board.from_tuple(board)
     opponent = 3 - color
+    own = board.disks[color]
+    opp = board.disks[opponent]
+    d = board.dimension
+    stable_weight, frontier_weight = stability_weights
 
-    # Check cache
-    if caching and (board, color) in cache:
-        return cache[(board, color)]
+    # Value disks that can never be flipped again
+    own_stable, opp_stable = stable_disks(own, opp, d)
+    weight = stable_weight * (popcount(own_stable) - popcount(opp_stable))
 
-    best_move = None
-    min_utility = float('inf')
-    possible_moves = get_possible_moves(board, opponent)
+    # Penalize disks next to empty squares, they give the opponent moves
+    weight += frontier_weight * (board.frontier(color) - board.frontier(opponent))
 
-    # Check if limit reached or end of game
-    if limit == 0 or len(possible_moves) == 0:
-        return None, compute_utility(board, color)
+    return compute_heuristic(board, color) + weight
 
-    for move in possible_moves:
-        # Get the next board
-        nxt_board = play_move(board, opponent, move[0], move[1])
 
-        # Compute next utility
-        _, nxt_utility = minimax_max_node(nxt_board, color, limit - 1, caching)
+# Pattern weight file for evaluate_patterns ("default" for the built-in
+# tables), and the evaluator loaded from it
+pattern_file = "default"
+pattern_evaluator = None
 
-        if min_utility > nxt_utility:
-            best_move = move
-            min_utility = nxt_utility
 
-    # Cache the board
-    if caching:
-        cache[(board, color)] = (best_move, min_utility)
+def get_pattern_evaluator(dimension):
+    # othello_patterns needs NumPy, so it is only imported when it is used
+    global pattern_evaluator
+    if pattern_evaluator is None or pattern_evaluator.layout.dimension != dimension:
+        from othello_patterns import PatternEvaluator
+        if pattern_file == "default":
+            pattern_evaluator = PatternEvaluator(dimension)
+        else:
+            pattern_evaluator = PatternEvaluator.load(pattern_file)
+    return pattern_evaluator
 
-    return best_move, min_utility
 
+# Pattern-table value of board (see othello_patterns)
+def evaluate_patterns(board, color):
+    return get_pattern_evaluator(len(board)).evaluate(board, color)
 
-def minimax_max_node(board, color, limit, caching = 0): #returns highest possible utility
-    #IMPLEMENT (and replace the line below)
-    # Check cache
-    if caching and (board, color) in cache:
-        return cache[(board, color)]
 
-    best_move = None
-    max_utility = float('-inf')
-    possible_moves = get_possible_moves(board, color)
+def evaluate_patterns_batch(board, owns, opps):
+    return get_pattern_evaluator(len(board)).evaluate_bitboards(owns, opps)
+
+
+# Function used to evaluate positions at the depth limit. run_ai replaces it
+# with compute_heuristic (heuristic=1) or evaluate_patterns (patterns=<file>)
+# if the game manager asks for it.
+evaluate = compute_utility
 
-    # Check if limit reached or end of game
-    if limit == 0 or len(possible_moves) == 0:
-        return None, compute_utility(board, color)
+# Function that evaluates many positions in one call, or None. It takes a
+# Board of the right dimension and lists of own and opponent bitboards.
+evaluate_batch = None
 
+
+def evaluate_children(board, player, possible_moves, color):
+    """
+    Return the values for color of the positions after each of player's
+    possible_moves, all of them at the depth limit. Positions where the game
+    is over get their utility, the others are scored with one evaluate_batch
+    call.
+    """
+    values = []
+    pending = []
+    owns = []
+    opps = []
     for move in possible_moves:
-        # Get the next board
-        nxt_board = play_move(board, color, move[0], move[1])
+        board.make_move(player, move[0], move[1])
+        if board.legal_moves(3 - player) == 0:
+            values.append(compute_utility(board, color))
+        else:
+            pending.append(len(values))
+            values.append(None)
+            owns.append(board.disks[color])
+            opps.append(board.disks[3 - color])
+        board.undo_move()
+    if pending:
+        for index, value in zip(pending, evaluate_batch(board, owns, opps)):
+            values[index] = float(value)
+    return values
 
-        # Compute next utility
-        _, nxt_utility = minimax_min_node(nxt_board, color, limit - 1, caching)
 
-        if max_utility < nxt_utility:
-            best_move = move
-            max_utility = nxt_utility
+############ TRANSPOSITION TABLE ###################
+# With symmetry on (symmetry=1), rotations and reflections of a position
+# share one table entry: keys are symmetric hashes, which are looked up by
+# their canonical hash, and best moves are stored in the canonical orientation
+symmetry = 0
+
+
+def position_key(board, player):
+    # Hash of a position for the transposition table
+    return symmetric_hash(board, player) if symmetry else zobrist_hash(board, player)
+
+
+def next_key(key, dimension, player, i, j, flips):
+    # Hash of the position after a move
+    if symmetry:
+        return update_symmetric_hash(key, dimension, player, i, j, flips)
+    return update_hash(key, dimension, player, i, j, flips)
+
+
+def search_depth(limit):
+    # Depth to store in the transposition table for a search with this limit
+    return limit if limit >= 0 else UNLIMITED
+
+
+def probe_cache(key, limit, alpha, beta, sign, dimension = 0):
+    """
+    Look up a position in the transposition table.
+    sign is 1 at max nodes and -1 at min nodes: the table stores values for
+    the player to move, the search functions use values for color.
+    Returns (best_move, value). value is None unless the stored result was
+    searched at least as deep as limit and settles the node for the window
+    (alpha, beta). best_move is the stored best move, if any, and can be used
+    for move ordering either way.
+    dimension is only needed with symmetry on, to turn the stored move back.
+    """
+    stats.tt_probes += 1
+    if symmetry:
+        key, transform = canonical_hash(key)
+    entry = tt.probe(key)
+    if entry is None:
+        return None, None
+    stats.tt_hits += 1
+    _, depth, flag, value, best_move, _ = entry
+    if symmetry:
+        best_move = inverse_move(best_move, transform, dimension)
+    if depth < search_depth(limit):
+        return best_move, None
+    if sign < 0:
+        value = -value
+        if flag != EXACT:
+            flag = LOWER if flag == UPPER else UPPER
+    if flag == EXACT or (flag == LOWER and value >= beta) or (flag == UPPER and value <= alpha):
+        stats.tt_cutoffs += 1
+        return best_move, value
+    return best_move, None
+
+
+def store_cache(key, limit, best_move, value, alpha, beta, sign, dimension = 0):
+    """
+    Store the result of a node searched with the window (alpha, beta).
+    """
+    if symmetry:
+        key, transform = canonical_hash(key)
+        best_move = transform_move(best_move, transform, dimension)
+    if value <= alpha:
+        flag = UPPER
+    elif value >= beta:
+        flag = LOWER
+    else:
+        flag = EXACT
+    if sign < 0:
+        value = -value
+        if flag != EXACT:
+            flag = LOWER if flag == UPPER else UPPER
+    tt.store(key, search_depth(limit), flag, value, best_move)
+
+
+############ MULTI-PROBCUT #########################
+# Cut table of the selective search (an othello_probcut.ProbCut, probcut=<file>),
+# None for a full-width search
+probcut = None
+
+
+def probcut_bound(board, alpha, beta, limit, search):
+    """
+    Multi-ProbCut: predict from shallow searches whether searching board to
+    limit would fail high or low, and return beta or alpha if a prediction is
+    confident enough, else None. search(alpha, beta, depth) searches board
+    with the player to move's window and returns its value.
+    """
+    if probcut.dimension != board.dimension:
+        return None
+    for shallow, a, b, margin in probcut.get_checks(board.empty_count(), limit):
+        # Fail high if a * value + b >= beta + margin, so test the shallow
+        # value against the bound with a null window
+        if beta < float('inf'):
+            bound = (beta + margin - b) / a
+            if search(math.nextafter(bound, -math.inf), bound, shallow) >= bound:
+                stats.probcut_cuts += 1
+                return beta
+        if alpha > float('-inf'):
+            bound = (alpha - margin - b) / a
+            if search(bound, math.nextafter(bound, math.inf), shallow) <= bound:
+                stats.probcut_cuts += 1
+                return alpha
+    return None
+
+
+############ NEGAMAX ###############################
+def negamax_node(board, player, color, alpha, beta, limit, caching = 0, ordering = 0, key = None, prune = True):
+    """
+    The search behind the minimax and alpha-beta functions. Returns
+    (best_move, value) for player to move on board, where value is the value
+    for color if player is color and its negation otherwise, so that every
+    node maximizes. With prune off the window is never narrowed, which is
+    minimax; with prune on it is alpha-beta.
+    """
+    stats.nodes += 1
+    check_deadline()
+
+    # Moves are made and undone on a Board in place
+    if not isinstance(board, Board):
+        board = Board.from_tuple(board)
+
+    sign = 1 if player == color else -1
+
+    # Check cache, values in the table are for the player to move like here
+    cached_move = None
+    if caching:
+        if key is None:
+            key = position_key(board, player)
+        cached_move, cached_utility = probe_cache(key, limit, alpha, beta, 1, board.dimension)
+        if cached_utility is not None:
+            return cached_move, cached_utility
+
+    best_move = None
+    max_utility = float('-inf')
+    possible_moves = board.get_possible_moves(player)
+
+    # Check if end of game or limit reached
+    if len(possible_moves) == 0:
+        stats.leaves += 1
+        return None, sign * compute_utility(board, color)
+    if limit == 0:
+        stats.leaves += 1
+        return None, sign * evaluate(board, color)
+
+    # Skip the search if shallow searches say how it would end
+    if prune and probcut is not None and limit >= probcut.min_depth:
+        bound = probcut_bound(board, alpha, beta, limit, lambda low, high, depth:
+                              negamax_node(board, player, color, low, high, depth, caching, ordering, key)[1])
+        if bound is not None:
+            return None, bound
+
+    # Order moves according to the utility successor states
+    if prune:
+        order_moves(board, player, possible_moves, color, ordering, cached_move, player == color)
+
+    window = (alpha, beta)
+    if limit == 1 and prune and evaluate_batch is not None:
+        # The children are all at the depth limit, so score them in one call
+        values = [sign * value for value in evaluate_children(board, player, possible_moves, color)]
+        stats.leaves += len(values)
+        max_utility = max(values)
+        best_move = possible_moves[values.index(max_utility)]
+    else:
+        # Children are only made when they are searched, so pruned siblings
+        # are never built
+        for index, move in enumerate(possible_moves):
+            flips = board.make_move(player, move[0], move[1])
+            nxt_key = None
+            if caching:
+                nxt_key = next_key(key, board.dimension, player, move[0], move[1], flips)
+            # Compute next utility
+            _, nxt_utility = negamax_node(board, 3 - player, color, -beta, -alpha, limit - 1, caching, ordering, nxt_key, prune)
+            nxt_utility = -nxt_utility
+            board.undo_move()
+            if max_utility < nxt_utility:
+                best_move = move
+                max_utility = nxt_utility
+            # Prune
+            if prune:
+                alpha = max(alpha, max_utility)
+                if alpha >= beta:
+                    stats.cutoff(index)
+                    break
 
     # Cache the board
     if caching:
-        cache[(board, color)] = (best_move, max_utility)
+        store_cache(key, limit, best_move, max_utility, window[0], window[1], 1, board.dimension)
 
     return best_move, max_utility
 
 
+############ MINIMAX ###############################
+def minimax_min_node(board, color, limit, caching = 0, key = None):
+    # IMPLEMENT (and replace the line below)
+    best_move, utility = negamax_node(board, 3 - color, color, float('-inf'), float('inf'), limit, caching, 0, key, False)
+    return best_move, -utility
+
+
+def minimax_max_node(board, color, limit, caching = 0, key = None): #returns highest possible utility
+    #IMPLEMENT (and replace the line below)
+    return negamax_node(board, color, color, float('-inf'), float('inf'), limit, caching, 0, key, False)
+
+
 def select_move_minimax(board, color, limit, caching = 0):
     """
     Given a board and a player color, decide on a move. 
@@ -175,143 +459,685 @@ def select_move_minimax(board, color, limit, caching = 0):
     If caching is OFF (i.e. 0), do NOT use state caching to reduce the number of state evaluations.    
     """
     #IMPLEMENT (and replace the line below)
-    return minimax_max_node(board, color, limit, caching)[0]
+    tt.new_search()
+    best_move = minimax_max_node(board, color, limit, caching)[0]
+    stats.depth_done(limit)
+    return best_move
 
 
 ############ ALPHA-BETA PRUNING #####################
-def alphabeta_min_node(board, color, alpha, beta, limit, caching = 0, ordering = 0):
+def order_moves(board, player, possible_moves, color, ordering, cached_move, reverse):
+    """
+    Sort possible_moves for player in place: by the utility for color of the
+    successor states if ordering is on, and with cached_move (the best move of
+    an earlier search) first.
+    """
+    if ordering:
+        utilities = dict()
+        for move in possible_moves:
+            board.make_move(player, move[0], move[1])
+            utilities[move] = compute_utility(board, color)
+            board.undo_move()
+        possible_moves.sort(key=utilities.get, reverse=reverse)
+    # Try the best move of an earlier search first
+    if cached_move in possible_moves:
+        possible_moves.remove(cached_move)
+        possible_moves.insert(0, cached_move)
+
+
+def alphabeta_min_node(board, color, alpha, beta, limit, caching = 0, ordering = 0, key = None):
     #IMPLEMENT (and replace the line below)
-    # Get the opponent
-    opponent = 3 - color
+    best_move, utility = negamax_node(board, 3 - color, color, -beta, -alpha, limit, caching, ordering, key)
+    return best_move, -utility
 
-    # Check cache
-    if caching and (board, color) in cache:
-        return cache[(board, color)]
 
-    best_move = None
-    min_utility = float('inf')
-    possible_moves = get_possible_moves(board, opponent)
+def alphabeta_max_node(board, color, alpha, beta, limit, caching = 0, ordering = 0, key = None):
+    #IMPLEMENT (and replace the line below)
+    return negamax_node(board, color, color, alpha, beta, limit, caching, ordering, key)
 
-    # Check if limit reached or end of game
-    if limit == 0 or len(possible_moves) == 0:
-        return None, compute_utility(board, color)
 
-    # Order (move, board) tuples according to the utility successor states
-    move_and_board = []
-    for move in possible_moves:
-        nxt_board = play_move(board, opponent, move[0], move[1])
-        move_and_board.append((move, nxt_board))
-    if ordering:
-        move_and_board.sort(key=lambda move_and_board: compute_utility(move_and_board[1], color), reverse=False)
+def select_move_alphabeta(board, color, limit, caching = 0, ordering = 0):
+    """
+    Given a board and a player color, decide on a move. 
+    The return value is a tuple of integers (i,j), where
+    i is the column and j is the row on the board.  
 
-    for (move, nxt_board) in move_and_board:
-        # Compute next utility
-        _, nxt_utility = alphabeta_max_node(nxt_board, color, alpha, beta, limit - 1, caching, ordering)
-        if min_utility > nxt_utility:
-            best_move = move
-            min_utility = nxt_utility
-        # Prune
-        beta = min(beta, min_utility)
-        if alpha >= beta:
-            break
+    Note that other parameters are accepted by this function:
+    If limit is a positive integer, your code should enfoce a depth limit that is equal to the value of the parameter.
+    Search only to nodes at a depth-limit equal to the limit.  If nodes at this level are non-terminal return a heuristic 
+    value (see compute_utility)
+    If caching is ON (i.e. 1), use state caching to reduce the number of state evaluations.
+    If caching is OFF (i.e. 0), do NOT use state caching to reduce the number of state evaluations.    
+    If ordering is ON (i.e. 1), use node ordering to expedite pruning and reduce the number of state evaluations. 
+    If ordering is OFF (i.e. 0), do NOT use node ordering to expedite pruning and reduce the number of state evaluations. 
+    """
+    #IMPLEMENT (and replace the line below)
+    tt.new_search()
+    best_move = alphabeta_max_node(board, color, float('-inf'), float('inf'), limit, caching, ordering)[0]
+    stats.depth_done(limit)
+    return best_move
 
-    # Cache the board
-    if caching:
-        cache[(board, color)] = (best_move, min_utility)
 
-    return best_move, min_utility
+############ ITERATIVE DEEPENING ###################
+class SearchTimeout(Exception):
+    pass
 
 
-def alphabeta_max_node(board, color, alpha, beta, limit, caching = 0, ordering = 0):
-    #IMPLEMENT (and replace the line below)
-    # Check cache
-    if caching and (board, color) in cache:
-        return cache[(board, color)]
+# Time (as returned by time.time()) at which the current search has to stop,
+# None if it may run to completion
+deadline = None
+
+
+def check_deadline():
+    if ponder_stop or (deadline is not None and time.time() >= deadline):
+        raise SearchTimeout
+
+
+def select_move_iterative(board, color, time_limit, limit = -1, ordering = 0):
+    """
+    Given a board and a player color, decide on a move within time_limit
+    seconds. 
+    The return value is a tuple of integers (i,j), where
+    i is the column and j is the row on the board.  
+
+    Runs alpha-beta searches of depth 1, 2, 3, ... and returns the best move of
+    the deepest search that finished before the time ran out. If limit is a
+    positive integer, no search goes deeper than limit.
+    Each iteration first tries the principal variation of the previous one,
+    which is read back from the transposition table, so caching is always on.
+    """
+    global deadline
+    deadline = time.time() + time_limit
+    tt.new_search()
 
-    best_move = None
-    max_utility = float('-inf')
     possible_moves = get_possible_moves(board, color)
+    best_move = possible_moves[0] if possible_moves else None
 
-    # Check if limit reached or end of game
-    if limit == 0 or len(possible_moves) == 0:
-        return None, compute_utility(board, color)
+    # No search needs to go deeper than the number of empty squares
+    max_depth = sum(list(row).count(0) for row in board)
+    if limit >= 0:
+        max_depth = min(max_depth, limit)
 
-    # Order (move, board) tuples according to the utility successor states
-    move_and_board = []
-    for move in possible_moves:
-        nxt_board = play_move(board, color, move[0], move[1])
-        move_and_board.append((move, nxt_board))
-    if ordering:
-        move_and_board.sort(key=lambda move_and_board: compute_utility(move_and_board[1], color), reverse=True)
+    try:
+        for depth in range(1, max_depth + 1):
+            move, _ = alphabeta_max_node(board, color, float('-inf'), float('inf'), depth, 1, ordering)
+            if move is not None:
+                best_move = move
+            stats.depth_done(depth)
+    except SearchTimeout:
+        pass
+    finally:
+        deadline = None
 
-    for (move, nxt_board) in move_and_board:
-        # Compute next utility
-        _, nxt_utility = alphabeta_min_node(nxt_board, color, alpha, beta, limit - 1, caching, ordering)
-        if max_utility < nxt_utility:
-            best_move = move
-            max_utility = nxt_utility
-        # Prune
-        alpha = max(alpha, max_utility)
-        if alpha >= beta:
-            break
+    return best_move
 
-    # Cache the board
-    if caching:
-        cache[(board, color)] = (best_move, max_utility)
 
+############ PRINCIPAL VARIATION SEARCH ############
+# Half width of the first aspiration window around the previous iteration's
+# value; it doubles every time the search falls outside the window
+ASPIRATION = 4
+
+# Killer moves: killers[ply] holds the last two moves that caused a cutoff at
+# that distance from the root
+killers = []
+
+# History heuristic: history[player][square] sums depth * depth over the
+# cutoffs caused by player's move on square (j * dimension + i)
+history = [None, [], []]
+
+
+def pvs_order(board, player, possible_moves, ply, cached_move):
+    """
+    Sort possible_moves in place: cached_move first, then the killer moves of
+    this ply, then the others by history score. Nothing is played to do this.
+    """
+    d = board.dimension
+    scores = history[player]
+    possible_moves.sort(key=lambda move: scores[move[1] * d + move[0]], reverse=True)
+    first = [cached_move] + killers[ply] if ply < len(killers) else [cached_move]
+    for move in reversed(first):
+        if move in possible_moves:
+            possible_moves.remove(move)
+            possible_moves.insert(0, move)
+
+
+def pvs_node(board, player, color, alpha, beta, limit, ply, key):
+    """
+    Principal variation search (negamax): returns (best_move, value) for
+    player to move, where value is from player's point of view (evaluations
+    are taken for color and negated for the opponent). The first move is
+    searched with the full window, the others with a null window that only
+    tests whether they are better; a move that is gets searched again.
+    """
+    stats.nodes += 1
+    check_deadline()
+
+    sign = 1 if player == color else -1
+    possible_moves = board.get_possible_moves(player)
+
+    # Check if end of game or limit reached
+    if len(possible_moves) == 0:
+        stats.leaves += 1
+        return None, sign * compute_utility(board, color)
+    if limit == 0:
+        stats.leaves += 1
+        return None, sign * evaluate(board, color)
+
+    # Values in the table are for the player to move, like here
+    cached_move, cached_utility = probe_cache(key, limit, alpha, beta, 1, board.dimension)
+    if cached_utility is not None:
+        return cached_move, cached_utility
+
+    # Skip the search if shallow searches say how it would end (not at the
+    # root, which needs a move)
+    if probcut is not None and limit >= probcut.min_depth and ply > 0:
+        bound = probcut_bound(board, alpha, beta, limit, lambda low, high, depth:
+                              pvs_node(board, player, color, low, high, depth, ply, key)[1])
+        if bound is not None:
+            return None, bound
+
+    window = (alpha, beta)
+    best_move = None
+    max_utility = float('-inf')
+    if limit == 1 and evaluate_batch is not None:
+        # The children are all at the depth limit, so score them in one call
+        values = [sign * value for value in evaluate_children(board, player, possible_moves, color)]
+        stats.leaves += len(values)
+        max_utility = max(values)
+        best_move = possible_moves[values.index(max_utility)]
+    else:
+        pvs_order(board, player, possible_moves, ply, cached_move)
+        for index, move in enumerate(possible_moves):
+            flips = board.make_move(player, move[0], move[1])
+            nxt_key = next_key(key, board.dimension, player, move[0], move[1], flips)
+            if best_move is None:
+                _, nxt_utility = pvs_node(board, 3 - player, color, -beta, -alpha, limit - 1, ply + 1, nxt_key)
+                nxt_utility = -nxt_utility
+            else:
+                # Null window (alpha, next float above alpha): only tells
+                # whether the move is better than alpha
+                _, nxt_utility = pvs_node(board, 3 - player, color, -math.nextafter(alpha, math.inf), -alpha, limit - 1, ply + 1, nxt_key)
+                nxt_utility = -nxt_utility
+                if alpha < nxt_utility < beta:
+                    _, nxt_utility = pvs_node(board, 3 - player, color, -beta, -nxt_utility, limit - 1, ply + 1, nxt_key)
+                    nxt_utility = -nxt_utility
+            board.undo_move()
+            if best_move is None or nxt_utility > max_utility:
+                best_move = move
+                max_utility = nxt_utility
+            alpha = max(alpha, max_utility)
+            if alpha >= beta:
+                stats.cutoff(index)
+                # Remember the move that caused the cutoff
+                while len(killers) <= ply:
+                    killers.append([])
+                if move not in killers[ply]:
+                    killers[ply] = [move] + killers[ply][:1]
+                history[player][move[1] * board.dimension + move[0]] += limit * limit
+                break
+
+    store_cache(key, limit, best_move, max_utility, window[0], window[1], 1, board.dimension)
     return best_move, max_utility
 
 
-def select_move_alphabeta(board, color, limit, caching = 0, ordering = 0):
+def select_move_pvs(board, color, limit = -1, time_limit = 0):
     """
     Given a board and a player color, decide on a move. 
     The return value is a tuple of integers (i,j), where
     i is the column and j is the row on the board.  
 
-    Note that other parameters are accepted by this function:
-    If limit is a positive integer, your code should enfoce a depth limit that is equal to the value of the parameter.
-    Search only to nodes at a depth-limit equal to the limit.  If nodes at this level are non-terminal return a heuristic 
-    value (see compute_utility)
-    If caching is ON (i.e. 1), use state caching to reduce the number of state evaluations.
-    If caching is OFF (i.e. 0), do NOT use state caching to reduce the number of state evaluations.    
-    If ordering is ON (i.e. 1), use node ordering to expedite pruning and reduce the number of state evaluations. 
-    If ordering is OFF (i.e. 0), do NOT use node ordering to expedite pruning and reduce the number of state evaluations. 
+    Iterative deepening with principal variation search up to limit (or the
+    end of the game if limit is -1), within time_limit seconds if it is
+    given. Each iteration searches an aspiration window around the value of
+    the previous one and widens it if the value falls outside. Moves are
+    ordered by the transposition table (so caching is always on), killer
+    moves and the history heuristic.
     """
-    #IMPLEMENT (and replace the line below)
-    return alphabeta_max_node(board, color, float('-inf'), float('inf'), limit, caching, ordering)[0]
+    global deadline, killers, history
+    if time_limit:
+        deadline = time.time() + time_limit
+    tt.new_search()
+    board = Board.from_tuple(board)
+    key = position_key(board, color)
+    killers = []
+    history = [None, [0] * (board.dimension * board.dimension), [0] * (board.dimension * board.dimension)]
+
+    possible_moves = board.get_possible_moves(color)
+    best_move = possible_moves[0] if possible_moves else None
+
+    # No search needs to go deeper than the number of empty squares
+    max_depth = board.empty_count()
+    if limit >= 0:
+        max_depth = min(max_depth, limit)
+
+    value = None
+    try:
+        for depth in range(1, max_depth + 1):
+            if value is None or math.isinf(value):
+                alpha, beta = float('-inf'), float('inf')
+            else:
+                alpha, beta = value - ASPIRATION, value + ASPIRATION
+            delta = ASPIRATION
+            while True:
+                move, value = pvs_node(board, color, color, alpha, beta, depth, 0, key)
+                if value <= alpha and alpha > float('-inf'):
+                    alpha = value - delta # fail low, widen downwards
+                elif value >= beta and beta < float('inf'):
+                    beta = value + delta # fail high, widen upwards
+                else:
+                    break
+                delta *= 2
+            if move is not None:
+                best_move = move
+            stats.depth_done(depth)
+    except SearchTimeout:
+        pass
+    finally:
+        deadline = None
+
+    return best_move
+
+
+############ PONDERING ##############################
+# Background thread searching on the opponent's time, and the flag that makes
+# its search raise SearchTimeout
+ponder_thread = None
+ponder_stop = False
+
+
+def ponder(board, color, limit = -1, ordering = 0):
+    """
+    Search for color the positions after the opponent's replies on board
+    (the opponent is to move), deepening until stop_pondering is called. The
+    results go to the transposition table, where the search for the next
+    move finds them. The reply predicted by the last search comes first.
+    """
+    opponent = 3 - color
+    replies = get_possible_moves(board, opponent)
+    predicted, _ = probe_cache(position_key(board, opponent), 0, float('-inf'), float('inf'), 1, len(board))
+    if predicted in replies:
+        replies.remove(predicted)
+        replies.insert(0, predicted)
+
+    max_depth = sum(list(row).count(0) for row in board) - 1
+    if limit >= 0:
+        max_depth = min(max_depth, limit)
+
+    try:
+        for (i, j) in replies:
+            nxt_board = play_move(board, opponent, i, j)
+            for depth in range(1, max_depth + 1):
+                alphabeta_max_node(nxt_board, color, float('-inf'), float('inf'), depth, 1, ordering)
+    except SearchTimeout:
+        pass
+
+
+def start_pondering(board, color, limit = -1, ordering = 0):
+    """
+    Start pondering on board, the position after color's move.
+    """
+    global ponder_thread
+    stop_pondering()
+    ponder_thread = threading.Thread(target=ponder, args=(board, color, limit, ordering), daemon=True)
+    ponder_thread.start()
+
+
+def stop_pondering():
+    """
+    Stop the pondering thread, if any, and wait for it to finish, so that
+    the search globals belong to the caller again.
+    """
+    global ponder_thread, ponder_stop
+    if ponder_thread is None:
+        return
+    ponder_stop = True
+    ponder_thread.join()
+    ponder_thread = None
+    ponder_stop = False
+
+
+############ PARALLEL ROOT SPLIT ####################
+# Pool of worker processes, created by the first parallel search and reused
+# afterwards so that the workers keep their transposition tables. The workers
+# copy the search settings when they start (see init_worker), so the pool is
+# made again when the number of workers or any of the settings changes.
+worker_pool = None
+worker_count = 0
+worker_settings = None
+
+# Best root value found so far, shared by all workers (a multiprocessing.Value)
+root_alpha = None
+
+# Number of the current game, counted by run_game. Workers clear their
+# transposition tables when a task comes from a new game, like run_game does
+# for the table of this process.
+game_number = 0
+worker_game = 0
+
+
+def search_settings():
+    # Settings of the search that init_worker copies into the workers
+    return (evaluate, evaluate_batch, pattern_file, heuristic_weights, stability_weights, symmetry, probcut)
+
+
+def init_worker(alpha, evaluation, batch_evaluation, patterns, weights, stability, symmetric, cuts):
+    global root_alpha, evaluate, evaluate_batch, pattern_file, heuristic_weights, stability_weights, symmetry, probcut
+    root_alpha = alpha
+    evaluate = evaluation
+    evaluate_batch = batch_evaluation
+    pattern_file = patterns
+    heuristic_weights = weights
+    stability_weights = stability
+    symmetry = symmetric
+    probcut = cuts
+
+
+def search_root_move(args):
+    """
+    Search one root move in a worker process, using the best value the other
+    workers have found so far as alpha.
+    Returns (move, value, alpha, nodes, leaves), where value is exact only if
+    it is greater than alpha and nodes and leaves are counted in the worker.
+    """
+    global worker_game
+    board, color, move, limit, caching, ordering, game = args
+    if game != worker_game:
+        tt.clear()
+        worker_game = game
+    stats.reset()
+    tt.new_search()
+    alpha = root_alpha.value
+    nxt_board = play_move(board, color, move[0], move[1])
+    _, value = alphabeta_min_node(nxt_board, color, alpha, float('inf'), limit - 1, caching, ordering)
+    with root_alpha.get_lock():
+        if value > root_alpha.value:
+            root_alpha.value = value
+    return move, value, alpha, stats.nodes, stats.leaves
+
+
+def select_move_parallel(board, color, limit, caching = 0, ordering = 0, workers = None):
+    """
+    Given a board and a player color, decide on a move. 
+    The return value is a tuple of integers (i,j), where
+    i is the column and j is the row on the board.  
+
+    Like select_move_alphabeta, but the root moves are searched in parallel by
+    workers processes (all cores if None). Each root move starts with the best
+    value found by any worker so far as alpha.
+    """
+    global worker_pool, worker_count, worker_settings, root_alpha
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+
+    possible_moves = get_possible_moves(board, color)
+    if len(possible_moves) == 0 or limit == 0:
+        return None
+    if len(possible_moves) == 1:
+        return possible_moves[0]
+
+    settings = search_settings()
+    if worker_pool is None or worker_count != workers or worker_settings != settings:
+        if worker_pool is not None:
+            worker_pool.terminate()
+        root_alpha = multiprocessing.Value('d', float('-inf'))
+        worker_pool = multiprocessing.Pool(workers, initializer=init_worker, initargs=(root_alpha,) + settings)
+        worker_count = workers
+        worker_settings = settings
+    root_alpha.value = float('-inf')
+
+    tasks = [(board, color, move, limit, caching, ordering, game_number) for move in possible_moves]
+    results = worker_pool.map(search_root_move, tasks, chunksize=1)
+
+    # A value that is not greater than the alpha it was searched with is only
+    # an upper bound. The move that first reached the best value was searched
+    # with a lower alpha, so there is always an exact result to choose.
+    best_move = None
+    max_utility = float('-inf')
+    for move, value, alpha, nodes, leaves in results:
+        stats.nodes += nodes
+        stats.leaves += leaves
+        if value > alpha and value > max_utility:
+            best_move = move
+            max_utility = value
+    stats.depth_done(limit)
+    return best_move
+
+
+############ ENDGAME SOLVER ########################
+# Number of empty squares at which run_ai switches to the exact endgame
+# solver (endgame=<n>, 0 is off)
+endgame_empties = 0
+
+# Seconds per move near the end of the game when no time limit is given;
+# below AiPlayerInterface.TIMEOUT
+ENDGAME_TIME = 8
+
+# Share of the time per move the solver may take. If it does not finish, the
+# search gets the rest, so that the move stays within the time per move.
+ENDGAME_SHARE = 0.5
+
+endgame_solver = EndgameSolver()
+
+
+def select_move_endgame(board, color, time_limit = ENDGAME_TIME):
+    """
+    Given a board and a player color, return the move that gives color the
+    best final disk difference with perfect play, or None if the position
+    could not be solved within time_limit seconds.
+    """
+    board = Board.from_tuple(board)
+    try:
+        best_move, value = endgame_solver.select_move(board, color, time.time() + time_limit)
+    except SolverTimeout:
+        return None
+    finally:
+        stats.nodes += endgame_solver.nodes
+    eprint("Solved endgame: {} ({:+d}) after {} nodes".format(best_move, value, endgame_solver.nodes))
+    return best_move
+
+
+############ OPENING BOOK ##########################
+# Opening book (see othello_book), loaded by run_ai if the game manager
+# passes book=<file>
+book = None
+
+
+def probe_book(board, color):
+    """
+    Return the book move for board and color, or None if there is no book or
+    the position is not in it.
+    """
+    if book is None or book.dimension != len(board):
+        return None
+    if book.canonical:
+        key, transform = canonical_hash(symmetric_hash(board, color))
+        move = inverse_move(book.probe(key), transform, len(board))
+    else:
+        move = book.probe(zobrist_hash(board, color))
+    if move is None or move not in get_possible_moves(board, color):
+        return None
+    return move
 
 
 ####################################################
-def run_ai():
+def select_move(board, color, limit, minimax, caching, ordering, time_limit = 0, workers = 1, pvs = 0):
     """
-    This function establishes communication with the game manager.
-    It first introduces itself and receives its color.
-    Then it repeatedly receives the current score and current board state
-    until the game is over.
+    Select the move to send to the manager: from the opening book, from the
+    endgame solver, or with the search the game manager asked for.
+    """
+    book_move = probe_book(board, color)
+    if (book_move is not None): #play from the opening book if the position is in it
+        return book_move
+
+    if (endgame_empties > 0 and sum(list(row).count(0) for row in board) <= endgame_empties):
+        start = time.time()
+        budget = time_limit or ENDGAME_TIME
+        endgame_move = select_move_endgame(board, color, budget * ENDGAME_SHARE)
+        if (endgame_move is not None): #play the solved move near the end of the game
+            return endgame_move
+        time_limit = max(0.001, budget - (time.time() - start)) #the search only gets the time that is left
+
+    if (minimax == 1): #run this if the minimax flag is given
+        return select_move_minimax(board, color, limit, caching)
+    elif (pvs == 1): #run principal variation search if the pvs flag is given
+        return select_move_pvs(board, color, limit, time_limit)
+    elif (time_limit > 0): #run iterative deepening if a time limit is given
+        return select_move_iterative(board, color, time_limit, limit, ordering)
+    elif (workers != 1): #split the root moves across processes if workers are given
+        return select_move_parallel(board, color, limit, caching, ordering, workers or None)
+    else: #else run alphabeta
+        return select_move_alphabeta(board, color, limit, caching, ordering)
+
+
+def run_binary_protocol(color, choose_move):
+    """
+    Main loop for the binary protocol (see othello_protocol). The board is
+    kept here and brought up to date with the moves in UPDATE frames.
+    choose_move(board) returns the move for a tuple board.
     """
-    print("Othello AI") # First line is the name of this AI
-    arguments = input().split(",")
-    
+    stdin = sys.stdin.buffer
+    stdout = sys.stdout.buffer
+    board = None
+    while True:
+        kind, payload = read_frame(stdin)
+        if kind == FINAL: # Game is over.
+            return
+        if kind == BOARD:
+            _, _, board = decode_board(payload)
+        elif kind == UPDATE:
+            _, _, moves = decode_update(payload)
+            for player, i, j in moves:
+                board.make_move(player, i, j)
+        movei, movej = choose_move(board.to_tuple())
+        stdout.write(encode_move(movei, movej))
+        stdout.flush()
+
+
+####################################################
+def run_game(arguments):
+    """
+    Play one game with the settings in arguments, the fields of the first
+    line sent by the game manager, until the game is over. Returns whether
+    the manager asked to keep this process for another game.
+    """
+    global evaluate, evaluate_batch, pattern_file, pattern_evaluator, heuristic_weights, stability_weights, book, endgame_empties, symmetry, probcut, game_number
+
     color = int(arguments[0]) #Player color: 1 for dark (goes first), 2 for light. 
     limit = int(arguments[1]) #Depth limit
     minimax = int(arguments[2]) #Minimax or alpha beta
     caching = int(arguments[3]) #Caching 
     ordering = int(arguments[4]) #Node-ordering (for alpha-beta only)
 
+    # Optional name=value fields after the first five
+    options = dict(argument.split("=", 1) for argument in arguments[5:])
+    time_limit = float(options.get("time", 0)) #Seconds per move for iterative deepening (0 is off)
+    workers = int(options.get("workers", 1)) #Worker processes for alpha-beta (1 is off, 0 uses all cores)
+    heuristic = int(options.get("heuristic", 0)) #Evaluate positions at the depth limit with compute_heuristic
+    stability = int(options.get("stability", 0)) #Evaluate positions at the depth limit with compute_stability_heuristic
+    weights_file = options.get("weights") #Evaluate positions at the depth limit with weights from this file (see othello_tuning)
+    patterns = options.get("patterns") #Evaluate positions at the depth limit with pattern tables from this file
+    book_file = options.get("book") #Opening book to play from before searching
+    endgame_empties = int(options.get("endgame", 0)) #Solve the game exactly from this many empty squares on
+    protocol = int(options.get("protocol", 0)) #Binary protocol version the manager offers (0 is text)
+    pooled = int(options.get("pool", 0)) #Keep running after the game for another one
+    pondering = int(options.get("ponder", 0)) #Search on the opponent's time
+    pvs = int(options.get("pvs", 0)) #Principal variation search instead of alpha-beta
+    stats_log = options.get("stats") #Search statistics of every move: 1 for stderr, else a file for JSON lines
+    symmetric = int(options.get("symmetry", 0)) #Share table entries between rotations and reflections of a position
+    probcut_file = options.get("probcut") #Multi-ProbCut selective search with the cut table in this file (see othello_probcut)
+
+    # Values in the table may come from another evaluation in the last game
+    tt.clear()
+    game_number += 1
+
     if (minimax == 1): eprint("Running MINIMAX")
+    elif (pvs == 1): eprint("Running PRINCIPAL VARIATION SEARCH")
     else: eprint("Running ALPHA-BETA")
 
+    if (pondering == 1 and minimax == 0): #the pondering results are passed on in the transposition table
+        caching = 1
+        eprint("Pondering is ON")
+
     if (caching == 1): eprint("State Caching is ON")
     else: eprint("State Caching is OFF")
 
+    symmetry = symmetric
+    if (symmetric == 1): eprint("Symmetric Caching is ON")
+
     if (ordering == 1): eprint("Node Ordering is ON")
     else: eprint("Node Ordering is OFF")
 
+    evaluate, evaluate_batch = compute_utility, None
+    heuristic_weights, stability_weights = HEURISTIC_WEIGHTS, STABILITY_WEIGHTS
+    if (weights_file is not None):
+        evaluate = use_heuristic_weights(load_heuristic_weights(weights_file))
+        eprint("Heuristic Evaluation is ON, weights:", weights_file)
+    elif (stability == 1):
+        evaluate = compute_stability_heuristic
+        eprint("Heuristic Evaluation with Stability is ON")
+    elif (heuristic == 1):
+        evaluate = compute_heuristic
+        eprint("Heuristic Evaluation is ON")
+    elif (patterns is not None):
+        if (patterns != pattern_file): #tables of the last game stay loaded if the file is the same
+            pattern_file = patterns
+            pattern_evaluator = None
+        evaluate = evaluate_patterns
+        evaluate_batch = evaluate_patterns_batch
+        eprint("Pattern Evaluation is ON, weights:", pattern_file)
+
+    if (book_file is None):
+        book = None
+    else:
+        if (book is None or book.path != book_file): #the book of the last game stays mapped if the file is the same
+            book = OpeningBook(book_file)
+        eprint("Opening Book with", len(book), "positions")
+
+    if (endgame_empties > 0): eprint("Endgame Solver from", endgame_empties, "empty squares")
+
+    if (probcut_file is None):
+        probcut = None
+    elif (minimax == 0):
+        if (probcut is None or probcut.path != probcut_file): #the table of the last game stays loaded if the file is the same
+            # othello_probcut is only imported when it is used, like othello_patterns
+            from othello_probcut import load_probcut
+            probcut = load_probcut(probcut_file)
+        eprint("Multi-ProbCut is ON, cuts for", probcut.evaluation or "compute_utility", "at", probcut.threshold, "sigma")
+
     if (limit == -1): eprint("Depth Limit is OFF")
     else: eprint("Depth Limit is ", limit)
 
     if (minimax == 1 and ordering == 1): eprint("Node Ordering should have no impact on Minimax")
 
+    if (time_limit > 0 and minimax == 0): eprint("Iterative Deepening with", time_limit, "seconds per move")
+    elif (workers != 1 and minimax == 0): eprint("Parallel Search with", workers or multiprocessing.cpu_count(), "workers")
+
+    def choose_move(board):
+        global evaluate
+        nonlocal weights_file
+        if (weights_file is not None): #the board size is only known with the first board
+            try:
+                load_heuristic_weights(weights_file, len(board))
+            except ValueError as error:
+                eprint(error, "- using the built-in weights")
+                evaluate = use_heuristic_weights(HEURISTIC_WEIGHTS + STABILITY_WEIGHTS if stability == 1 else HEURISTIC_WEIGHTS)
+            weights_file = None
+        stop_pondering()
+        stats.reset()
+        move = select_move(board, color, limit, minimax, caching, ordering, time_limit, workers, pvs)
+        if (stats_log == "1"):
+            eprint("Move {}: {}".format(move, stats.summary()))
+        elif (stats_log is not None):
+            stats.write_json(stats_log, color=color, move=move, empties=sum(list(row).count(0) for row in board))
+        if (pondering == 1 and minimax == 0):
+            start_pondering(play_move(board, color, move[0], move[1]), color, limit, ordering)
+        return move
+
+    if (protocol >= 1): # Switch to the binary protocol
+        run_binary_protocol(color, choose_move)
+        stop_pondering()
+        return pooled == 1
+
     while True: # This is the main loop
         # Read in the current game status, for example:
         # "SCORE 2 2" or "FINAL 33 31" if the game is over.
@@ -322,9 +1148,11 @@ def run_ai():
         light_score = int(light_score_s)
 
         if status == "FINAL": # Game is over.
-            print
+            stop_pondering()
+            if (pooled == 1):
+                return True
         else:
-            board = eval(input()) # Read in the input and turn it into a Python
+            board = ast.literal_eval(input()) # Read in the input and turn it into a Python
                                   # object. The format is a list of rows. The
                                   # squares in each row are represented by
                                   # 0 : empty square
@@ -332,13 +1160,22 @@ def run_ai():
                                   # 2 : light disk (player 2)
 
             # Select the move and send it to the manager
-            if (minimax == 1): #run this if the minimax flag is given
-                movei, movej = select_move_minimax(board, color, limit, caching)
-            else: #else run alphabeta
-                movei, movej = select_move_alphabeta(board, color, limit, caching, ordering)
-            
+            movei, movej = choose_move(board)
             print("{} {}".format(movei, movej))
 
 
+def run_ai():
+    """
+    This function establishes communication with the game manager.
+    It first introduces itself and receives its color.
+    Then it repeatedly receives the current score and current board state
+    until the game is over. If the manager keeps the process in a pool, the
+    AI answers READY and waits for the first line of the next game.
+    """
+    print(introduction("Othello AI"), flush=True) # First line is the name of this AI, and that it supports the binary protocol
+    while run_game(input().split(",")):
+        print("READY", flush=True)
+
+
 if __name__ == "__main__":
     run_ai()
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*
+"""
+A Monte Carlo Tree Search (UCT) player for Othello.
+
+Instead of a depth-limited search with an evaluation function, the player
+plays many random games (playouts) from the current position and builds a
+tree of the positions it visited, choosing which move to try next by UCT:
+the average result of a move plus an exploration bonus for moves that were
+tried rarely. The move that was tried most often is played. The tree is
+kept between moves, so the playouts of the last move below the actual
+position are reused.
+
+It accepts the same first line as agent.py (color,limit,minimax,caching,
+ordering followed by optional name=value fields); the five fixed fields are
+ignored. Optional fields:
+  time=<seconds>      time per move (default DEFAULT_TIME)
+  playouts=<n>        stop after n playouts per move (0: only the time limit)
+  workers=<n>         search in n processes, each with its own tree, and add
+                      up their visit counts (0 uses all cores)
+  policy=1            light playout policy: corners first, X-squares last
+  exploration=<c>     UCT exploration constant (default EXPLORATION)
+  protocol, pool      as for agent.py (see othello_protocol and othello_game)
+"""
+
+import ast
+import math
+import multiprocessing
+import random
+import sys
+import time
+
+from othello_bitboard import bit_square, get_flips, legal_moves, popcount, square_bit, to_bitboards
+from othello_protocol import BOARD, FINAL, UPDATE, decode_board, decode_update, encode_move, introduction, read_frame
+
+DEFAULT_TIME = 1.0
+EXPLORATION = 1.4
+
+# Keys: board dimension
+# Values: (corners, X-squares) bitboards for the light playout policy
+_policy_masks = dict()
+
+
+def eprint(*args, **kwargs): #you can use this for debugging, as it will print to sterr and not stdout
+    print(*args, file=sys.stderr, **kwargs)
+
+
+def get_policy_masks(dimension):
+    if dimension not in _policy_masks:
+        d = dimension - 1
+        corners = 0
+        xsquares = 0
+        for (i, j), (xi, xj) in (((0, 0), (1, 1)), ((d, 0), (d - 1, 1)), ((0, d), (1, d - 1)), ((d, d), (d - 1, d - 1))):
+            corners |= square_bit(i, j, dimension)
+            xsquares |= square_bit(xi, xj, dimension)
+        _policy_masks[dimension] = (corners, xsquares)
+    return _policy_masks[dimension]
+
+
+def choose_bit(moves, rng):
+    # Return one random set bit of moves
+    bits = []
+    while moves:
+        bit = moves & -moves
+        bits.append(bit)
+        moves ^= bit
+    return rng.choice(bits)
+
+
+def playout(dark, light, player, dimension, rng, policy = False):
+    """
+    Play random moves from the position until the player to move has no
+    legal move, and return the final disk difference for dark.
+    """
+    disks = [0, dark, light]
+    corners, xsquares = get_policy_masks(dimension)
+    while True:
+        own = disks[player]
+        opp = disks[3 - player]
+        moves = legal_moves(own, opp, dimension)
+        if not moves:
+            break
+        if policy:
+            # Take a corner if possible and avoid the squares next to them
+            if moves & corners:
+                moves &= corners
+            elif moves & ~xsquares:
+                moves &= ~xsquares
+        move = choose_bit(moves, rng)
+        flips = get_flips(own, opp, move, dimension)
+        disks[player] = own | move | flips
+        disks[3 - player] = opp & ~flips
+        player = 3 - player
+    return popcount(disks[1]) - popcount(disks[2])
+
+
+class Node(object):
+    """
+    A position in the search tree. wins counts the results of the playouts
+    through this node for the player who moved into it (1 per win, 0.5 per
+    draw).
+    """
+
+    __slots__ = ("dark", "light", "player", "move", "parent", "children", "untried", "visits", "wins")
+
+    def __init__(self, dark, light, player, dimension, move = None, parent = None):
+        self.dark = dark
+        self.light = light
+        self.player = player # player to move
+        self.move = move # (column, row) that led here
+        self.parent = parent
+        self.children = []
+        own, opp = (dark, light) if player == 1 else (light, dark)
+        self.untried = legal_moves(own, opp, dimension)
+        self.visits = 0
+        self.wins = 0.0
+
+    def select_child(self, exploration):
+        # UCT: average result plus exploration bonus
+        log_visits = math.log(self.visits)
+        return max(self.children, key=lambda child: child.wins / child.visits + exploration * math.sqrt(log_visits / child.visits))
+
+    def expand(self, dimension, rng):
+        move = choose_bit(self.untried, rng)
+        self.untried ^= move
+        own, opp = (self.dark, self.light) if self.player == 1 else (self.light, self.dark)
+        flips = get_flips(own, opp, move, dimension)
+        own |= move | flips
+        opp &= ~flips
+        dark, light = (own, opp) if self.player == 1 else (opp, own)
+        child = Node(dark, light, 3 - self.player, dimension, bit_square(move, dimension), self)
+        self.children.append(child)
+        return child
+
+
+def find_position(root, dark, light, player, depth = 2):
+    """
+    Return the node of the position below root (at most depth moves down),
+    or None.
+    """
+    if root is None:
+        return None
+    nodes = [root]
+    for _ in range(depth + 1):
+        for node in nodes:
+            if node.dark == dark and node.light == light and node.player == player:
+                return node
+        nodes = [child for node in nodes for child in node.children]
+    return None
+
+
+def run_playouts(root, dimension, deadline, max_playouts, rng, policy = False, exploration = EXPLORATION):
+    """
+    Run playouts from root until deadline or until max_playouts have been
+    run (if it is positive). Returns the number of playouts.
+    """
+    count = 0
+    while time.time() < deadline and (max_playouts <= 0 or count < max_playouts):
+        node = root
+        # Selection
+        while node.untried == 0 and node.children:
+            node = node.select_child(exploration)
+        # Expansion
+        if node.untried:
+            node = node.expand(dimension, rng)
+        # Simulation
+        result = playout(node.dark, node.light, node.player, dimension, rng, policy)
+        # Backpropagation
+        while node is not None:
+            node.visits += 1
+            if node.parent is not None:
+                mover = node.parent.player
+                if result == 0:
+                    node.wins += 0.5
+                elif (result > 0) == (mover == 1):
+                    node.wins += 1
+            node = node.parent
+        count += 1
+    return count
+
+
+# Tree of this process, kept between moves
+tree = None
+
+
+def search(dark, light, player, dimension, time_limit, max_playouts = 0, policy = False, exploration = EXPLORATION, seed = None):
+    """
+    Search the position, reusing the tree of the last search if the position
+    is in it. Returns ({move: visits}, playouts).
+    """
+    global tree
+    node = find_position(tree, dark, light, player)
+    if node is None:
+        node = Node(dark, light, player, dimension)
+    node.parent = None
+    tree = node
+    rng = random.Random(seed)
+    count = run_playouts(node, dimension, time.time() + time_limit, max_playouts, rng, policy, exploration)
+    return {child.move: child.visits for child in node.children}, count
+
+
+# Number of the current game, counted by run_ai. Trees of earlier games are
+# dropped, in this process and in the workers (see search_worker).
+game_number = 0
+worker_game = 0
+
+
+def search_worker(args):
+    global tree, worker_game
+    game = args[-1]
+    if game != worker_game:
+        tree = None
+        worker_game = game
+    return search(*args[:-1])
+
+
+# Pool of worker processes for parallel searches, made again when the number
+# of workers changes (the playout settings are sent with every task)
+worker_pool = None
+worker_count = 0
+
+
+def select_move(board, color, time_limit = DEFAULT_TIME, max_playouts = 0, workers = 1, policy = False, exploration = EXPLORATION):
+    """
+    Given a board and a player color, decide on a move.
+    The return value is a tuple of integers (i,j), where
+    i is the column and j is the row on the board.
+    """
+    global worker_pool, worker_count
+    dimension = len(board)
+    dark, light = to_bitboards(board)
+    start = time.time()
+    if workers == 1:
+        visits, count = search(dark, light, color, dimension, time_limit, max_playouts, policy, exploration)
+    else:
+        # Every worker searches on its own tree, the visit counts are added up
+        n = workers or multiprocessing.cpu_count()
+        if worker_pool is None or worker_count != n:
+            if worker_pool is not None:
+                worker_pool.terminate()
+            worker_pool = multiprocessing.Pool(n)
+            worker_count = n
+        per_worker = -(-max_playouts // n) if max_playouts > 0 else 0
+        tasks = [(dark, light, color, dimension, time_limit, per_worker, policy, exploration, random.getrandbits(32), game_number) for _ in range(n)]
+        visits = dict()
+        count = 0
+        for worker_visits, worker_playouts in worker_pool.map(search_worker, tasks, chunksize=1):
+            for move, n_visits in worker_visits.items():
+                visits[move] = visits.get(move, 0) + n_visits
+            count += worker_playouts
+    seconds = time.time() - start
+    eprint("{} playouts, {:.0f} playouts/s".format(count, count / seconds if seconds else 0.0))
+    if not visits: # no playout finished in time
+        own, opp = (dark, light) if color == 1 else (light, dark)
+        return bit_square(choose_bit(legal_moves(own, opp, dimension), random), dimension)
+    return max(sorted(visits), key=visits.get)
+
+
+def run_ai():
+    """
+    This function establishes communication with the game manager.
+    It first introduces itself and receives its color.
+    Then it repeatedly receives the current score and current board state
+    until the game is over.
+    """
+    global tree, game_number
+    print(introduction("MCTS"), flush=True) # First line is the name of this AI, and that it supports the binary protocol
+    while True:
+        arguments = input().split(",")
+        tree = None # a new game
+        game_number += 1
+        color = int(arguments[0]) # We read the color: 1 for dark (goes first), 2 for light.
+        # The depth limit, minimax, caching and ordering fields have no
+        # impact on this AI, optional name=value fields follow them
+        options = dict(argument.split("=", 1) for argument in arguments[5:])
+        time_limit = float(options.get("time", DEFAULT_TIME))
+        max_playouts = int(options.get("playouts", 0))
+        workers = int(options.get("workers", 1))
+        policy = int(options.get("policy", 0)) == 1
+        exploration = float(options.get("exploration", EXPLORATION))
+        protocol = int(options.get("protocol", 0))
+        pooled = int(options.get("pool", 0))
+
+        choose_move = lambda board: select_move(board, color, time_limit, max_playouts, workers, policy, exploration)
+
+        if protocol >= 1: # Switch to the binary protocol
+            stdin = sys.stdin.buffer
+            stdout = sys.stdout.buffer
+            board = None
+            while True:
+                kind, payload = read_frame(stdin)
+                if kind == FINAL: # Game is over.
+                    break
+                if kind == BOARD:
+                    _, _, board = decode_board(payload)
+                elif kind == UPDATE:
+                    _, _, moves = decode_update(payload)
+                    for player, i, j in moves:
+                        board.make_move(player, i, j)
+                movei, movej = choose_move(board.to_tuple())
+                stdout.write(encode_move(movei, movej))
+                stdout.flush()
+        else:
+            while True: # This is the main loop
+                # Read in the current game status, for example:
+                # "SCORE 2 2" or "FINAL 33 31" if the game is over.
+                next_input = input()
+                status, dark_score_s, light_score_s = next_input.strip().split()
+
+                if status == "FINAL": # Game is over.
+                    break
+                board = ast.literal_eval(input()) # The board as a list of rows
+                movei, movej = choose_move(board)
+                print("{} {}".format(movei, movej))
+
+        if pooled != 1:
+            return
+        print("READY", flush=True)
+
+
+if __name__ == "__main__":
+    run_ai()
@@ -0,0 +1,194 @@
+"""
+Move generation for many Othello boards at once with NumPy.
+
+Boards are an (N, d, d) int8 array indexed [board, row, column], with 0 for
+empty squares, 1 for dark and 2 for light disks, like the tuple boards of
+othello_shared. For each of the eight directions, the whole array is shifted
+by one square at a time, so that every board is handled by the same few
+array operations; this is much faster than calling get_possible_moves and
+play_move board by board when there are thousands of boards, e.g. for
+self-play and training data.
+
+Boards up to 8x8 are packed into one uint64 bitboard per board first (bit
+j * d + i, like othello_bitboard), so that a shift moves a whole board at
+once; larger boards are shifted as (N, d, d) bool arrays.
+
+legal_moves_batch returns an (N, d, d) bool mask of the legal moves of each
+board, play_moves_batch plays one move on every board, and to_batch and
+get_possible_moves_batch convert from and to the tuple and list formats of
+othello_shared.
+"""
+
+import numpy as np
+
+from othello_bitboard import DIRECTIONS, get_tables
+
+# Boards up to this dimension fit in one uint64
+PACKED_DIMENSION = 8
+
+
+def to_batch(boards):
+    """
+    Convert a list of tuple boards to an (N, d, d) int8 array.
+    """
+    return np.array(boards, dtype=np.int8).reshape(len(boards), len(boards[0]), len(boards[0]))
+
+
+def shift(a, xdir, ydir):
+    """
+    Return a copy of the (N, d, d) array a moved by xdir columns and ydir rows,
+    with zeros shifted in: result[:, j, i] = a[:, j - ydir, i - xdir].
+    """
+    result = np.zeros_like(a)
+    d = a.shape[1]
+    rows_to = slice(max(ydir, 0), d + min(ydir, 0))
+    rows_from = slice(max(-ydir, 0), d + min(-ydir, 0))
+    columns_to = slice(max(xdir, 0), d + min(xdir, 0))
+    columns_from = slice(max(-xdir, 0), d + min(-xdir, 0))
+    result[:, rows_to, columns_to] = a[:, rows_from, columns_from]
+    return result
+
+
+def pack(masks):
+    """
+    Return the (N,) uint64 bitboards of an (N, d, d) bool array, d <= 8.
+    """
+    n, d, _ = masks.shape
+    bits = np.zeros((n, 64), dtype=bool)
+    bits[:, :d * d] = masks.reshape(n, -1)
+    return np.packbits(bits, axis=1, bitorder="little").view("<u8").ravel()
+
+
+def unpack(bitboards, dimension):
+    """
+    Return the (N, d, d) bool array of (N,) uint64 bitboards.
+    """
+    bits = np.unpackbits(bitboards.astype("<u8").view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    return bits[:, :dimension * dimension].reshape(-1, dimension, dimension).view(bool)
+
+
+def get_packed_shifts(dimension):
+    """
+    Return the full board mask and the (shift, mask) pairs of
+    othello_bitboard.get_tables as uint64 values, with a function that
+    applies a pair to an array of bitboards.
+    """
+    full, shifts = get_tables(dimension)
+    packed = []
+    for shift, mask in shifts:
+        packed.append((shift > 0, np.uint64(abs(shift)), np.uint64(mask & full)))
+    return np.uint64(full), packed
+
+
+def shift_packed(x, direction):
+    left, amount, mask = direction
+    return ((x << amount) if left else (x >> amount)) & mask
+
+
+def player_masks(boards, players):
+    """
+    Return the (own, opp) bool arrays of boards for players, which is a color
+    or an array with one color per board.
+    """
+    players = np.asarray(players, dtype=np.int8).reshape(-1, 1, 1)
+    own = boards == players
+    opp = (boards != 0) & ~own
+    return own, opp
+
+
+def legal_moves_batch(boards, players):
+    """
+    Return an (N, d, d) bool array that is True on the squares where the
+    player (a color, or an array with one color per board) can play.
+    """
+    own, opp = player_masks(boards, players)
+    d = boards.shape[1]
+    if d <= PACKED_DIMENSION:
+        own = pack(own)
+        opp = pack(opp)
+        full, directions = get_packed_shifts(d)
+        empty = ~(own | opp) & full
+        moves = np.zeros_like(own)
+        for direction in directions:
+            x = shift_packed(own, direction) & opp
+            for _ in range(d - 3):
+                x |= shift_packed(x, direction) & opp
+            moves |= shift_packed(x, direction) & empty
+        return unpack(moves, d)
+
+    empty = boards == 0
+    moves = np.zeros_like(own)
+    for xdir, ydir in DIRECTIONS:
+        # Opponent disks reachable from an own disk along the direction
+        x = shift(own, xdir, ydir) & opp
+        for _ in range(d - 3):
+            x |= shift(x, xdir, ydir) & opp
+        moves |= shift(x, xdir, ydir) & empty
+    return moves
+
+
+def play_moves_batch(boards, players, moves):
+    """
+    Return the boards after each player plays one move. moves is an (N, 2)
+    array of (column, row) moves, which must be legal.
+    """
+    own, opp = player_masks(boards, players)
+    n, d, _ = boards.shape
+    moves = np.asarray(moves)
+    placed = np.zeros_like(own)
+    placed[np.arange(n), moves[:, 1], moves[:, 0]] = True
+
+    if d <= PACKED_DIMENSION:
+        own = pack(own)
+        opp = pack(opp)
+        full, directions = get_packed_shifts(d)
+        flips = np.zeros_like(own)
+        move_bits = np.uint64(1) << (moves[:, 1] * d + moves[:, 0]).astype(np.uint64)
+        for k, direction in enumerate(directions):
+            # Directions k and k + 4 are opposite (see DIRECTIONS)
+            opposite = directions[(k + 4) % 8]
+            from_move = shift_packed(move_bits, direction) & opp
+            to_own = shift_packed(own, opposite) & opp
+            for _ in range(d - 3):
+                from_move |= shift_packed(from_move, direction) & opp
+                to_own |= shift_packed(to_own, opposite) & opp
+            flips |= from_move & to_own
+        flips = unpack(flips, d)
+    else:
+        flips = np.zeros_like(own)
+        for xdir, ydir in DIRECTIONS:
+            # A disk is captured if it is on the run of opponent disks that
+            # starts next to the move, and on a run of opponent disks that
+            # ends next to an own disk further along the direction
+            from_move = shift(placed, xdir, ydir) & opp
+            to_own = shift(own, -xdir, -ydir) & opp
+            for _ in range(d - 3):
+                from_move |= shift(from_move, xdir, ydir) & opp
+                to_own |= shift(to_own, -xdir, -ydir) & opp
+            flips |= from_move & to_own
+
+    result = boards.copy()
+    colors = np.broadcast_to(np.asarray(players, dtype=np.int8).reshape(-1, 1, 1), boards.shape)
+    changed = flips | placed
+    result[changed] = colors[changed]
+    return result
+
+
+def get_possible_moves_batch(boards, players):
+    """
+    Return a list with the possible moves of each board as a list of
+    (column, row) tuples, in the order of othello_shared.get_possible_moves.
+    """
+    masks = legal_moves_batch(boards, players)
+    result = [[] for _ in range(len(boards))]
+    # othello_shared lists moves by column, then row
+    for b, i, j in np.argwhere(masks.transpose(0, 2, 1)).tolist():
+        result[b].append((i, j))
+    return result
+
+
+def get_score_batch(boards):
+    """
+    Return the (N,) arrays of dark and light disk counts.
+    """
+    return (boards == 1).sum(axis=(1, 2)), (boards == 2).sum(axis=(1, 2))
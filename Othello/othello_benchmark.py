@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Reproducible benchmarks of the search in agent.py and of othello_shared.
+
+The same positions are searched every time: for each board dimension, a few
+positions at different stages of the game, reached by random moves from a
+fixed seed. Every search mode (minimax and alpha-beta, with caching and
+ordering on and off) searches every position to each depth up to its limit,
+starting from an empty transposition table, and the following is reported:
+nodes, nodes per second, the time to finish each depth (summed over the
+positions), transposition table probes and hits, the peak resident memory of
+the process and the moves chosen. Every search is timed REPEATS times and
+the fastest run counts. Each mode runs in a fresh process, so that memory
+and warm caches do not carry over. The "shared" mode measures how many moves
+per second get_possible_moves and play_move of othello_shared generate and
+play on the same positions.
+
+Results are written as JSON. Given a baseline file from an earlier run, every
+result is compared with it: a mode is reported as a regression if its speed
+dropped by more than the tolerance, and as changed if it now searches a
+different number of nodes or chooses different moves (node counts do not
+depend on the machine, so any difference means the search itself changed).
+The exit status is 1 if there is a regression or change, so the benchmark can
+run as a check.
+"""
+
+import sys, getopt
+import json
+import multiprocessing
+import platform
+import random
+import resource
+import time
+
+# Board dimensions and the depth limits of the minimax and alpha-beta modes
+LIMITS = {4: (9, 11), 6: (5, 6), 8: (4, 5)}
+
+# Number of positions per dimension, and the seed of the moves reaching them
+POSITIONS = 6
+SEED = 2024
+
+# Search modes: name, minimax, caching, ordering
+MODES = (("minimax", 1, 0, 0),
+         ("minimax+caching", 1, 1, 0),
+         ("alphabeta", 0, 0, 0),
+         ("alphabeta+caching", 0, 1, 0),
+         ("alphabeta+ordering", 0, 0, 1),
+         ("alphabeta+caching+ordering", 0, 1, 1))
+
+# Relative slowdown reported as a regression (timings on a busy machine
+# easily vary by 10-20%)
+TOLERANCE = 0.25
+
+# Rounds of move generation in the shared mode
+SHARED_ROUNDS = 100
+
+# Every measurement is repeated and the fastest run is kept, which is the
+# least disturbed by other processes
+REPEATS = 3
+
+
+def get_positions(dimension, count = POSITIONS, seed = SEED):
+    """
+    Return count (board, color) positions, spread over the game, reached by
+    random moves from the initial board.
+    """
+    from othello_game import OthelloGameManager
+    from othello_shared import get_possible_moves, play_move
+
+    rng = random.Random(seed + dimension)
+    squares = dimension * dimension - 4
+    positions = []
+    for k in range(count):
+        plies = k * squares // (count + 1)
+        while True:
+            board = tuple(tuple(row) for row in OthelloGameManager(dimension).board)
+            color = 1
+            for _ in range(plies):
+                moves = get_possible_moves(board, color)
+                if not moves:
+                    break
+                board = play_move(board, color, *rng.choice(moves))
+                color = 3 - color
+            # Try again if the game ended early
+            if get_possible_moves(board, color):
+                break
+        positions.append((board, color))
+    return positions
+
+
+def peak_memory_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run_search_mode(args):
+    """
+    Benchmark one search mode on the positions of one dimension (in a fresh
+    worker process) and return its result dict.
+    """
+    dimension, name, minimax, caching, ordering, limit = args
+    import agent
+
+    positions = get_positions(dimension)
+    depth_seconds = [0.0] * limit
+    nodes = 0
+    probes = 0
+    hits = 0
+    moves = []
+    for board, color in positions:
+        for depth in range(1, limit + 1):
+            best = None
+            for _ in range(REPEATS):
+                agent.tt.clear()
+                agent.stats.reset()
+                start = time.perf_counter()
+                if minimax:
+                    move = agent.select_move_minimax(board, color, depth, caching)
+                else:
+                    move = agent.select_move_alphabeta(board, color, depth, caching, ordering)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            depth_seconds[depth - 1] += best
+            nodes += agent.stats.nodes
+            probes += agent.stats.tt_probes
+            hits += agent.stats.tt_hits
+        moves.append(list(move))
+    seconds = sum(depth_seconds)
+    return {"dimension": dimension, "mode": name, "limit": limit, "positions": len(positions),
+            "nodes": nodes, "seconds": seconds, "nodes_per_second": nodes / seconds if seconds else 0.0,
+            "depth_seconds": depth_seconds, "tt_probes": probes, "tt_hits": hits,
+            "tt_hit_rate": hits / probes if probes else 0.0, "peak_memory_kb": peak_memory_kb(), "moves": moves}
+
+
+def run_shared_mode(dimension):
+    """
+    Benchmark move generation and play of othello_shared on the positions of
+    one dimension (in a fresh worker process).
+    """
+    from othello_shared import get_possible_moves, play_move
+
+    positions = get_positions(dimension)
+    seconds = None
+    for _ in range(REPEATS):
+        count = 0
+        start = time.perf_counter()
+        for _ in range(SHARED_ROUNDS):
+            for board, color in positions:
+                for move in get_possible_moves(board, color):
+                    play_move(board, color, move[0], move[1])
+                    count += 1
+        elapsed = time.perf_counter() - start
+        seconds = elapsed if seconds is None else min(seconds, elapsed)
+    return {"dimension": dimension, "mode": "shared", "limit": 0, "positions": len(positions),
+            "nodes": count, "seconds": seconds, "nodes_per_second": count / seconds if seconds else 0.0,
+            "peak_memory_kb": peak_memory_kb()}
+
+
+def run_task(task):
+    if task[1] == "shared":
+        return run_shared_mode(task[0])
+    return run_search_mode(task)
+
+
+def run_benchmark(dimensions = sorted(LIMITS), limits = None, verbose = True):
+    """
+    Run every mode for every dimension and return the list of result dicts.
+    limits overrides the (minimax, alpha-beta) depth limits of LIMITS.
+    """
+    tasks = []
+    for dimension in dimensions:
+        minimax_limit, alphabeta_limit = limits or LIMITS[dimension]
+        tasks.append((dimension, "shared"))
+        for name, minimax, caching, ordering in MODES:
+            tasks.append((dimension, name, minimax, caching, ordering, minimax_limit if minimax else alphabeta_limit))
+
+    results = []
+    # One task per process, one process at a time, so that timings do not
+    # compete for cores
+    pool = multiprocessing.Pool(1, maxtasksperchild=1)
+    try:
+        for result in pool.imap(run_task, tasks):
+            results.append(result)
+            if verbose:
+                print("{0}x{0} {1:<27} {2:12.0f}/s {3:10d} {4:8.3f}s {5:8d}KB".format(
+                    result["dimension"], result["mode"], result["nodes_per_second"], result["nodes"],
+                    result["seconds"], result["peak_memory_kb"]), flush=True)
+    finally:
+        pool.terminate()
+    return results
+
+
+def compare(results, baseline, tolerance = TOLERANCE):
+    """
+    Compare results with the results of a baseline run and return the list
+    of problems found (empty if there are none).
+    """
+    previous = dict(((result["dimension"], result["mode"], result["limit"]), result) for result in baseline["results"])
+    problems = []
+    for result in results:
+        key = (result["dimension"], result["mode"], result["limit"])
+        if key not in previous:
+            continue
+        old = previous[key]
+        label = "{0}x{0} {1}".format(*key) + (" (depth {})".format(key[2]) if key[2] else "")
+        if old["nodes_per_second"] and result["nodes_per_second"] < (1 - tolerance) * old["nodes_per_second"]:
+            problems.append("{}: regression, {:.0f} nodes/s instead of {:.0f} ({:+.0%})".format(
+                label, result["nodes_per_second"], old["nodes_per_second"],
+                result["nodes_per_second"] / old["nodes_per_second"] - 1))
+        if result["nodes"] != old["nodes"]:
+            problems.append("{}: changed, {} nodes instead of {}".format(label, result["nodes"], old["nodes"]))
+        if result.get("moves") != old.get("moves"):
+            problems.append("{}: changed, moves {} instead of {}".format(label, result.get("moves"), old.get("moves")))
+    return problems
+
+
+def main(argv):
+    output = None
+    baseline_file = None
+    dimensions = sorted(LIMITS)
+    limits = None
+    tolerance = TOLERANCE
+    usage = 'othello_benchmark.py [-o <results.json> -b <baseline.json> -d <dimension> -m <minimax-limit>,<alphabeta-limit> -t <tolerance>]'
+
+    try:
+        opts, args = getopt.getopt(argv,"ho:b:d:m:t:",["output=","baseline=","dimension=","limits=","tolerance="])
+    except getopt.GetoptError:
+        print(usage)
+        sys.exit(2)
+    for opt, arg in opts:
+        if opt == '-h':
+            print(usage)
+            sys.exit()
+        elif opt in ("-o", "--output"):
+            output = arg
+        elif opt in ("-b", "--baseline"):
+            baseline_file = arg
+        elif opt in ("-d", "--dimension"):
+            dimensions = [int(arg)]
+        elif opt in ("-m", "--limits"):
+            limits = tuple(int(limit) for limit in arg.split(","))
+        elif opt in ("-t", "--tolerance"):
+            tolerance = float(arg)
+
+    if limits is not None and len(limits) != 2:
+        print(usage)
+        sys.exit(2)
+
+    start = time.time()
+    results = run_benchmark(dimensions, limits)
+    report = {"python": platform.python_version(), "platform": platform.platform(),
+              "cpus": multiprocessing.cpu_count(), "date": time.strftime("%Y-%m-%d %H:%M:%S"), "results": results}
+    if output is not None:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=1)
+            f.write("\n")
+    print("{:.1f}s".format(time.time() - start))
+
+    if baseline_file is not None:
+        with open(baseline_file) as f:
+            baseline = json.load(f)
+        problems = compare(results, baseline, tolerance)
+        for problem in problems:
+            print(problem)
+        if problems:
+            sys.exit(1)
+        print("No regressions against {}".format(baseline_file))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,374 @@
+"""
+Bitboard implementation of the functions in othello_shared.
+
+A board is stored as two integers, one per colour. Square (i,j) -- column i,
+row j -- is bit j * dimension + i. Python integers have arbitrary precision,
+so this works for any board dimension.
+
+find_lines, get_possible_moves, play_move and get_score have the same
+signatures and return the same values as the versions in othello_shared, so
+an AI can switch by changing its import. to_bitboards and from_bitboards
+convert between the two representations. Board is a mutable version for
+searches that make and undo moves in place.
+"""
+
+from itertools import chain
+
+# Direction vectors (xdir, ydir), in the same order othello_shared uses them.
+DIRECTIONS = ((0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1), (-1, 0), (-1, 1))
+
+# Keys: board dimension
+# Values: (full board mask, [(shift, mask) for each direction])
+_tables = dict()
+
+# Translation tables used to convert tuple boards to bitboards.
+_DARK_DIGITS = bytes.maketrans(b"\x00\x01\x02", b"010")
+_LIGHT_DIGITS = bytes.maketrans(b"\x00\x01\x02", b"001")
+
+# Keys: board dimension
+# Values: dict from the dark and light bits of a row to the row tuple
+_rows = dict()
+
+# Keys: tuple boards built by play_move
+# Values: their (dark, light) bitboards, so that the search does not convert
+# the same board back again
+_known = dict()
+KNOWN_LIMIT = 100000
+
+def popcount(x):
+    """
+    Return the number of set bits in x.
+    """
+    return bin(x).count("1")
+
+
+if hasattr(int, "bit_count"):
+    popcount = int.bit_count
+
+
+def get_tables(dimension):
+    """
+    Return the full board mask and the (shift, mask) pair of every direction
+    for the given dimension. Shifting a bitboard by shift moves every disk one
+    square in that direction; the mask removes the disks that wrapped around
+    an edge of the board.
+    """
+    if dimension not in _tables:
+        full = (1 << (dimension * dimension)) - 1
+        not_first_column = 0
+        not_last_column = 0
+        for j in range(dimension):
+            for i in range(dimension):
+                bit = 1 << (j * dimension + i)
+                if i != 0:
+                    not_first_column |= bit
+                if i != dimension - 1:
+                    not_last_column |= bit
+        shifts = []
+        for xdir, ydir in DIRECTIONS:
+            mask = full
+            if xdir == 1:
+                mask &= not_first_column
+            elif xdir == -1:
+                mask &= not_last_column
+            shifts.append((ydir * dimension + xdir, mask))
+        _tables[dimension] = (full, shifts)
+    return _tables[dimension]
+
+
+def square_bit(i, j, dimension):
+    """
+    Return the bit of the square in column i and row j.
+    """
+    return 1 << (j * dimension + i)
+
+
+def bit_square(bit, dimension):
+    """
+    Return the (column,row) tuple of a single-bit bitboard.
+    """
+    return divmod(bit.bit_length() - 1, dimension)[::-1]
+
+
+def to_bitboards(board):
+    """
+    Convert a tuple board (or a Board) to a (dark, light) pair of bitboards.
+    """
+    if type(board) is tuple:
+        bitboards = _known.get(board)
+        if bitboards is not None:
+            return bitboards
+    elif isinstance(board, Board):
+        return board.disks[1], board.disks[2]
+    # One byte per square, last square first, so that the first square ends
+    # up as the least significant bit.
+    cells = bytes(chain.from_iterable(board))[::-1]
+    return int(cells.translate(_DARK_DIGITS), 2), int(cells.translate(_LIGHT_DIGITS), 2)
+
+
+def from_bitboards(dark, light, dimension):
+    """
+    Convert a (dark, light) pair of bitboards back to a tuple board.
+    """
+    if dimension not in _rows:
+        _rows[dimension] = dict()
+    rows = _rows[dimension]
+    row_mask = (1 << dimension) - 1
+    board = []
+    for shift in range(0, dimension * dimension, dimension):
+        dark_row = (dark >> shift) & row_mask
+        light_row = (light >> shift) & row_mask
+        key = (dark_row << dimension) | light_row
+        row = rows.get(key)
+        if row is None:
+            row = tuple(1 if dark_row >> i & 1 else 2 if light_row >> i & 1 else 0 for i in range(dimension))
+            rows[key] = row
+        board.append(row)
+    return tuple(board)
+
+
+def legal_moves(own, opp, dimension):
+    """
+    Return a bitboard of all squares where the player owning the disks in own
+    can play.
+    """
+    full, shifts = get_tables(dimension)
+    empty = full & ~(own | opp)
+    moves = 0
+    for shift, mask in shifts:
+        if shift > 0:
+            x = (own << shift) & mask & opp
+            while x:
+                x = (x << shift) & mask
+                moves |= x & empty
+                x &= opp
+        else:
+            x = (own >> -shift) & mask & opp
+            while x:
+                x = (x >> -shift) & mask
+                moves |= x & empty
+                x &= opp
+    return moves
+
+
+def get_flips(own, opp, move, dimension):
+    """
+    Return a bitboard of the opponent disks captured when the player owning
+    the disks in own plays the single-bit bitboard move.
+    """
+    full, shifts = get_tables(dimension)
+    flips = 0
+    for shift, mask in shifts:
+        line = 0
+        if shift > 0:
+            x = (move << shift) & mask & opp
+            while x:
+                line |= x
+                x = (x << shift) & mask
+                if x & own:
+                    flips |= line
+                    break
+                x &= opp
+        else:
+            x = (move >> -shift) & mask & opp
+            while x:
+                line |= x
+                x = (x >> -shift) & mask
+                if x & own:
+                    flips |= line
+                    break
+                x &= opp
+    return flips
+
+
+def move_list(moves, dimension):
+    """
+    Convert a bitboard of moves to a list of (column,row) tuples, ordered by
+    column and then row like othello_shared.get_possible_moves.
+    """
+    result = []
+    while moves:
+        bit = moves & -moves
+        result.append(bit_square(bit, dimension))
+        moves ^= bit
+    result.sort()
+    return result
+
+
+############ MUTABLE BOARD #########################
+class Board(object):
+    """
+    A board that is changed in place. make_move plays a move and records only
+    the flipped disks, undo_move takes the last move back. This avoids
+    building a new board for every node of a search.
+
+    disks[1] and disks[2] are the bitboards of the dark and light disks and
+    counts[1] and counts[2] the number of disks of each colour; both are
+    updated by every move. The legal moves of each colour and the squares next
+    to an empty square (for frontier counts) are computed at most once per
+    position and restored by undo_move, so an evaluation at a leaf does not
+    repeat the work the search already did there.
+
+    A Board can also be indexed like a tuple board (board[row][column]), so
+    the functions below accept it as well.
+    """
+
+    def __init__(self, dark, light, dimension):
+        self.dimension = dimension
+        self.disks = [0, dark, light]
+        self.counts = [0, popcount(dark), popcount(light)]
+        self.history = []
+        # Cached bitboards of the current position, None until needed
+        self.mobility = [None, None, None]
+        self.frontier_mask = None
+
+    @classmethod
+    def from_tuple(cls, board):
+        dark, light = to_bitboards(board)
+        return cls(dark, light, len(board))
+
+    def to_tuple(self):
+        return from_bitboards(self.disks[1], self.disks[2], self.dimension)
+
+    def __len__(self):
+        return self.dimension
+
+    def __getitem__(self, j):
+        if j < 0:
+            j += self.dimension
+        if not 0 <= j < self.dimension:
+            raise IndexError("row out of range")
+        return self.to_tuple()[j]
+
+    def empty_count(self):
+        return self.dimension * self.dimension - self.counts[1] - self.counts[2]
+
+    def legal_moves(self, player):
+        """
+        Return a bitboard of the squares where player can play.
+        """
+        moves = self.mobility[player]
+        if moves is None:
+            moves = legal_moves(self.disks[player], self.disks[3 - player], self.dimension)
+            self.mobility[player] = moves
+        return moves
+
+    def mobility_count(self, player):
+        """
+        Return the number of moves player can make.
+        """
+        return popcount(self.legal_moves(player))
+
+    def get_possible_moves(self, player):
+        """
+        Return a list of all possible (column,row) tuples that player can play,
+        in the same order as get_possible_moves.
+        """
+        return move_list(self.legal_moves(player), self.dimension)
+
+    def frontier(self, player):
+        """
+        Return the number of disks of player next to an empty square.
+        """
+        if self.frontier_mask is None:
+            full, shifts = get_tables(self.dimension)
+            empty = full & ~(self.disks[1] | self.disks[2])
+            mask = 0
+            for shift, shift_mask in shifts:
+                mask |= ((empty << shift) if shift > 0 else (empty >> -shift)) & shift_mask
+            self.frontier_mask = mask
+        return popcount(self.disks[player] & self.frontier_mask)
+
+    def make_move(self, player, i, j):
+        """
+        Play column i and row j for player and return the bitboard of the
+        flipped disks.
+        """
+        disks = self.disks
+        move = 1 << (j * self.dimension + i)
+        flips = get_flips(disks[player], disks[3 - player], move, self.dimension)
+        disks[player] |= flips | move
+        disks[3 - player] ^= flips
+        flipped = popcount(flips)
+        self.counts[player] += flipped + 1
+        self.counts[3 - player] -= flipped
+        self.history.append((player, move, flips, flipped, self.mobility, self.frontier_mask))
+        self.mobility = [None, None, None]
+        self.frontier_mask = None
+        return flips
+
+    def undo_move(self):
+        """
+        Take back the last move played with make_move.
+        """
+        player, move, flips, flipped, self.mobility, self.frontier_mask = self.history.pop()
+        disks = self.disks
+        disks[player] ^= flips | move
+        disks[3 - player] |= flips
+        self.counts[player] -= flipped + 1
+        self.counts[3 - player] += flipped
+
+
+############ DROP-IN REPLACEMENTS FOR othello_shared ###############
+def find_lines(board, i, j, player):
+    """
+    Find all the uninterupted lines of stones that would be captured if player
+    plays column i and row j.
+    """
+    dimension = len(board)
+    dark, light = to_bitboards(board)
+    own, opp = (dark, light) if player == 1 else (light, dark)
+    full, shifts = get_tables(dimension)
+    move = square_bit(i, j, dimension)
+    lines = []
+    for (xdir, ydir), (shift, mask) in zip(DIRECTIONS, shifts):
+        x = (move << shift if shift > 0 else move >> -shift) & mask
+        u, v = i + xdir, j + ydir
+        line = []
+        while x & opp:
+            line.append((u, v))
+            x = (x << shift if shift > 0 else x >> -shift) & mask
+            u, v = u + xdir, v + ydir
+        if line and x & own:
+            lines.append(line)
+    return lines
+
+
+def get_possible_moves(board, player):
+    """
+    Return a list of all possible (column,row) tuples that player can play on
+    the current board.
+    """
+    if isinstance(board, Board):
+        return board.get_possible_moves(player)
+    dimension = len(board)
+    dark, light = to_bitboards(board)
+    if player == 1:
+        return move_list(legal_moves(dark, light, dimension), dimension)
+    return move_list(legal_moves(light, dark, dimension), dimension)
+
+
+def play_move(board, player, i, j):
+    dimension = len(board)
+    dark, light = to_bitboards(board)
+    move = square_bit(i, j, dimension)
+    if player == 1:
+        flips = get_flips(dark, light, move, dimension)
+        dark |= flips | move
+        light &= ~(flips | move)
+    else:
+        flips = get_flips(light, dark, move, dimension)
+        light |= flips | move
+        dark &= ~(flips | move)
+    new_board = from_bitboards(dark, light, dimension)
+    if len(_known) >= KNOWN_LIMIT:
+        _known.clear()
+    _known[new_board] = (dark, light)
+    return new_board
+
+
+def get_score(board):
+    if isinstance(board, Board):
+        return board.counts[1], board.counts[2]
+    dark, light = to_bitboards(board)
+    return popcount(dark), popcount(light)
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Opening books for the Othello agent.
+
+A book maps positions (the Zobrist hash of the board and the player to move,
+see othello_transposition) to the best move found by a deep search. It is
+built offline by build_book: starting from the initial board, the book side
+only follows its book move and the other side tries every move, for both
+colours, up to a number of plies.
+
+The file holds the magic bytes b"OTBK", the format version and the board
+dimension as two little-endian uint32, followed by 10 byte records sorted by
+hash: the hash as a little-endian uint64 and the move as two bytes (column,
+row). In version 2 books, positions are stored once for all their rotations
+and reflections: the hash is the canonical hash and the move is in the
+canonical orientation (see othello_transposition). Version 1 books use the
+plain hash. OpeningBook memory-maps the file and looks positions up by binary
+search, so opening a book costs nothing no matter how large it is.
+"""
+
+import sys, getopt
+import mmap
+import struct
+import time
+
+from othello_bitboard import Board
+from othello_transposition import canonical_hash, inverse_move, symmetric_hash, transform_move, update_symmetric_hash
+
+MAGIC = b"OTBK"
+VERSION = 2
+PLAIN_VERSION = 1 # books without symmetry
+HEADER_SIZE = 12
+RECORD_SIZE = 10
+
+
+class OpeningBook(object):
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.data) < HEADER_SIZE or self.data[:4] != MAGIC:
+            raise ValueError("{} is not an opening book".format(path))
+        version, self.dimension = struct.unpack("<II", self.data[4:HEADER_SIZE])
+        if version not in (PLAIN_VERSION, VERSION):
+            raise ValueError("unsupported opening book version {}".format(version))
+        self.canonical = version == VERSION
+        self.size = (len(self.data) - HEADER_SIZE) // RECORD_SIZE
+
+    def __len__(self):
+        return self.size
+
+    def probe(self, key):
+        """
+        Return the book move (column,row) for the position with hash key, or
+        None if the position is not in the book.
+        """
+        data = self.data
+        low = 0
+        high = self.size
+        while low < high:
+            middle = (low + high) // 2
+            offset = HEADER_SIZE + middle * RECORD_SIZE
+            found = int.from_bytes(data[offset:offset + 8], "little")
+            if found < key:
+                low = middle + 1
+            elif found > key:
+                high = middle
+            else:
+                return data[offset + 8], data[offset + 9]
+        return None
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+
+def write_book(path, dimension, entries, canonical = True):
+    """
+    Write a book file from a dict of position hashes to (column,row) moves.
+    canonical tells whether the hashes and moves are canonical.
+    """
+    with open(path, "wb") as f:
+        f.write(MAGIC + struct.pack("<II", VERSION if canonical else PLAIN_VERSION, dimension))
+        for key in sorted(entries):
+            i, j = entries[key]
+            f.write(key.to_bytes(8, "little") + bytes((i, j)))
+
+
+def build_book(dimension, plies, search, verbose = False):
+    """
+    Return a dict of canonical position hashes to book moves (in the
+    canonical orientation) for the first plies moves of a game on a board of
+    the given dimension. search(board, color) returns the move for a tuple
+    board. Rotations and reflections of a position are searched and expanded
+    only once.
+    """
+    from othello_game import OthelloGameManager
+
+    entries = dict()
+    start = time.time()
+
+    def expand(board, player, key, ply, book_side, expanded):
+        if ply == plies:
+            return
+        canonical, transform = canonical_hash(key)
+        if expanded.get(canonical, plies) <= ply:
+            return # reached before, with at least as many plies left
+        expanded[canonical] = ply
+        possible_moves = board.get_possible_moves(player)
+        if not possible_moves:
+            return
+        if player == book_side:
+            if canonical not in entries:
+                entries[canonical] = transform_move(search(board.to_tuple(), player), transform, dimension)
+                if verbose and len(entries) % 100 == 0:
+                    print("{} positions, {:.1f}s".format(len(entries), time.time() - start))
+            possible_moves = [inverse_move(entries[canonical], transform, dimension)]
+        for (i, j) in possible_moves:
+            flips = board.make_move(player, i, j)
+            expand(board, 3 - player, update_symmetric_hash(key, dimension, player, i, j, flips), ply + 1, book_side, expanded)
+            board.undo_move()
+
+    initial = OthelloGameManager(dimension).board
+    for book_side in (1, 2):
+        board = Board.from_tuple(initial)
+        expand(board, 1, symmetric_hash(initial, 1), 0, book_side, dict())
+    return entries
+
+
+def main(argv):
+    import agent
+
+    dimension = 0
+    plies = 8
+    limit = 6
+    time_limit = None
+    output = None
+
+    try:
+        opts, args = getopt.getopt(argv,"hd:p:l:t:o:",["dimension=","plies=","limit=","time=","output="])
+    except getopt.GetoptError:
+        print('othello_book.py -d <dimension> -o <book-file> [-p <plies> -l <depth-limit> -t <seconds>]')
+        sys.exit(2)
+    for opt, arg in opts:
+        if opt == '-h':
+            print('othello_book.py -d <dimension> -o <book-file> [-p <plies> -l <depth-limit> -t <seconds>]')
+            sys.exit()
+        elif opt in ("-d", "--dimension"):
+            dimension = int(arg)
+        elif opt in ("-p", "--plies"):
+            plies = int(arg)
+        elif opt in ("-l", "--limit"):
+            limit = int(arg)
+        elif opt in ("-t", "--time"):
+            time_limit = float(arg)
+        elif opt in ("-o", "--output"):
+            output = arg
+
+    if dimension <= 0 or output is None:
+        print('othello_book.py -d <dimension> -o <book-file> [-p <plies> -l <depth-limit> -t <seconds>]')
+        sys.exit(2)
+
+    # Book moves come from alpha-beta searches to a fixed depth, or from
+    # iterative deepening for time_limit seconds per position
+    if time_limit:
+        search = lambda board, color: agent.select_move_iterative(board, color, time_limit, -1, 1)
+    else:
+        search = lambda board, color: agent.select_move_alphabeta(board, color, limit, 1, 1)
+
+    entries = build_book(dimension, plies, search, verbose=True)
+    write_book(output, dimension, entries)
+    print("Wrote {} positions to {}".format(len(entries), output))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
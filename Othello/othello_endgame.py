@@ -0,0 +1,153 @@
+"""
+Exact endgame solver for Othello.
+
+Once few squares are empty, the game can be searched to the end. The solver
+is a negamax alpha-beta search on a Board that returns the final disk
+difference for the player to move (the game ends as soon as the player to
+move has no legal move, like in othello_game). Moves are ordered with the
+best move of its own small transposition table first, then by fewest replies
+for the opponent (fastest-first) while many squares are empty, and by region
+parity (moves in a quadrant with an odd number of empty squares first) near
+the end.
+"""
+
+import time
+
+from othello_bitboard import bit_square, popcount
+from othello_transposition import EXACT, LOWER, UPPER, TranspositionTable, update_hash, zobrist_hash
+
+# Above this number of empty squares, moves are ordered fastest-first
+FASTEST_FIRST_EMPTIES = 7
+
+# The deadline is checked every this many nodes
+CHECK_INTERVAL = 1024
+
+# Keys: board dimension
+# Values: the bitboards of the four quadrants, used for parity ordering
+_regions = dict()
+
+
+class SolverTimeout(Exception):
+    pass
+
+
+def get_regions(dimension):
+    if dimension not in _regions:
+        half = dimension // 2
+        regions = [0, 0, 0, 0]
+        for j in range(dimension):
+            for i in range(dimension):
+                regions[(i >= half) * 2 + (j >= half)] |= 1 << (j * dimension + i)
+        _regions[dimension] = regions
+    return _regions[dimension]
+
+
+class EndgameSolver(object):
+    """
+    Solves positions exactly. The transposition table is kept between
+    searches, since later positions of the same game share most subtrees.
+    """
+
+    def __init__(self, table_size = 1 << 16):
+        self.tt = TranspositionTable(table_size)
+        self.deadline = None
+        self.nodes = 0
+
+    def select_move(self, board, player, deadline = None, exact = True):
+        """
+        Return (best_move, value) for player on board (a Board), where value
+        is the final disk difference for player with perfect play. If exact
+        is False, only win, draw or loss is determined (value is then only
+        correct in sign), which is faster.
+        Raises SolverTimeout if time.time() passes deadline.
+        """
+        self.deadline = deadline
+        self.nodes = 0
+        self.tt.new_search()
+        key = zobrist_hash(board, player)
+        if exact:
+            return self.search(board, player, key, float('-inf'), float('inf'), board.empty_count())
+        return self.search(board, player, key, -1, 1, board.empty_count())
+
+    def order_moves(self, board, player, moves, empties, best_move):
+        dimension = board.dimension
+        squares = []
+        while moves:
+            bit = moves & -moves
+            squares.append(bit)
+            moves ^= bit
+
+        # Quadrants with an odd number of empty squares
+        empty = ~(board.disks[1] | board.disks[2])
+        odd = 0
+        for region in get_regions(dimension):
+            if popcount(region & empty) & 1:
+                odd |= region
+
+        if empties > FASTEST_FIRST_EMPTIES:
+            scored = []
+            for bit in squares:
+                i, j = bit_square(bit, dimension)
+                board.make_move(player, i, j)
+                scored.append((board.mobility_count(3 - player), not bit & odd, (i, j)))
+                board.undo_move()
+            scored.sort()
+            ordered = [move for _, _, move in scored]
+        else:
+            ordered = [bit_square(bit, dimension) for bit in squares if bit & odd]
+            ordered += [bit_square(bit, dimension) for bit in squares if not bit & odd]
+
+        if best_move in ordered:
+            ordered.remove(best_move)
+            ordered.insert(0, best_move)
+        return ordered
+
+    def search(self, board, player, key, alpha, beta, empties):
+        """
+        Return (best_move, value) for player to move, with value the final
+        disk difference for player (a bound if it is outside (alpha, beta)).
+        """
+        self.nodes += 1
+        if self.deadline is not None and self.nodes % CHECK_INTERVAL == 0 and time.time() >= self.deadline:
+            raise SolverTimeout
+
+        opponent = 3 - player
+        moves = board.legal_moves(player)
+        if not moves:
+            # Game over
+            return None, board.counts[player] - board.counts[opponent]
+
+        best_move = None
+        entry = self.tt.probe(key)
+        if entry is not None:
+            _, _, flag, value, best_move, _ = entry
+            if flag == EXACT:
+                return best_move, value
+            if flag == LOWER and value >= beta:
+                return best_move, value
+            if flag == UPPER and value <= alpha:
+                return best_move, value
+
+        window = (alpha, beta)
+        max_value = float('-inf')
+        for move in self.order_moves(board, player, moves, empties, best_move):
+            flips = board.make_move(player, move[0], move[1])
+            nxt_key = update_hash(key, board.dimension, player, move[0], move[1], flips)
+            _, value = self.search(board, opponent, nxt_key, -beta, -alpha, empties - 1)
+            value = -value
+            board.undo_move()
+            if value > max_value:
+                best_move = move
+                max_value = value
+            alpha = max(alpha, max_value)
+            if alpha >= beta:
+                break
+
+        if max_value <= window[0]:
+            flag = UPPER
+        elif max_value >= window[1]:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.tt.store(key, empties, flag, max_value, best_move)
+        return best_move, max_value
@@ -7,9 +7,11 @@ players.
 Thanks to original author Daniel Bauer, Columbia University
 """
 import sys
+import select
 import subprocess
 from threading import Timer
-from othello_shared import find_lines, get_possible_moves, play_move, get_score
+from othello_shared import is_legal_move, get_possible_moves, play_move, get_score
+from othello_protocol import MOVE, decode_move, encode_board, encode_final, encode_update, parse_introduction, read_frame
 
 class InvalidMoveError(RuntimeError):
     pass
@@ -31,7 +33,10 @@ class AiPlayerInterface(Player):
 
     TIMEOUT = 10 
 
-    def __init__(self, filename, color, limit, minimax = False, caching = False, ordering = False):
+    # Seconds to wait for the AI to get ready for another game
+    PROTOCOL_TIMEOUT = 2
+
+    def __init__(self, filename, color, limit, minimax = False, caching = False, ordering = False, time_limit = None, workers = 1, heuristic = False, patterns = None, book = None, endgame = 0, binary = False, pool = None, ponder = False, pvs = False, stats = None, extra = None):
         
         #convert params to numbers 
         m = 0 
@@ -42,13 +47,39 @@ class AiPlayerInterface(Player):
         if ordering == True: o = 1
 
         self.color = color
-        self.process = subprocess.Popen(['python3',filename], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
-        name = self.process.stdout.readline().decode("ASCII").strip()
-        print("AI introduced itself as: {}".format(name))
+        self.filename = filename
+        self.pool = pool
+        idle = pool.acquire(filename) if pool is not None else None
+        if idle is not None: #reuse a process that finished its last game
+            self.process, name, version = idle
+        else:
+            self.process = subprocess.Popen(['python3',filename], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+            #the first line is the name, followed by the binary protocol version if the AI supports it
+            name, version = parse_introduction(self.process.stdout.readline().decode("ASCII"))
+            print("AI introduced itself as: {}".format(name))
         self.name = name
-        self.process.stdin.write((str(color) + "," + str(limit) + "," + str(m) + "," + str(c) + "," + str(o) + "\n").encode("ASCII"))
+        self.version = version
+        #optional name=value fields follow the five fixed ones
+        options = ""
+        if time_limit: options += ",time=" + str(time_limit)
+        if workers != 1: options += ",workers=" + str(workers)
+        if heuristic: options += ",heuristic=1"
+        if patterns: options += ",patterns=" + patterns
+        if book: options += ",book=" + book
+        if endgame: options += ",endgame=" + str(endgame)
+        if ponder: options += ",ponder=1"
+        if pvs: options += ",pvs=1"
+        if stats: options += ",stats=" + ("1" if stats is True else stats)
+        if extra: options += "".join(",{}={}".format(name, value) for name, value in extra.items()) #fields only some AIs know, e.g. playouts for mcts_ai.py
+        #use the binary protocol only if the AI said it supports it
+        self.protocol = version if binary else 0
+        if self.protocol: options += ",protocol=" + str(self.protocol)
+        if pool is not None and pool.reusable(filename): options += ",pool=1"
+        self.process.stdin.write((str(color) + "," + str(limit) + "," + str(m) + "," + str(c) + "," + str(o) + options + "\n").encode("ASCII"))
         self.process.stdin.flush()
 
+        self.sent = None # number of moves the AI knows about
+
     def timeout(self): 
         sys.stderr.write("{} timed out.".format(self.name))
         self.process.kill() 
@@ -57,6 +88,8 @@ class AiPlayerInterface(Player):
     def get_move(self, manager):
         white_score, dark_score = get_score(manager.board)
         print((white_score, dark_score))
+        if self.protocol:
+            return self.get_move_binary(manager, white_score, dark_score)
         self.process.stdin.write("SCORE {} {}\n".format(white_score, dark_score).encode("ASCII"))
         self.process.stdin.flush()
         self.process.stdin.write("{}\n".format(str(manager.board)).encode("ASCII"))
@@ -75,13 +108,85 @@ class AiPlayerInterface(Player):
         i = int(i_s)
         j = int(j_s)
         return i,j 
+
+    def get_move_binary(self, manager, white_score, dark_score):
+        #send the whole board the first time, then only the moves played since
+        if self.sent is None or len(manager.moves) - self.sent > 255:
+            frame = encode_board(white_score, dark_score, manager.board)
+        else:
+            moves = manager.moves[self.sent:]
+            frame = encode_update(white_score, dark_score, moves)
+        self.sent = len(manager.moves)
+        self.process.stdin.write(frame)
+        self.process.stdin.flush()
+
+        timer = Timer(AiPlayerInterface.TIMEOUT, lambda: self.timeout())
+        self.timed_out = False
+        timer.start()
+
+        # Wait for the AI call
+        try:
+            kind, payload = read_frame(self.process.stdout)
+        except EOFError:
+            raise AiTimeoutError
+        if self.timed_out:
+            raise AiTimeoutError
+        timer.cancel()
+        if kind != MOVE:
+            raise InvalidMoveError("Unexpected frame.")
+        return decode_move(payload)
     
     def kill(self,manager):
         white_score, dark_score = get_score(manager.board)
-        self.process.stdin.write("FINAL {} {}\n".format(white_score, dark_score).encode("ASCII"))
+        if self.protocol:
+            self.process.stdin.write(encode_final(white_score, dark_score))
+        else:
+            self.process.stdin.write("FINAL {} {}\n".format(white_score, dark_score).encode("ASCII"))
+        if self.pool is not None and self.pool.reusable(self.filename) and self.process.poll() is None:
+            #hand the process back to the pool if it is ready for another game
+            self.process.stdin.flush()
+            ready, _, _ = select.select([self.process.stdout], [], [], AiPlayerInterface.PROTOCOL_TIMEOUT)
+            if ready and self.process.stdout.readline().decode("ASCII").strip() == "READY":
+                self.pool.release(self.filename, self.process, self.name, self.version)
+                return
+            self.pool.unsupported.add(self.filename)
         self.process.kill() 
 
 
+class AiPlayerPool(object):
+    """
+    Keeps AI processes running between games, so that batches of games do not
+    start a new interpreter (and load its tables again) for every player.
+    Pass the pool to AiPlayerInterface; at the end of the game the process is
+    kept for the next player with the same file, if the AI answers READY.
+    AIs that do not answer are started for every game, like without a pool.
+    """
+
+    def __init__(self):
+        self.idle = dict() # file name -> list of (process, name, protocol version)
+        self.unsupported = set() # files of AIs that did not answer READY
+
+    def reusable(self, filename):
+        return filename not in self.unsupported
+
+    def acquire(self, filename):
+        processes = self.idle.get(filename, [])
+        while processes:
+            process, name, version = processes.pop()
+            if process.poll() is None:
+                return process, name, version
+        return None
+
+    def release(self, filename, process, name, version):
+        self.idle.setdefault(filename, []).append((process, name, version))
+
+    def close(self):
+        for processes in self.idle.values():
+            for process, name, version in processes:
+                process.kill()
+        self.idle = dict()
+
+
 class OthelloGameManager(object):
 
     def __init__(self, dimension = 6):
@@ -89,6 +194,7 @@ class OthelloGameManager(object):
         self.dimension = dimension
         self.board = self.create_initial_board()
         self.current_player = 1
+        self.moves = [] # (player, column, row) of every move played
             
     def create_initial_board(self):
         board = []
@@ -114,19 +220,25 @@ class OthelloGameManager(object):
             print(" ".join([str(x) for x in row]))
                    
     def play(self, i,j):
+        if not (0 <= i < self.dimension and 0 <= j < self.dimension):
+           raise InvalidMoveError("Square off the board.")
         if self.board[j][i] != 0:
            raise InvalidMoveError("Occupied square.")
-        lines = find_lines(self.board, i,j, self.current_player)
-        if not lines:  
+        if not is_legal_move(self.board, i,j, self.current_player):
            raise InvalidMoveError("Invalid Move.")
      
         self.board = play_move(self.board, self.current_player, i, j) 
+        self.moves.append((self.current_player, i, j))
         self.current_player = 1 if self.current_player == 2 else 2
 
     def get_possible_moves(self):
         return get_possible_moves(self.board, self.current_player)
 
-def play_game(game, player1, player2):
+def play_game(game, player1, player2, record = None):
+    """
+    Play a game between two players. If record is a GameRecordWriter (see
+    othello_records), the finished game is appended to it.
+    """
 
     players = [None, player1, player2]
 
@@ -147,9 +259,10 @@ def play_game(game, player1, player2):
                 game.play(i,j)
             except AiTimeoutError:
                 print("{} ({}) timed out!".format(player_obj.name, color))
-                print("FINAL: {} (dark) {}:{} {} (light)".format(player_obj.name, p1score, p2score, player2.name))
+                p1score, p2score = get_score(game.board)
+                print("FINAL: {} (dark) {}:{} {} (light)".format(player1.name, p1score, p2score, player2.name))
                 player1.kill(game)
                 player2.kill(game)
                 break
-
-
+    if record is not None:
+        record.write_game(game, player1.name, player2.name)
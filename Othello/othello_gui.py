@@ -132,17 +132,18 @@ def main(argv):
     ordering = False
     caching = False
     minimax = False        
+    time_limit = None
     agent1 = None
     agent2 = None
 
     try:
-        opts, args = getopt.getopt(argv,"hcmol:d:a:b:",["limit=","dimension=","agent1=","agent2="])
+        opts, args = getopt.getopt(argv,"hcmol:d:a:b:t:",["limit=","dimension=","agent1=","agent2=","time="])
     except getopt.GetoptError:
-        print('othello_gui.py -d <dimension> [-a <agentA> -b <agentB> -l <depth-limit> -c -o -m]')
+        print('othello_gui.py -d <dimension> [-a <agentA> -b <agentB> -l <depth-limit> -t <seconds> -c -o -m]')
         sys.exit(2)
     for opt, arg in opts:
         if opt == '-h':
-            print('othello_gui.py -d <dimension> -a <agentA> [-b <agentB> -l <depth-limit> -c -o]')
+            print('othello_gui.py -d <dimension> -a <agentA> [-b <agentB> -l <depth-limit> -t <seconds> -c -o]')
             sys.exit()
         elif opt in ("-d", "--dimension"):
             size = int(arg)
@@ -158,18 +159,20 @@ def main(argv):
             ordering = True   
         elif opt in ("-l", "--limit"):
             limit = int(arg)  
+        elif opt in ("-t", "--time"):
+            time_limit = float(arg)
 
     if size <= 0: #if no dimension provided
         print('Please provide a board size.')
-        print('othello_gui.py -d <dimension> [-a <agentA> -b <agentB> -l <depth-limit> -c -o]')
+        print('othello_gui.py -d <dimension> [-a <agentA> -b <agentB> -l <depth-limit> -t <seconds> -c -o]')
         sys.exit(2)  
 
     if agent1 != None and agent2 != None and size > 0:
-        p1 = AiPlayerInterface(agent1,1,limit,minimax,caching,ordering)
-        p2 = AiPlayerInterface(agent2,2,limit,minimax,caching,ordering)        
+        p1 = AiPlayerInterface(agent1,1,limit,minimax,caching,ordering,time_limit)
+        p2 = AiPlayerInterface(agent2,2,limit,minimax,caching,ordering,time_limit)        
     elif agent1 != None and size > 0:
         p1 = Player(1)
-        p2 = AiPlayerInterface(agent1,2,limit,minimax,caching,ordering)
+        p2 = AiPlayerInterface(agent1,2,limit,minimax,caching,ordering,time_limit)
     else: 
         p1 = Player(1)
         p2 = Player(2)
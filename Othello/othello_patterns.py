@@ -0,0 +1,278 @@
+"""
+Pattern-table (n-tuple) evaluation of Othello boards with NumPy.
+
+A pattern is an ordered tuple of squares: a row or column, a diagonal, an edge
+with its two X-squares or a 3x3 corner region. The contents of the squares
+(empty, own disk, opponent disk) form a ternary number, which indexes a table
+of weights. All rotations and reflections of a pattern share one table, and
+the value of a board is the sum of the table entries of all its patterns.
+Every oriented instance is kept, also those that cover the squares of
+another instance in reverse order, so that boards that are rotations or
+reflections of each other get the same value whatever the tables hold
+(symmetric caching in agent.py relies on this).
+
+All tables are stored in one flat float32 array. Evaluating boards is one
+gather per pattern for every board at once, so evaluate_batch scores a whole
+set of sibling positions in one call.
+
+Weights are saved in a compact binary file: the magic bytes b"OTPW", the
+format version and the board dimension as two little-endian uint32, followed
+by the flat table as little-endian float32.
+"""
+
+import sys, getopt
+import struct
+
+import numpy as np
+
+from othello_bitboard import Board, to_bitboards
+
+MAGIC = b"OTPW"
+VERSION = 1
+
+# Longer lines are left out, their tables would get too large (3^n entries)
+MAX_PATTERN_LENGTH = 12
+
+# Square weights used to build the default tables, the same values that
+# compute_heuristic in agent.py uses
+CORNER_WEIGHT = 500
+NEAR_CORNER_WEIGHT = -50
+EDGE_WEIGHT = 50
+
+
+def symmetries(dimension):
+    """
+    Return the 8 rotations and reflections of the board as functions of (i,j).
+    """
+    d = dimension - 1
+    return [lambda i, j: (i, j), lambda i, j: (d - i, j), lambda i, j: (i, d - j), lambda i, j: (d - i, d - j),
+            lambda i, j: (j, i), lambda i, j: (d - j, i), lambda i, j: (j, d - i), lambda i, j: (d - j, d - i)]
+
+
+def base_patterns(dimension):
+    """
+    Return one instance of every pattern family as a list of (column,row)
+    squares.
+    """
+    d = dimension
+    families = []
+    # Rows, by distance to the edge
+    for k in range(d // 2):
+        families.append([(i, k) for i in range(d)])
+    # Diagonals of length 3 and more
+    for length in range(3, d + 1):
+        families.append([(d - length + k, k) for k in range(length)])
+    if d >= 4:
+        # Edge with the two X-squares
+        families.append([(i, 0) for i in range(d)] + [(1, 1), (d - 2, 1)])
+    if d >= 6:
+        # 3x3 corner region
+        families.append([(i, j) for j in range(3) for i in range(3)])
+    return [squares for squares in families if len(squares) <= MAX_PATTERN_LENGTH]
+
+
+class PatternLayout(object):
+    """
+    The patterns of one board dimension as index arrays.
+
+    squares[p] holds the square indices of pattern instance p, padded with
+    the index of an extra always-empty square; powers[p] holds the matching
+    powers of 3 (0 for padding) and offsets[p] the start of its family's table
+    in the flat weight array. families lists the base instance of each family
+    and family_offsets where its table starts.
+    """
+
+    def __init__(self, dimension):
+        self.dimension = dimension
+        self.families = base_patterns(dimension)
+        transforms = symmetries(dimension)
+        width = max(len(squares) for squares in self.families)
+        padding = dimension * dimension
+
+        squares = []
+        powers = []
+        offsets = []
+        self.family_offsets = []
+        offset = 0
+        for family in self.families:
+            self.family_offsets.append(offset)
+            seen = set()
+            for transform in transforms:
+                instance = tuple(transform(i, j) for (i, j) in family)
+                if instance in seen:
+                    continue
+                seen.add(instance)
+                indices = [j * dimension + i for (i, j) in instance]
+                squares.append(indices + [padding] * (width - len(indices)))
+                powers.append([3 ** k for k in range(len(indices))] + [0] * (width - len(indices)))
+                offsets.append(offset)
+            offset += 3 ** len(family)
+        self.size = offset
+        self.squares = np.array(squares, dtype=np.intp)
+        self.powers = np.array(powers, dtype=np.int64)
+        self.offsets = np.array(offsets, dtype=np.int64)
+
+    def indices(self, cells):
+        """
+        Return the table index of every pattern instance of every board.
+        cells is an (N, dimension * dimension + 1) array with 0 for empty,
+        1 for own and 2 for opponent squares (the last column is padding).
+        """
+        return (cells[:, self.squares] * self.powers).sum(axis=2) + self.offsets
+
+
+def default_weights(layout):
+    """
+    Build tables that score a board like a weighted disk count: corners,
+    squares next to corners and other edge squares weighted like
+    compute_heuristic, all other squares 1. Each square's weight is split
+    across the patterns covering it.
+    """
+    d = layout.dimension
+    square_weights = np.ones(d * d + 1)
+    square_weights[d * d] = 0
+    if d >= 4:
+        for (i, j) in [(0, 0), (d - 1, 0), (0, d - 1), (d - 1, d - 1)]:
+            square_weights[j * d + i] = CORNER_WEIGHT
+        for (i, j) in [(1, 0), (0, 1), (1, d - 1), (d - 1, 1), (0, d - 2), (d - 2, 0), (d - 1, d - 2), (d - 2, d - 1)]:
+            square_weights[j * d + i] = NEAR_CORNER_WEIGHT
+        for k in range(2, d - 2):
+            for (i, j) in [(0, k), (k, 0), (k, d - 1), (d - 1, k)]:
+                square_weights[j * d + i] = EDGE_WEIGHT
+    coverage = np.bincount(layout.squares.ravel(), minlength=d * d + 1).astype(np.float64)
+    coverage[coverage == 0] = 1
+    share = square_weights / coverage
+
+    weights = np.zeros(layout.size, dtype=np.float32)
+    for family, offset in zip(layout.families, layout.family_offsets):
+        n = len(family)
+        entries = np.arange(3 ** n)
+        digits = (entries[:, None] // (3 ** np.arange(n))) % 3
+        signs = np.where(digits == 1, 1.0, np.where(digits == 2, -1.0, 0.0))
+        family_share = share[[j * d + i for (i, j) in family]]
+        weights[offset:offset + 3 ** n] = signs @ family_share
+    return weights
+
+
+def bitboards_to_cells(owns, opps, dimension):
+    """
+    Convert lists of own and opponent bitboards to an (N, dimension *
+    dimension + 1) cell array (see PatternLayout.indices).
+    """
+    n = dimension * dimension
+    length = (n + 8) // 8
+    own_bytes = b"".join(own.to_bytes(length, "little") for own in owns)
+    opp_bytes = b"".join(opp.to_bytes(length, "little") for opp in opps)
+    own_bits = np.unpackbits(np.frombuffer(own_bytes, dtype=np.uint8).reshape(-1, length), axis=1, bitorder="little")
+    opp_bits = np.unpackbits(np.frombuffer(opp_bytes, dtype=np.uint8).reshape(-1, length), axis=1, bitorder="little")
+    cells = own_bits[:, :n + 1].astype(np.int64) + 2 * opp_bits[:, :n + 1]
+    cells[:, n] = 0
+    return cells
+
+
+class PatternEvaluator(object):
+    """
+    Scores boards for a player as the sum of the pattern table entries.
+    """
+
+    def __init__(self, dimension, weights = None):
+        self.layout = PatternLayout(dimension)
+        if weights is None:
+            weights = default_weights(self.layout)
+        weights = np.asarray(weights, dtype=np.float32)
+        if weights.shape != (self.layout.size,):
+            raise ValueError("expected {} weights for dimension {}, got {}".format(self.layout.size, dimension, weights.size))
+        self.weights = weights
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            header = f.read(12)
+            if len(header) != 12 or header[:4] != MAGIC:
+                raise ValueError("{} is not a pattern weight file".format(path))
+            version, dimension = struct.unpack("<II", header[4:])
+            if version != VERSION:
+                raise ValueError("unsupported pattern weight file version {}".format(version))
+            weights = np.frombuffer(f.read(), dtype="<f4")
+        return cls(dimension, weights)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(MAGIC + struct.pack("<II", VERSION, self.layout.dimension))
+            f.write(self.weights.astype("<f4").tobytes())
+
+    def evaluate_cells(self, cells):
+        """
+        Return the values of an (N, dimension * dimension + 1) cell array.
+        """
+        return self.weights[self.layout.indices(cells)].sum(axis=1, dtype=np.float64)
+
+    def evaluate_bitboards(self, owns, opps):
+        """
+        Return the values of N boards given as lists of own and opponent
+        bitboards.
+        """
+        return self.evaluate_cells(bitboards_to_cells(owns, opps, self.layout.dimension))
+
+    def evaluate_batch(self, boards, color):
+        """
+        Return the values for color of N boards, given as an (N, d, d) array
+        or a list of tuple boards or Boards.
+        """
+        if isinstance(boards, np.ndarray):
+            boards = boards.reshape(len(boards), -1)
+            n = boards.shape[1]
+            cells = np.zeros((len(boards), n + 1), dtype=np.int64)
+            cells[:, :n] = np.where(boards == color, 1, np.where(boards == 3 - color, 2, 0))
+            return self.evaluate_cells(cells)
+        owns = []
+        opps = []
+        for board in boards:
+            dark, light = to_bitboards(board)
+            owns.append(dark if color == 1 else light)
+            opps.append(light if color == 1 else dark)
+        return self.evaluate_bitboards(owns, opps)
+
+    def evaluate(self, board, color):
+        """
+        Return the value of one tuple board or Board for color. Can be used
+        in place of compute_heuristic.
+        """
+        if isinstance(board, Board):
+            own, opp = board.disks[color], board.disks[3 - color]
+        else:
+            dark, light = to_bitboards(board)
+            own, opp = (dark, light) if color == 1 else (light, dark)
+        return float(self.evaluate_bitboards([own], [opp])[0])
+
+
+def main(argv):
+    dimension = 0
+    output = None
+
+    try:
+        opts, args = getopt.getopt(argv,"hd:o:",["dimension=","output="])
+    except getopt.GetoptError:
+        print('othello_patterns.py -d <dimension> -o <weight-file>')
+        sys.exit(2)
+    for opt, arg in opts:
+        if opt == '-h':
+            print('othello_patterns.py -d <dimension> -o <weight-file>')
+            sys.exit()
+        elif opt in ("-d", "--dimension"):
+            dimension = int(arg)
+        elif opt in ("-o", "--output"):
+            output = arg
+
+    if dimension <= 0 or output is None:
+        print('othello_patterns.py -d <dimension> -o <weight-file>')
+        sys.exit(2)
+
+    # Write the default tables, as a starting point for tuning
+    evaluator = PatternEvaluator(dimension)
+    evaluator.save(output)
+    print("Wrote {} weights for dimension {} to {}".format(evaluator.layout.size, dimension, output))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Multi-ProbCut: selective search with calibrated cut thresholds.
+
+The value of a deep search is well predicted by the value of a shallow
+search of the same position: deep = a * shallow + b, with residuals that
+are roughly normal with deviation sigma. Before searching a node to depth d
+with the window (alpha, beta), the agent searches it to a shallow depth s
+with a null window; if the prediction is above beta (or below alpha) by
+more than threshold * sigma, the deep search would almost certainly fail
+high (low), and the node returns beta (alpha) without it. Every depth has
+checks at several shallow depths (see shallow_depths), cheapest first, and
+a, b and sigma are fitted separately for every stage of the game, because
+evaluations get more reliable towards the end. Searches deeper than the
+calibration reuse the checks of its deepest depth.
+
+The thresholds depend on the evaluation function, so they are calibrated
+from the searches themselves. log searches positions from game records (see
+othello_records) to every depth up to a limit with the agent, set up with
+the given evaluation, and appends one JSON line per position with the value
+at every depth for the player to move. fit fits the linear model of every
+(stage, depth, shallow depth) pair to the logged values by least squares and
+writes the cut table as JSON, which the agent loads with a probcut=<file>
+field.
+"""
+
+import sys, getopt
+import json
+import multiprocessing
+import random
+import time
+
+# Shallowest depth that is cut, and the deepest logged by default
+MIN_DEPTH = 3
+MAX_DEPTH = 6
+
+# Game stages, by the number of disks on the board
+STAGES = 4
+
+# Default threshold, in standard deviations of the prediction
+THRESHOLD = 1.5
+
+# Pairs with fewer samples in a stage are fitted on all stages together
+MIN_SAMPLES = 30
+
+
+def shallow_depths(depth):
+    """
+    Return the shallow depths checked before a search to depth, cheapest
+    first. They have the parity of depth: Othello evaluations swing with the
+    player to move at the leaves.
+    """
+    return tuple(shallow for shallow in (depth - 4, depth - 2) if shallow >= 1)
+
+
+def get_stage(dimension, empties):
+    squares = dimension * dimension
+    return min(STAGES - 1, (squares - empties) * STAGES // squares)
+
+
+class ProbCut(object):
+    """
+    Cut table for one board dimension and evaluation: checks[(stage, depth)]
+    is the list of (shallow depth, a, b, threshold * sigma) to try before a
+    search to depth.
+    """
+
+    def __init__(self, dimension, threshold = THRESHOLD, evaluation = "", pairs = (), path = None):
+        self.path = path
+        self.dimension = dimension
+        self.threshold = threshold
+        self.evaluation = evaluation
+        # (stage, depth, shallow, a, b, sigma, samples)
+        self.pairs = list(pairs)
+        self.checks = dict()
+        for stage, depth, shallow, a, b, sigma, _ in sorted(self.pairs, key=lambda pair: pair[:3]):
+            # A prediction that does not grow with the shallow value is no use
+            if a > 0:
+                self.checks.setdefault((stage, depth), []).append((shallow, a, b, threshold * sigma))
+        # Shallowest depth with checks, so that the search can skip the rest
+        self.min_depth = min([depth for _, depth in self.checks] or [float('inf')])
+        self.max_depth = max([depth for _, depth in self.checks] or [0])
+
+    def get_checks(self, empties, depth):
+        """
+        Return the checks before a search to depth. Searches deeper than any
+        calibrated depth use the checks of the deepest one, with the shallow
+        searches as many plies short of depth.
+        """
+        key = (get_stage(self.dimension, empties), depth)
+        checks = self.checks.get(key)
+        if checks is None:
+            if depth <= self.max_depth:
+                return ()
+            extra = depth - self.max_depth
+            checks = [(shallow + extra, a, b, margin)
+                      for shallow, a, b, margin in self.checks.get((key[0], self.max_depth), ())]
+            self.checks[key] = checks
+        return checks
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump({"dimension": self.dimension, "threshold": self.threshold, "evaluation": self.evaluation,
+                       "pairs": [{"stage": stage, "depth": depth, "shallow": shallow, "a": a, "b": b, "sigma": sigma,
+                                  "samples": samples}
+                                 for stage, depth, shallow, a, b, sigma, samples in self.pairs]}, f, indent=1)
+            f.write("\n")
+
+
+def load_probcut(path, threshold = None):
+    """
+    Load a cut table written by fit, with its own threshold unless another
+    one is given.
+    """
+    with open(path) as f:
+        saved = json.load(f)
+    pairs = [(pair["stage"], pair["depth"], pair["shallow"], pair["a"], pair["b"], pair["sigma"], pair["samples"])
+             for pair in saved["pairs"]]
+    return ProbCut(saved["dimension"], saved["threshold"] if threshold is None else threshold,
+                   saved.get("evaluation", ""), pairs, path)
+
+
+############ LOGGING SEARCH PAIRS ##########################
+
+def sample_positions(paths, count, seed = 0):
+    """
+    Return up to count (board, player) positions, drawn at random from all
+    positions of the games in the record files where the player to move has
+    a move.
+    """
+    from othello_records import read_games
+
+    positions = []
+    for path in paths:
+        for record in read_games(path):
+            for _, board, player, move in record.replay():
+                if move is not None:
+                    positions.append((board, player))
+    rng = random.Random(seed)
+    if len(positions) > count:
+        positions = rng.sample(positions, count)
+    return positions
+
+
+def search_values(args):
+    """
+    Search one position to every depth from 0 to max_depth, with the agent
+    set up for the evaluation spec, and return its log record.
+    """
+    board, player, max_depth, evaluation = args
+    import agent
+    import othello_tournament
+    from othello_bitboard import Board
+
+    othello_tournament.set_evaluation(othello_tournament.parse_config(evaluation), len(board))
+    agent.probcut = None
+    # Depths are searched in increasing order, so that the table only holds
+    # shallower results, which order moves but never settle a deeper search
+    agent.tt.clear()
+    values = []
+    for depth in range(max_depth + 1):
+        _, value = agent.negamax_node(Board.from_tuple(board), player, player, float('-inf'), float('inf'),
+                                      depth, 1, 1)
+        values.append(value)
+    return {"dimension": len(board), "evaluation": evaluation, "empties": sum(row.count(0) for row in board),
+            "values": values}
+
+
+def log_pairs(positions, output, max_depth = MAX_DEPTH, evaluation = "", workers = None):
+    """
+    Search every position on a pool of worker processes and append the
+    values to the output file as JSON lines. Returns the number written.
+    """
+    tasks = [(board, player, max_depth, evaluation) for board, player in positions]
+    count = 0
+    pool = multiprocessing.Pool(workers)
+    try:
+        with open(output, "a") as f:
+            for record in pool.imap_unordered(search_values, tasks):
+                f.write(json.dumps(record) + "\n")
+                f.flush()
+                count += 1
+    finally:
+        pool.terminate()
+    return count
+
+
+def read_log(paths):
+    records = []
+    for path in paths:
+        with open(path) as f:
+            records += [json.loads(line) for line in f if line.strip()]
+    return records
+
+
+############ FITTING ##########################
+
+def fit_line(samples):
+    """
+    Return (a, b, sigma) of the least-squares line deep = a * shallow + b
+    through the (shallow, deep) samples, sigma being the deviation of the
+    residuals.
+    """
+    n = len(samples)
+    mean_x = sum(x for x, _ in samples) / n
+    mean_y = sum(y for _, y in samples) / n
+    sxx = sum((x - mean_x) ** 2 for x, _ in samples)
+    sxy = sum((x - mean_x) * (y - mean_y) for x, y in samples)
+    a = sxy / sxx if sxx > 0 else 0.0
+    b = mean_y - a * mean_x
+    sigma = (sum((y - a * x - b) ** 2 for x, y in samples) / max(1, n - 2)) ** 0.5
+    return a, b, sigma
+
+
+def fit_probcut(records, threshold = THRESHOLD):
+    """
+    Fit the cut table to logged records (all of one dimension and
+    evaluation) and return it as a ProbCut.
+    """
+    dimensions = set(record["dimension"] for record in records)
+    evaluations = set(record["evaluation"] for record in records)
+    if len(dimensions) != 1 or len(evaluations) != 1:
+        raise ValueError("logged searches mix dimensions {} or evaluations {}".format(sorted(dimensions), sorted(evaluations)))
+    dimension = dimensions.pop()
+
+    pairs = []
+    max_depth = max(len(record["values"]) for record in records) - 1
+    for depth in range(MIN_DEPTH, max_depth + 1):
+        for shallow in shallow_depths(depth):
+            by_stage = [[] for _ in range(STAGES)]
+            for record in records:
+                values = record["values"]
+                if len(values) > depth:
+                    by_stage[get_stage(dimension, record["empties"])].append((values[shallow], values[depth]))
+            pooled = [sample for samples in by_stage for sample in samples]
+            if len(pooled) < MIN_SAMPLES:
+                continue
+            pooled_fit = fit_line(pooled)
+            for stage, samples in enumerate(by_stage):
+                a, b, sigma = fit_line(samples) if len(samples) >= MIN_SAMPLES else pooled_fit
+                pairs.append((stage, depth, shallow, a, b, sigma, len(samples)))
+    return ProbCut(dimension, threshold, evaluations.pop(), pairs)
+
+
+############ COMMAND LINE ##########################
+
+def main(argv):
+    usage = ('othello_probcut.py log -i <game-records> [-i <game-records> ...] -o <pairs.jsonl> '
+             '[-n <positions> -m <max-depth> -e <evaluation> -w <workers> -s <seed>]\n'
+             'othello_probcut.py fit -i <pairs.jsonl> [-i <pairs.jsonl> ...] -o <probcut.json> [-t <threshold>]')
+    if not argv or argv[0] not in ("log", "fit"):
+        print(usage)
+        sys.exit(2)
+    command = argv[0]
+
+    inputs = []
+    output = None
+    count = 200
+    max_depth = MAX_DEPTH
+    evaluation = ""
+    workers = None
+    seed = 0
+    threshold = THRESHOLD
+
+    try:
+        opts, args = getopt.getopt(argv[1:],"hi:o:n:m:e:w:s:t:",["input=","output=","positions=","max-depth=",
+                                   "evaluation=","workers=","seed=","threshold="])
+    except getopt.GetoptError:
+        print(usage)
+        sys.exit(2)
+    for opt, arg in opts:
+        if opt == '-h':
+            print(usage)
+            sys.exit()
+        elif opt in ("-i", "--input"):
+            inputs.append(arg)
+        elif opt in ("-o", "--output"):
+            output = arg
+        elif opt in ("-n", "--positions"):
+            count = int(arg)
+        elif opt in ("-m", "--max-depth"):
+            max_depth = int(arg)
+        elif opt in ("-e", "--evaluation"):
+            evaluation = arg
+        elif opt in ("-w", "--workers"):
+            workers = int(arg)
+        elif opt in ("-s", "--seed"):
+            seed = int(arg)
+        elif opt in ("-t", "--threshold"):
+            threshold = float(arg)
+
+    if output is None or not inputs or max_depth < MIN_DEPTH:
+        print(usage)
+        sys.exit(2)
+
+    start = time.time()
+    if command == "log":
+        positions = sample_positions(inputs, count, seed)
+        written = log_pairs(positions, output, max_depth, evaluation, workers)
+        print("Logged searches of {} positions to depth {} in {} in {:.1f}s".format(written, max_depth, output, time.time() - start))
+        return
+
+    probcut = fit_probcut(read_log(inputs), threshold)
+    print("{:>5} {:>5} {:>7} {:>8} {:>8} {:>8} {:>7}".format("stage", "depth", "shallow", "a", "b", "sigma", "samples"))
+    for stage, depth, shallow, a, b, sigma, samples in sorted(probcut.pairs):
+        print("{:5d} {:5d} {:7d} {:8.3f} {:8.2f} {:8.2f} {:7d}".format(stage, depth, shallow, a, b, sigma, samples))
+    probcut.save(output)
+    print("Wrote {} in {:.1f}s".format(output, time.time() - start))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
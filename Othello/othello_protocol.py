@@ -0,0 +1,145 @@
+"""
+Compact binary protocol between the game manager and AI players.
+
+The text protocol sends "SCORE <dark> <light>" and the board as a Python
+literal for every move, and reads the move back as "<column> <row>". An AI
+that supports the binary protocol says so on the first line it prints, after
+its name: "<name>,protocol=<version>" (see introduction). If the manager
+wants the binary protocol, it then adds a protocol=<version> field with the
+version both support to the first line it sends, and both sides switch to
+binary frames. AIs that print only their name keep using the text protocol.
+The manager never has to wait for an answer that may not come.
+
+A frame is a header of one type byte and a little-endian uint16 payload
+length, followed by the payload:
+
+  BOARD   dark score, light score (uint16 each), dimension (uint8), dark and
+          light bitboards (ceil(dimension * dimension / 8) bytes each,
+          little-endian)
+  UPDATE  dark score, light score (uint16 each), number of moves (uint8) and
+          (player, column, row) bytes for every move played since the last
+          BOARD or UPDATE sent to this AI
+  FINAL   dark score, light score (uint16 each); the game is over
+  MOVE    column, row (uint8 each); the move chosen by the AI
+"""
+
+import struct
+
+from othello_bitboard import Board, to_bitboards
+
+VERSION = 1
+
+# Frame types
+BOARD = 1
+UPDATE = 2
+FINAL = 3
+MOVE = 4
+
+HEADER = struct.Struct("<BH")
+SCORES = struct.Struct("<HH")
+
+
+def introduction(name):
+    """
+    Return the first line of an AI that supports the binary protocol.
+    """
+    return "{},protocol={}".format(name, VERSION)
+
+
+def parse_introduction(line):
+    """
+    Return (name, version) from the first line of an AI, version being the
+    highest binary protocol version both sides support (0 for text).
+    """
+    fields = line.strip().split(",")
+    options = dict(field.split("=", 1) for field in fields[1:] if "=" in field)
+    try:
+        version = min(int(options.get("protocol", 0)), VERSION)
+    except ValueError:
+        version = 0
+    return fields[0], version
+
+
+def encode_frame(kind, payload):
+    return HEADER.pack(kind, len(payload)) + payload
+
+
+def read_exactly(stream, size):
+    data = b""
+    while len(data) < size:
+        chunk = stream.read(size - len(data))
+        if not chunk:
+            raise EOFError("stream closed")
+        data += chunk
+    return data
+
+
+def read_frame(stream):
+    """
+    Read one frame from a binary stream and return (type, payload).
+    """
+    kind, length = HEADER.unpack(read_exactly(stream, HEADER.size))
+    return kind, read_exactly(stream, length)
+
+
+def bitboard_size(dimension):
+    return (dimension * dimension + 7) // 8
+
+
+def encode_board(dark_score, light_score, board):
+    dimension = len(board)
+    dark, light = to_bitboards(board)
+    size = bitboard_size(dimension)
+    payload = SCORES.pack(dark_score, light_score) + bytes((dimension,))
+    return encode_frame(BOARD, payload + dark.to_bytes(size, "little") + light.to_bytes(size, "little"))
+
+
+def decode_board(payload):
+    """
+    Return (dark score, light score, Board) from a BOARD payload.
+    """
+    dark_score, light_score = SCORES.unpack_from(payload)
+    dimension = payload[SCORES.size]
+    size = bitboard_size(dimension)
+    start = SCORES.size + 1
+    dark = int.from_bytes(payload[start:start + size], "little")
+    light = int.from_bytes(payload[start + size:start + 2 * size], "little")
+    return dark_score, light_score, Board(dark, light, dimension)
+
+
+def encode_update(dark_score, light_score, moves):
+    """
+    moves is a list of (player, column, row) tuples, at most 255.
+    """
+    payload = SCORES.pack(dark_score, light_score) + bytes((len(moves),))
+    for move in moves:
+        payload += bytes(move)
+    return encode_frame(UPDATE, payload)
+
+
+def decode_update(payload):
+    """
+    Return (dark score, light score, list of (player, column, row)) from an
+    UPDATE payload.
+    """
+    dark_score, light_score = SCORES.unpack_from(payload)
+    count = payload[SCORES.size]
+    start = SCORES.size + 1
+    moves = [tuple(payload[start + 3 * k:start + 3 * k + 3]) for k in range(count)]
+    return dark_score, light_score, moves
+
+
+def encode_final(dark_score, light_score):
+    return encode_frame(FINAL, SCORES.pack(dark_score, light_score))
+
+
+def decode_scores(payload):
+    return SCORES.unpack_from(payload)
+
+
+def encode_move(i, j):
+    return encode_frame(MOVE, bytes((i, j)))
+
+
+def decode_move(payload):
+    return payload[0], payload[1]
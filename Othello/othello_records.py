@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compact binary game records, with replay and a position index.
+
+A record file holds the magic bytes b"OTGR" and the format version as a
+little-endian uint32, followed by one record per game:
+
+  dimension (uint8), dark score, light score, number of moves (uint16 each),
+  length of the dark and light player names (uint8 each), the names in
+  UTF-8, and one byte per move: j * dimension + i for column i and row j
+
+There are no passes (the game ends when the player to move cannot move, like
+in othello_game), so the player of every move follows from its ply. Records
+are appended as games finish; read_games streams them back without loading
+the file, and GameRecord.replay replays a game through play_move.
+
+An index file maps positions to where they occurred. It holds the magic
+bytes b"OTGI", the format version and the number of games as little-endian
+uint32, the byte offset of every game in the record file as uint64, and then
+14 byte entries sorted by position: the Zobrist hash of the board with the
+player to move (see othello_transposition) as uint64, the game number as
+uint32 and the ply as uint16 (0 is the starting position). GameIndex
+memory-maps it and finds all occurrences of a position by binary search, like
+OpeningBook.
+"""
+
+import sys, getopt
+import mmap
+import struct
+import time
+
+from othello_bitboard import Board, get_score, play_move
+from othello_game import OthelloGameManager
+from othello_transposition import update_hash, zobrist_hash
+
+MAGIC = b"OTGR"
+INDEX_MAGIC = b"OTGI"
+VERSION = 1
+
+FILE_HEADER_SIZE = 8
+RECORD_HEADER = struct.Struct("<BHHHBB")
+INDEX_HEADER_SIZE = 12
+ENTRY = struct.Struct("<QIH")
+
+# Moves are stored in one byte
+MAX_DIMENSION = 16
+
+
+class GameRecord(object):
+    """
+    One game: board dimension, player names, final scores and the list of
+    (column,row) moves. offset is where the record starts in its file.
+    """
+
+    __slots__ = ("dimension", "dark", "light", "dark_score", "light_score", "moves", "offset")
+
+    def __init__(self, dimension, dark, light, dark_score, light_score, moves, offset = None):
+        self.dimension = dimension
+        self.dark = dark
+        self.light = light
+        self.dark_score = dark_score
+        self.light_score = light_score
+        self.moves = moves
+        self.offset = offset
+
+    def initial_board(self):
+        return tuple(tuple(row) for row in OthelloGameManager(self.dimension).board)
+
+    def replay(self):
+        """
+        Yield (ply, board, player, move) for every move, where board is the
+        tuple board before player plays move, and finally (ply, board, player,
+        None) for the position the game ended in.
+        """
+        board = self.initial_board()
+        player = 1
+        for ply, (i, j) in enumerate(self.moves):
+            yield ply, board, player, (i, j)
+            board = play_move(board, player, i, j)
+            player = 3 - player
+        yield len(self.moves), board, player, None
+
+    def hashes(self):
+        """
+        Yield (ply, hash) for every position of the game, including the last,
+        updating the hash move by move on a Board.
+        """
+        initial = self.initial_board()
+        board = Board.from_tuple(initial)
+        key = zobrist_hash(initial, 1)
+        player = 1
+        yield 0, key
+        for ply, (i, j) in enumerate(self.moves):
+            flips = board.make_move(player, i, j)
+            key = update_hash(key, self.dimension, player, i, j, flips)
+            player = 3 - player
+            yield ply + 1, key
+
+
+def encode_record(dimension, dark, light, dark_score, light_score, moves):
+    if dimension > MAX_DIMENSION:
+        raise ValueError("game records support boards up to {0}x{0}".format(MAX_DIMENSION))
+    dark = dark.encode("UTF-8")[:255]
+    light = light.encode("UTF-8")[:255]
+    header = RECORD_HEADER.pack(dimension, dark_score, light_score, len(moves), len(dark), len(light))
+    return header + dark + light + bytes(j * dimension + i for i, j in moves)
+
+
+class GameRecordWriter(object):
+    """
+    Appends game records to a file, creating it if needed.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "ab")
+        if self.file.tell() == 0:
+            self.file.write(MAGIC + struct.pack("<I", VERSION))
+
+    def write(self, dimension, dark, light, dark_score, light_score, moves):
+        """
+        Append one game; moves is a list of (column,row) moves.
+        """
+        self.file.write(encode_record(dimension, dark, light, dark_score, light_score, moves))
+        self.file.flush()
+
+    def write_game(self, manager, dark, light):
+        """
+        Append the game of an OthelloGameManager.
+        """
+        dark_score, light_score = get_score(manager.board)
+        self.write(manager.dimension, dark, light, dark_score, light_score, [(i, j) for _, i, j in manager.moves])
+
+    def close(self):
+        self.file.close()
+
+
+def read_exactly(f, size):
+    data = f.read(size)
+    if len(data) != size:
+        raise ValueError("truncated game record in {}".format(f.name))
+    return data
+
+
+def read_record(f):
+    """
+    Read the record at the current position of f, or return None at the end
+    of the file.
+    """
+    offset = f.tell()
+    header = f.read(RECORD_HEADER.size)
+    if not header:
+        return None
+    if len(header) != RECORD_HEADER.size:
+        raise ValueError("truncated game record in {}".format(f.name))
+    dimension, dark_score, light_score, count, dark_length, light_length = RECORD_HEADER.unpack(header)
+    names = read_exactly(f, dark_length + light_length)
+    moves = [(square % dimension, square // dimension) for square in read_exactly(f, count)]
+    return GameRecord(dimension, names[:dark_length].decode("UTF-8"), names[dark_length:].decode("UTF-8"),
+                      dark_score, light_score, moves, offset)
+
+
+def open_records(path):
+    f = open(path, "rb")
+    header = f.read(FILE_HEADER_SIZE)
+    if len(header) != FILE_HEADER_SIZE or header[:4] != MAGIC:
+        f.close()
+        raise ValueError("{} is not a game record file".format(path))
+    version, = struct.unpack("<I", header[4:])
+    if version != VERSION:
+        f.close()
+        raise ValueError("unsupported game record version {}".format(version))
+    return f
+
+
+def read_games(path):
+    """
+    Yield the GameRecords of a file one by one.
+    """
+    with open_records(path) as f:
+        while True:
+            record = read_record(f)
+            if record is None:
+                return
+            yield record
+
+
+def read_game(path, offset):
+    """
+    Return the GameRecord that starts at offset in the file.
+    """
+    with open_records(path) as f:
+        f.seek(offset)
+        return read_record(f)
+
+
+############ POSITION INDEX ##########################
+
+def build_index(records_path, index_path):
+    """
+    Index every position of every game in a record file, and return the
+    number of games and positions. Needs NumPy to sort the entries.
+    """
+    import numpy as np
+
+    offsets = []
+    keys = []
+    games = []
+    plies = []
+    for game, record in enumerate(read_games(records_path)):
+        offsets.append(record.offset)
+        for ply, key in record.hashes():
+            keys.append(key)
+            games.append(game)
+            plies.append(ply)
+
+    entries = np.empty(len(keys), dtype=[("key", "<u8"), ("game", "<u4"), ("ply", "<u2")])
+    entries["key"] = np.array(keys, dtype=np.uint64)
+    entries["game"] = games
+    entries["ply"] = plies
+    entries.sort(order=["key", "game", "ply"], kind="stable")
+    with open(index_path, "wb") as f:
+        f.write(INDEX_MAGIC + struct.pack("<II", VERSION, len(offsets)))
+        f.write(np.array(offsets, dtype="<u8").tobytes())
+        f.write(entries.tobytes())
+    return len(offsets), len(entries)
+
+
+class GameIndex(object):
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.data) < INDEX_HEADER_SIZE or self.data[:4] != INDEX_MAGIC:
+            raise ValueError("{} is not a game index".format(path))
+        version, self.games = struct.unpack("<II", self.data[4:INDEX_HEADER_SIZE])
+        if version != VERSION:
+            raise ValueError("unsupported game index version {}".format(version))
+        self.entries_start = INDEX_HEADER_SIZE + 8 * self.games
+        self.size = (len(self.data) - self.entries_start) // ENTRY.size
+
+    def __len__(self):
+        return self.size
+
+    def game_offset(self, game):
+        """
+        Return the offset of a game in the record file (see read_game).
+        """
+        start = INDEX_HEADER_SIZE + 8 * game
+        return int.from_bytes(self.data[start:start + 8], "little")
+
+    def lookup(self, key):
+        """
+        Return the list of (game, ply) where the position with hash key
+        occurred, in game order.
+        """
+        data = self.data
+        low = 0
+        high = self.size
+        # First entry with a hash not below key
+        while low < high:
+            middle = (low + high) // 2
+            offset = self.entries_start + middle * ENTRY.size
+            if int.from_bytes(data[offset:offset + 8], "little") < key:
+                low = middle + 1
+            else:
+                high = middle
+        result = []
+        while low < self.size:
+            found, game, ply = ENTRY.unpack_from(data, self.entries_start + low * ENTRY.size)
+            if found != key:
+                break
+            result.append((game, ply))
+            low += 1
+        return result
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+
+def main(argv):
+    records = None
+    index = None
+    query = None
+    usage = 'othello_records.py -i <records> [-x <index-file>] [-q "<column>,<row> <column>,<row> ..."]'
+
+    try:
+        opts, args = getopt.getopt(argv,"hi:x:q:",["input=","index=","query="])
+    except getopt.GetoptError:
+        print(usage)
+        sys.exit(2)
+    for opt, arg in opts:
+        if opt == '-h':
+            print(usage)
+            sys.exit()
+        elif opt in ("-i", "--input"):
+            records = arg
+        elif opt in ("-x", "--index"):
+            index = arg
+        elif opt in ("-q", "--query"):
+            query = [tuple(int(x) for x in move.split(",")) for move in arg.split()]
+
+    if records is None or (query is not None and index is None):
+        print(usage)
+        sys.exit(2)
+
+    start = time.time()
+    if query is None:
+        # Summary of the file, and the index if asked for
+        games = 0
+        moves = 0
+        wins = [0, 0, 0]
+        for record in read_games(records):
+            games += 1
+            moves += len(record.moves)
+            wins[0 if record.dark_score == record.light_score else 1 if record.dark_score > record.light_score else 2] += 1
+        print("{} games, {} moves, dark won {}, light won {}, drawn {}".format(games, moves, wins[1], wins[2], wins[0]))
+        if index is not None:
+            games, positions = build_index(records, index)
+            print("Indexed {} positions of {} games in {}".format(positions, games, index))
+    else:
+        # Games that reached the position after the given moves (on the
+        # dimension of the first game)
+        game_index = GameIndex(index)
+        record = read_game(records, game_index.game_offset(0))
+        board = record.initial_board()
+        player = 1
+        for i, j in query:
+            board = play_move(board, player, i, j)
+            player = 3 - player
+        found = game_index.lookup(zobrist_hash(board, player))
+        print("{} occurrences".format(len(found)))
+        for game, ply in found[:20]:
+            record = read_game(records, game_index.game_offset(game))
+            next_move = record.moves[ply] if ply < len(record.moves) else None
+            print("game {} ply {}: {} {}:{} {}, next move {}".format(
+                game, ply, record.dark, record.dark_score, record.light_score, record.light, next_move))
+    print("{:.1f}s".format(time.time() - start))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
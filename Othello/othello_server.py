@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+A match server that plays many games between AI players at once.
+
+othello_game.play_game runs one game and blocks on every move, with a timer
+thread per move. Here, every game is an asyncio task: the AIs are subprocesses
+whose pipes are read without blocking, or agents listening on a local TCP
+socket, which speak the same protocol over the connection. Per-move deadlines
+are enforced by the event loop, so one process can host hundreds of games;
+how many run at once is bounded by the concurrency option.
+
+A player is given as its file (or host:port of a socket agent) followed by
+the fields of its first line, e.g. "agent.py,limit=4,caching=1,ordering=1" or
+"mcts_ai.py,time=0.5"; limit, minimax, caching and ordering fill the five
+fixed fields, all other fields are passed on as name=value. Every pair of
+players plays a number of games, with both colour assignments.
+
+Each finished game is appended to the results file as one JSON line with the
+players, scores, winner, moves and the reason the game ended ("end", or
+"timeout", "invalid move" or "error" of one player, who then loses), so a
+long run can be watched and analysed while it is going.
+"""
+
+import sys, getopt
+import asyncio
+import json
+import multiprocessing
+import time
+
+from othello_game import AiPlayerInterface, AiTimeoutError, InvalidMoveError, OthelloGameManager
+from othello_protocol import HEADER, MOVE, decode_move, encode_board, encode_final, encode_update, parse_introduction
+from othello_records import GameRecordWriter
+from othello_shared import get_score
+
+# Fields that fill the fixed part of the first line, with their defaults
+FIXED_FIELDS = (("limit", "4"), ("minimax", "0"), ("caching", "0"), ("ordering", "0"))
+
+# Seconds to wait for an AI to introduce itself (starting the interpreter and
+# loading tables is not limited by the time per move)
+START_TIMEOUT = 10
+
+# Seconds to wait for an AI to exit after the end of the game
+EXIT_TIMEOUT = 1
+
+
+def parse_player(spec):
+    """
+    Split a player spec into (target, fixed fields, optional fields).
+    """
+    fields = spec.split(",")
+    options = dict(field.split("=", 1) for field in fields[1:] if field)
+    fixed = [options.pop(name, default) for name, default in FIXED_FIELDS]
+    return fields[0], fixed, options
+
+
+class AsyncAiPlayer(object):
+    """
+    One AI in one game, talking over an asyncio stream pair (the pipes of a
+    subprocess or a socket connection).
+    """
+
+    def __init__(self, spec, color):
+        self.spec = spec
+        self.color = color
+        self.target, self.fixed, self.options = parse_player(spec)
+        self.name = self.target
+        self.process = None
+        self.reader = None
+        self.writer = None
+        self.protocol = 0
+        self.sent = None # number of moves the AI knows about
+        self.seconds = 0.0 # time spent waiting for its moves
+
+    async def start(self, binary, stderr):
+        if self.target.endswith(".py") or ":" not in self.target:
+            self.process = await asyncio.create_subprocess_exec(
+                "python3", self.target, stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=stderr)
+            self.reader, self.writer = self.process.stdout, self.process.stdin
+        else:
+            host, port = self.target.rsplit(":", 1)
+            self.reader, self.writer = await asyncio.open_connection(host, int(port))
+
+        line = await asyncio.wait_for(self.reader.readline(), START_TIMEOUT)
+        # Like AiPlayerInterface: the binary protocol is only offered to AIs
+        # that said they support it on their first line
+        name, version = parse_introduction(line.decode("ASCII"))
+        self.name = name or self.target
+        self.protocol = version if binary else 0
+        options = "".join(",{}={}".format(name, value) for name, value in self.options.items())
+        if self.protocol: options += ",protocol=" + str(self.protocol)
+        await self.send((",".join([str(self.color)] + self.fixed) + options + "\n").encode("ASCII"))
+
+    async def send(self, data):
+        self.writer.write(data)
+        await self.writer.drain()
+
+    async def get_move(self, manager):
+        dark_score, light_score = get_score(manager.board)
+        if self.protocol:
+            # The whole board the first time, then only the moves played since
+            if self.sent is None or len(manager.moves) - self.sent > 255:
+                await self.send(encode_board(dark_score, light_score, manager.board))
+            else:
+                await self.send(encode_update(dark_score, light_score, manager.moves[self.sent:]))
+            self.sent = len(manager.moves)
+        else:
+            await self.send("SCORE {} {}\n{}\n".format(dark_score, light_score, str(manager.board)).encode("ASCII"))
+
+        start = time.time()
+        try:
+            move = await asyncio.wait_for(self.read_move(), AiPlayerInterface.TIMEOUT)
+        except asyncio.TimeoutError:
+            raise AiTimeoutError
+        finally:
+            self.seconds += time.time() - start
+        return move
+
+    async def read_move(self):
+        if self.protocol:
+            kind, length = HEADER.unpack(await self.reader.readexactly(HEADER.size))
+            payload = await self.reader.readexactly(length)
+            if kind != MOVE:
+                raise InvalidMoveError("Unexpected frame.")
+            return decode_move(payload)
+        line = await self.reader.readline()
+        if not line:
+            raise EOFError("{} closed the connection".format(self.name))
+        i_s, j_s = line.decode("ASCII").strip().split()
+        return int(i_s), int(j_s)
+
+    async def finish(self, manager):
+        """
+        Tell the AI that the game is over and wait for it to exit.
+        """
+        if self.writer is None: # never started
+            return
+        dark_score, light_score = get_score(manager.board)
+        try:
+            if self.protocol:
+                await self.send(encode_final(dark_score, light_score))
+            else:
+                await self.send("FINAL {} {}\n".format(dark_score, light_score).encode("ASCII"))
+            self.writer.close()
+            if self.process is not None:
+                await asyncio.wait_for(self.process.wait(), EXIT_TIMEOUT)
+        except (OSError, asyncio.TimeoutError):
+            pass
+        self.close()
+
+    def close(self):
+        if self.process is not None and self.process.returncode is None:
+            self.process.kill()
+        elif self.process is None and self.writer is not None:
+            self.writer.close()
+
+
+async def play_match(dimension, dark_spec, light_spec, binary = False, stderr = None):
+    """
+    Play one game and return its result record.
+    """
+    manager = OthelloGameManager(dimension)
+    players = [None, AsyncAiPlayer(dark_spec, 1), AsyncAiPlayer(light_spec, 2)]
+    start = time.time()
+    reason = "end"
+    loser = None
+    try:
+        for player in players[1:]:
+            loser = player.color
+            await player.start(binary, stderr)
+        loser = None
+        while manager.get_possible_moves():
+            loser = manager.current_player
+            i, j = await players[manager.current_player].get_move(manager)
+            manager.play(i, j)
+            loser = None
+    except AiTimeoutError:
+        reason = "timeout"
+    except InvalidMoveError:
+        reason = "invalid move"
+    except (OSError, EOFError, ValueError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+        reason = "error"
+    finally:
+        await asyncio.gather(*(player.finish(manager) for player in players[1:]))
+
+    dark_score, light_score = get_score(manager.board)
+    if loser is not None:
+        winner = 3 - loser
+    else:
+        winner = 1 if dark_score > light_score else 2 if light_score > dark_score else 0
+    return {"dimension": dimension, "dark": dark_spec, "light": light_spec,
+            "dark_name": players[1].name, "light_name": players[2].name,
+            "dark_score": dark_score, "light_score": light_score, "winner": winner, "reason": reason,
+            "loser": loser, "moves": [[i, j] for _, i, j in manager.moves], "seconds": time.time() - start,
+            "dark_seconds": players[1].seconds, "light_seconds": players[2].seconds}
+
+
+async def run_league(specs, dimension, games, output, concurrency, binary = False, stderr = None, record = None):
+    """
+    Play games games between every pair of players (both colour assignments
+    alternately), at most concurrency at a time, appending each result to
+    the output file (and the game to the GameRecordWriter record) as soon as
+    it is known. Returns the list of results.
+    """
+    matches = []
+    for a in range(len(specs)):
+        for b in range(a + 1, len(specs)):
+            for game in range(games):
+                matches.append((specs[a], specs[b]) if game % 2 == 0 else (specs[b], specs[a]))
+
+    slots = asyncio.Semaphore(concurrency)
+    results = []
+
+    async def run(number, dark_spec, light_spec):
+        async with slots:
+            result = await play_match(dimension, dark_spec, light_spec, binary, stderr)
+        result["game"] = number
+        results.append(result)
+        if output is not None:
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+        if record is not None:
+            record.write(dimension, dark_spec, light_spec, result["dark_score"], result["light_score"],
+                         [tuple(move) for move in result["moves"]])
+        print("game {}: {} {}:{} {} ({})".format(number, dark_spec, result["dark_score"], result["light_score"],
+                                                 light_spec, result["reason"]), flush=True)
+
+    await asyncio.gather(*(run(number, dark, light) for number, (dark, light) in enumerate(matches)))
+    return results
+
+
+def print_standings(specs, results):
+    standings = {spec: [0, 0, 0] for spec in specs} # wins, draws, losses
+    for result in results:
+        for color, spec in ((1, result["dark"]), (2, result["light"])):
+            standings[spec][0 if result["winner"] == color else 1 if result["winner"] == 0 else 2] += 1
+    print("{:>5} {:>5} {:>5} {:>7}  {}".format("won", "drawn", "lost", "score", "player"))
+    for spec in specs:
+        won, drawn, lost = standings[spec]
+        total = won + drawn + lost
+        print("{:5d} {:5d} {:5d} {:6.1f}%  {}".format(won, drawn, lost, 100.0 * (won + 0.5 * drawn) / total if total else 0.0, spec))
+
+
+def main(argv):
+    specs = []
+    dimension = 6
+    games = 10
+    concurrency = multiprocessing.cpu_count()
+    output = None
+    binary = False
+    verbose = False
+    records = None
+    usage = ('othello_server.py -p <player> -p <player> [-p <player> ...] [-d <dimension> -n <games-per-pairing> '
+             '-c <concurrent-games> -t <seconds-per-move> -o <results.jsonl> -g <game-records> -b -v]')
+
+    try:
+        opts, args = getopt.getopt(argv,"hp:d:n:c:t:o:g:bv",["player=","dimension=","games=","concurrency=","timeout=","output=","games-file=","binary","verbose"])
+    except getopt.GetoptError:
+        print(usage)
+        sys.exit(2)
+    for opt, arg in opts:
+        if opt == '-h':
+            print(usage)
+            sys.exit()
+        elif opt in ("-p", "--player"):
+            specs.append(arg)
+        elif opt in ("-d", "--dimension"):
+            dimension = int(arg)
+        elif opt in ("-n", "--games"):
+            games = int(arg)
+        elif opt in ("-c", "--concurrency"):
+            concurrency = int(arg)
+        elif opt in ("-t", "--timeout"):
+            AiPlayerInterface.TIMEOUT = float(arg)
+        elif opt in ("-o", "--output"):
+            output = arg
+        elif opt in ("-g", "--games-file"):
+            records = arg
+        elif opt in ("-b", "--binary"):
+            binary = True
+        elif opt in ("-v", "--verbose"):
+            verbose = True
+
+    if len(specs) < 2 or concurrency < 1:
+        print(usage)
+        sys.exit(2)
+
+    # The AIs' debugging output is only shown with -v
+    stderr = None if verbose else asyncio.subprocess.DEVNULL
+    start = time.time()
+    f = open(output, "a") if output is not None else None
+    record = GameRecordWriter(records) if records is not None else None
+    try:
+        results = asyncio.run(run_league(specs, dimension, games, f, concurrency, binary, stderr, record))
+    finally:
+        if f is not None:
+            f.close()
+        if record is not None:
+            record.close()
+    print_standings(specs, results)
+    print("{} games in {:.1f}s".format(len(results), time.time() - start))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
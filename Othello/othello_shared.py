@@ -6,34 +6,77 @@ building your AIs.
 Thanks to original author Daniel Bauer, Columbia University
 """
 
+# Direction vectors (xdir, ydir), in the order find_lines checks them
+DIRECTIONS = ((0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1), (-1, 0), (-1, 1))
+
+# Keys: board dimension
+# Values: for every square j * dimension + i, the rays from it: for each
+# direction, the (column,row) squares from the neighbour to the edge. Rays
+# shorter than two squares are left out, they cannot capture anything.
+_rays = dict()
+
+
+def get_rays(dimension):
+    """
+    Return the ray table of a board dimension, computed on first use.
+    """
+    if dimension not in _rays:
+        rays = []
+        for j in range(dimension):
+            for i in range(dimension):
+                square_rays = []
+                for xdir, ydir in DIRECTIONS:
+                    ray = []
+                    u = i + xdir
+                    v = j + ydir
+                    while 0 <= u < dimension and 0 <= v < dimension:
+                        ray.append((u, v))
+                        u += xdir
+                        v += ydir
+                    if len(ray) >= 2:
+                        square_rays.append(tuple(ray))
+                rays.append(tuple(square_rays))
+        _rays[dimension] = rays
+    return _rays[dimension]
+
+
 def find_lines(board, i, j, player):
     """
     Find all the uninterupted lines of stones that would be captured if player
     plays column i and row j. 
     """
     lines = []
-    for xdir, ydir in [[0, 1], [1, 1], [1, 0], [1, -1], [0, -1], [-1, -1], 
-                       [-1, 0], [-1, 1]]:
-        u = i
-        v = j
+    for ray in get_rays(len(board))[j * len(board) + i]:
         line = []
-
-        u += xdir
-        v += ydir
-        found = False
-        while u >= 0 and u < len(board) and v >= 0 and v < len(board):
-            if board[v][u] == 0:
+        for u, v in ray:
+            square = board[v][u]
+            if square == 0:
                 break
-            elif board[v][u] == player:
-                found = True
+            elif square == player:
+                if line:
+                    lines.append(line)
                 break
-            else: 
-               line.append((u,v))
-            u += xdir
-            v += ydir
-        if found and line: 
-            lines.append(line)
+            else:
+                line.append((u,v))
     return lines
+
+
+def is_legal_move(board, i, j, player):
+    """
+    Return whether player can play on the empty square at column i and row
+    j, stopping at the first line it would capture.
+    """
+    for ray in get_rays(len(board))[j * len(board) + i]:
+        u, v = ray[0]
+        if board[v][u] in (0, player):
+            continue
+        for u, v in ray[1:]:
+            square = board[v][u]
+            if square == 0:
+                break
+            elif square == player:
+                return True
+    return False
    
 
 def get_possible_moves(board, player):
@@ -44,10 +87,8 @@ def get_possible_moves(board, player):
     result = []
     for i in range(len(board)):
         for j in range(len(board)):
-            if board[j][i] == 0:
-                lines = find_lines(board,i,j,player)
-                if lines: 
-                    result.append((i,j))
+            if board[j][i] == 0 and is_legal_move(board, i, j, player):
+                result.append((i,j))
     return result
 
 def play_move(board, player, i, j):
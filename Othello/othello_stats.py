@@ -0,0 +1,96 @@
+"""
+Search statistics for the Othello agent.
+
+A SearchStats object counts what a search does: nodes visited, leaves
+evaluated, transposition table probes, hits and cutoffs, nodes skipped by
+Multi-ProbCut, and beta cutoffs by the index of the move that caused them (a
+well ordered search cuts off at the first move most of the time). Iterative
+searches also record the time and node count of every finished depth, from
+which the effective branching factor is computed.
+"""
+
+import json
+import time
+
+
+class SearchStats(object):
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """
+        Start counting for a new move.
+        """
+        self.start = time.time()
+        self.nodes = 0
+        self.leaves = 0
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.tt_cutoffs = 0
+        self.probcut_cuts = 0
+        self.cutoffs = []
+        self.depths = []
+
+    def cutoff(self, index):
+        # The move at index (0 is the first move searched) caused a cutoff
+        while len(self.cutoffs) <= index:
+            self.cutoffs.append(0)
+        self.cutoffs[index] += 1
+
+    def depth_done(self, depth):
+        """
+        Record that the search to depth finished (once per iteration of an
+        iterative search, or once for a fixed-depth search).
+        """
+        self.depths.append((depth, time.time() - self.start, self.nodes))
+
+    def branching_factor(self):
+        """
+        Return the effective branching factor: the ratio between the nodes
+        of the last two iterations, or nodes^(1/depth) with only one depth.
+        """
+        if not self.depths:
+            return 0.0
+        # Node counts in depths are cumulative
+        counts = [0] + [nodes for _, _, nodes in self.depths]
+        last = counts[-1] - counts[-2]
+        previous = counts[-2] - counts[-3] if len(counts) >= 3 else 0
+        if previous > 0:
+            return last / previous
+        depth = self.depths[-1][0]
+        return last ** (1.0 / depth) if depth > 0 and last > 0 else 0.0
+
+    def as_dict(self):
+        total = sum(self.cutoffs)
+        return {"seconds": time.time() - self.start,
+                "nodes": self.nodes,
+                "leaves": self.leaves,
+                "tt_probes": self.tt_probes,
+                "tt_hits": self.tt_hits,
+                "tt_cutoffs": self.tt_cutoffs,
+                "probcut_cuts": self.probcut_cuts,
+                "cutoffs": list(self.cutoffs),
+                "first_move_cutoffs": self.cutoffs[0] / total if total else 0.0,
+                "branching_factor": self.branching_factor(),
+                "depths": [{"depth": depth, "seconds": seconds, "nodes": nodes} for depth, seconds, nodes in self.depths]}
+
+    def summary(self):
+        """
+        Return a one-line summary for stderr.
+        """
+        result = self.as_dict()
+        times = " ".join("{}:{:.3f}s".format(entry["depth"], entry["seconds"]) for entry in result["depths"])
+        return ("{nodes} nodes, {leaves} leaves, {nps:.0f} nodes/s, tt {tt_hits}/{tt_probes} hits {tt_cutoffs} cutoffs, probcut {probcut_cuts} cuts, "
+                "first move cutoffs {first:.0%}, branching factor {bf:.2f}, depths {times}").format(
+                    nps=result["nodes"] / result["seconds"] if result["seconds"] else 0.0,
+                    first=result["first_move_cutoffs"], bf=result["branching_factor"], times=times, **result)
+
+    def write_json(self, path, **fields):
+        """
+        Append the statistics and the given extra fields as one JSON line.
+        """
+        record = dict(fields)
+        record.update(self.as_dict())
+        with open(path, "a") as f:
+            f.write(json.dumps(record) + "\n")
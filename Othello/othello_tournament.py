@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Headless tournaments between configurations of the agent.
+
+Every pair of configurations plays a number of games on a pool of worker
+processes, without the GUI and without starting an AI subprocess per game:
+the workers call the search functions of agent.py directly. Each game starts
+with a few random moves, so that games between deterministic agents differ;
+both colour assignments are played from every random opening.
+
+A configuration is given like the optional fields of the agent's first line,
+e.g. "limit=4,caching=1,ordering=1". Keys are limit, minimax, caching,
+ordering, time, heuristic, stability, weights, patterns, endgame, pvs,
+symmetry, probcut and random (random=1 plays random moves, like Randy).
+
+For every configuration, the score (wins plus half the draws) is reported
+with a 95% confidence interval, together with the average time per move and
+the nodes searched per second.
+"""
+
+import sys, getopt
+import math
+import multiprocessing
+import random
+import time
+
+import agent
+import othello_probcut
+from othello_bitboard import get_possible_moves, get_score, play_move
+from othello_game import OthelloGameManager
+from othello_records import GameRecordWriter
+from othello_transposition import TranspositionTable
+
+DEFAULTS = {"limit": 4, "minimax": 0, "caching": 0, "ordering": 0, "time": 0, "heuristic": 0,
+            "stability": 0, "weights": None, "patterns": None, "endgame": 0, "pvs": 0, "symmetry": 0, "probcut": None,
+            "random": 0}
+
+# z value of a 95% confidence interval
+Z = 1.96
+
+# Size of the transposition table of each player
+TT_SIZE = 1 << 16
+
+
+def parse_config(spec):
+    """
+    Parse "name=value,..." into a configuration dict.
+    """
+    config = dict(DEFAULTS)
+    for field in spec.split(","):
+        if not field:
+            continue
+        name, value = field.split("=", 1)
+        if name not in DEFAULTS:
+            raise ValueError("unknown agent option {}".format(name))
+        config[name] = value if name in ("weights", "patterns", "probcut") else float(value) if name == "time" else int(value)
+    return config
+
+
+# Keys: (weight file, board dimension)
+# Values: the heuristic weights loaded from it
+_weights = dict()
+
+
+def load_weights(path, dimension):
+    if (path, dimension) not in _weights:
+        _weights[(path, dimension)] = agent.load_heuristic_weights(path, dimension)
+    return _weights[(path, dimension)]
+
+
+def set_evaluation(config, dimension):
+    """
+    Set up the evaluation function of the agent as in config, for boards of
+    the given dimension.
+    """
+    agent.heuristic_weights, agent.stability_weights = agent.HEURISTIC_WEIGHTS, agent.STABILITY_WEIGHTS
+    if config["weights"]:
+        agent.evaluate, agent.evaluate_batch = agent.use_heuristic_weights(load_weights(config["weights"], dimension)), None
+    elif config["stability"]:
+        agent.evaluate, agent.evaluate_batch = agent.compute_stability_heuristic, None
+    elif config["heuristic"]:
+        agent.evaluate, agent.evaluate_batch = agent.compute_heuristic, None
+    elif config["patterns"]:
+        agent.pattern_file = config["patterns"]
+        agent.evaluate, agent.evaluate_batch = agent.evaluate_patterns, agent.evaluate_patterns_batch
+    else:
+        agent.evaluate, agent.evaluate_batch = agent.compute_utility, None
+
+
+# Keys: cut table file
+# Values: the ProbCut loaded from it
+_probcuts = dict()
+
+
+def load_probcut(path):
+    if path not in _probcuts:
+        _probcuts[path] = othello_probcut.load_probcut(path)
+    return _probcuts[path]
+
+
+def select_move(config, board, color):
+    """
+    Select a move for color with the agent set up as in config.
+    """
+    if config["random"]:
+        return random.choice(get_possible_moves(board, color))
+
+    set_evaluation(config, len(board))
+    agent.probcut = load_probcut(config["probcut"]) if config["probcut"] else None
+    agent.symmetry = config["symmetry"]
+
+    time_limit = config["time"]
+    if config["endgame"] and sum(list(row).count(0) for row in board) <= config["endgame"]:
+        # Like agent.select_move: the solver gets a share of the time, the
+        # search what is left
+        start = time.time()
+        budget = time_limit or agent.ENDGAME_TIME
+        move = agent.select_move_endgame(board, color, budget * agent.ENDGAME_SHARE)
+        if move is not None:
+            return move
+        time_limit = max(0.001, budget - (time.time() - start))
+    if config["minimax"]:
+        return agent.select_move_minimax(board, color, config["limit"], config["caching"])
+    if config["pvs"]:
+        return agent.select_move_pvs(board, color, config["limit"], time_limit)
+    if time_limit:
+        return agent.select_move_iterative(board, color, time_limit, config["limit"], config["ordering"])
+    return agent.select_move_alphabeta(board, color, config["limit"], config["caching"], config["ordering"])
+
+
+def play_game(args):
+    """
+    Play one game and return (dark score, light score, statistics, moves),
+    where statistics[color] is [moves, seconds, nodes] of the player of that
+    color and moves the list of (column,row) moves of the game.
+    """
+    dimension, dark_config, light_config, seed, opening_plies = args
+    configs = [None, dark_config, light_config]
+    tables = [None, TranspositionTable(TT_SIZE), TranspositionTable(TT_SIZE)]
+    statistics = [None, [0, 0.0, 0], [0, 0.0, 0]]
+    moves = []
+
+    rng = random.Random(seed)
+    board = tuple(tuple(row) for row in OthelloGameManager(dimension).board)
+    color = 1
+    ply = 0
+    while True:
+        possible_moves = get_possible_moves(board, color)
+        if not possible_moves:
+            break
+        if ply < opening_plies:
+            move = rng.choice(possible_moves)
+        else:
+            agent.tt = tables[color]
+            agent.stats.reset()
+            move = select_move(configs[color], board, color)
+            statistics[color][0] += 1
+            statistics[color][1] += time.time() - agent.stats.start
+            statistics[color][2] += agent.stats.nodes
+        board = play_move(board, color, move[0], move[1])
+        moves.append(move)
+        color = 3 - color
+        ply += 1
+
+    dark_score, light_score = get_score(board)
+    return dark_score, light_score, statistics, moves
+
+
+def confidence_interval(score, games):
+    """
+    Return the Wilson score interval of a score (between 0 and 1) over games.
+    """
+    if games == 0:
+        return 0.0, 1.0
+    denominator = 1 + Z * Z / games
+    center = (score + Z * Z / (2 * games)) / denominator
+    spread = Z * math.sqrt(score * (1 - score) / games + Z * Z / (4 * games * games)) / denominator
+    return center - spread, center + spread
+
+
+def run_tournament(specs, dimension, games, opening_plies = 4, workers = None, seed = 0, record = None):
+    """
+    Play games games between every pair of configurations (given as strings)
+    and return a list with one result dict per configuration. If record is a
+    GameRecordWriter (see othello_records), every game is appended to it.
+    """
+    configs = [parse_config(spec) for spec in specs]
+    tasks = []
+    pairings = []
+    for a in range(len(configs)):
+        for b in range(a + 1, len(configs)):
+            for game in range(games):
+                # Games come in pairs with the same opening and swapped colours
+                dark, light = (a, b) if game % 2 == 0 else (b, a)
+                tasks.append((dimension, configs[dark], configs[light], seed + game // 2, opening_plies))
+                pairings.append((dark, light))
+
+    results = [{"config": spec, "games": 0, "wins": 0, "draws": 0, "losses": 0, "moves": 0, "seconds": 0.0, "nodes": 0}
+               for spec in specs]
+    pool = multiprocessing.Pool(workers)
+    try:
+        for (dark, light), (dark_score, light_score, statistics, moves) in zip(pairings, pool.imap(play_game, tasks)):
+            if record is not None:
+                record.write(dimension, specs[dark], specs[light], dark_score, light_score, moves)
+            for player, color, own, opp in ((dark, 1, dark_score, light_score), (light, 2, light_score, dark_score)):
+                result = results[player]
+                result["games"] += 1
+                result["wins" if own > opp else "losses" if own < opp else "draws"] += 1
+                result["moves"] += statistics[color][0]
+                result["seconds"] += statistics[color][1]
+                result["nodes"] += statistics[color][2]
+    finally:
+        pool.terminate()
+
+    for result in results:
+        n = result["games"]
+        result["score"] = (result["wins"] + 0.5 * result["draws"]) / n if n else 0.0
+        result["interval"] = confidence_interval(result["score"], n)
+        result["time_per_move"] = result["seconds"] / result["moves"] if result["moves"] else 0.0
+        result["nodes_per_second"] = result["nodes"] / result["seconds"] if result["seconds"] else 0.0
+    return results
+
+
+def print_results(results):
+    print("{:>6} {:>5} {:>5} {:>5} {:>7} {:>15} {:>9} {:>10}  {}".format(
+        "games", "won", "drawn", "lost", "score", "95% interval", "s/move", "nodes/s", "configuration"))
+    for result in results:
+        print("{:6d} {:5d} {:5d} {:5d} {:6.1f}% {:6.1f}%-{:6.1f}% {:9.4f} {:10.0f}  {}".format(
+            result["games"], result["wins"], result["draws"], result["losses"], 100 * result["score"],
+            100 * result["interval"][0], 100 * result["interval"][1], result["time_per_move"],
+            result["nodes_per_second"], result["config"]))
+
+
+def main(argv):
+    specs = []
+    dimension = 6
+    games = 100
+    opening_plies = 4
+    workers = None
+    seed = 0
+    records = None
+    usage = 'othello_tournament.py -p <config> -p <config> [-p <config> ...] [-d <dimension> -n <games-per-pairing> -r <random-plies> -w <workers> -s <seed> -g <game-records>]'
+
+    try:
+        opts, args = getopt.getopt(argv,"hp:d:n:r:w:s:g:",["player=","dimension=","games=","random-plies=","workers=","seed=","games-file="])
+    except getopt.GetoptError:
+        print(usage)
+        sys.exit(2)
+    for opt, arg in opts:
+        if opt == '-h':
+            print(usage)
+            sys.exit()
+        elif opt in ("-p", "--player"):
+            specs.append(arg)
+        elif opt in ("-d", "--dimension"):
+            dimension = int(arg)
+        elif opt in ("-n", "--games"):
+            games = int(arg)
+        elif opt in ("-r", "--random-plies"):
+            opening_plies = int(arg)
+        elif opt in ("-w", "--workers"):
+            workers = int(arg)
+        elif opt in ("-s", "--seed"):
+            seed = int(arg)
+        elif opt in ("-g", "--games-file"):
+            records = arg
+
+    if len(specs) < 2:
+        print(usage)
+        sys.exit(2)
+
+    start = time.time()
+    record = GameRecordWriter(records) if records is not None else None
+    try:
+        results = run_tournament(specs, dimension, games, opening_plies, workers, seed, record)
+    finally:
+        if record is not None:
+            record.close()
+    print_results(results)
+    print("{:.1f}s".format(time.time() - start))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,245 @@
+"""
+Zobrist hashing and a bounded transposition table for Othello searches.
+
+A position is hashed by XOR-ing one random 64 bit key per occupied square and
+colour, plus a key when player 2 is to move. The hash of a successor is
+computed from its parent by XOR-ing in the played square and the flipped disks
+(update_hash), so the search never has to hash a whole board again.
+
+Rotated and reflected boards are the same position for the search. A
+symmetric hash keeps the hashes of all 8 rotations and reflections of the
+board at once, packed in one integer (64 bits each), and is updated with
+one XOR per square like the plain hash. canonical_hash picks the smallest of
+the 8, which is the same for all symmetric boards, and tells which symmetry
+gave it, so that moves can be stored in the canonical orientation
+(transform_move) and mapped back (inverse_move).
+"""
+
+import random
+
+# Bound types of a stored value
+EXACT = 0
+LOWER = 1 # the value is a lower bound (the search failed high)
+UPPER = 2 # the value is an upper bound (the search failed low)
+
+# Depth stored for results of searches without a depth limit
+UNLIMITED = 1 << 20
+
+# Keys: board dimension
+# Values: (square keys for player 1 and 2, flip keys, side to move key)
+_zobrist = dict()
+
+# Keys: board dimension
+# Values: the packed keys of symmetric hashes, laid out like _zobrist
+_symmetric_zobrist = dict()
+
+# Keys: board dimension
+# Values: the 8 symmetries as lists mapping square k (bit k) to its image
+_symmetries = dict()
+
+# Number of rotations and reflections of the board
+SYMMETRIES = 8
+LANE = (1 << 64) - 1
+
+
+def get_zobrist(dimension):
+    """
+    Return the Zobrist keys for the given board dimension. square_keys[player][k]
+    is the key of a disk of player on square k (bit k of a bitboard),
+    flip_keys[k] turns a disk on square k into a disk of the other colour.
+    The keys are seeded with the dimension, so they are the same in every
+    process.
+    """
+    if dimension not in _zobrist:
+        rng = random.Random(dimension)
+        n = dimension * dimension
+        dark = [rng.getrandbits(64) for _ in range(n)]
+        light = [rng.getrandbits(64) for _ in range(n)]
+        flip_keys = [dark[k] ^ light[k] for k in range(n)]
+        _zobrist[dimension] = ((None, dark, light), flip_keys, rng.getrandbits(64))
+    return _zobrist[dimension]
+
+
+def zobrist_hash(board, player):
+    """
+    Hash a tuple board with player to move.
+    """
+    dimension = len(board)
+    square_keys, _, side_key = get_zobrist(dimension)
+    key = side_key if player == 2 else 0
+    for j, row in enumerate(board):
+        for i, cell in enumerate(row):
+            if cell:
+                key ^= square_keys[cell][j * dimension + i]
+    return key
+
+
+def update_hash(key, dimension, player, i, j, flips):
+    """
+    Return the hash of the position after player plays column i and row j and
+    flips the disks in the bitboard flips. The side to move changes.
+    """
+    square_keys, flip_keys, side_key = get_zobrist(dimension)
+    key ^= square_keys[player][j * dimension + i] ^ side_key
+    while flips:
+        bit = flips & -flips
+        key ^= flip_keys[bit.bit_length() - 1]
+        flips ^= bit
+    return key
+
+
+def get_symmetries(dimension):
+    """
+    Return the 8 rotations and reflections of the board, each as a list that
+    maps square k (j * dimension + i) to the square it moves to. The first
+    is the identity, and every symmetry is its own inverse except the two
+    quarter turns (5 and 6), which are each other's.
+    """
+    if dimension not in _symmetries:
+        d = dimension - 1
+        transforms = [lambda i, j: (i, j), lambda i, j: (d - i, j), lambda i, j: (i, d - j), lambda i, j: (d - i, d - j),
+                      lambda i, j: (j, i), lambda i, j: (d - j, i), lambda i, j: (j, d - i), lambda i, j: (d - j, d - i)]
+        symmetries = []
+        for transform in transforms:
+            mapping = [0] * (dimension * dimension)
+            for j in range(dimension):
+                for i in range(dimension):
+                    u, v = transform(i, j)
+                    mapping[j * dimension + i] = v * dimension + u
+            symmetries.append(mapping)
+        _symmetries[dimension] = symmetries
+    return _symmetries[dimension]
+
+
+# Index of the inverse of each symmetry in get_symmetries
+INVERSE = (0, 1, 2, 3, 4, 6, 5, 7)
+
+
+def get_symmetric_zobrist(dimension):
+    """
+    Return the keys of symmetric hashes, laid out like get_zobrist. Lane t
+    (bits 64 * t to 64 * t + 63) of a square key is the plain key of the
+    square that symmetry t moves it to, so lane t of a symmetric hash is the
+    plain hash of the board transformed by symmetry t.
+    """
+    if dimension not in _symmetric_zobrist:
+        (_, dark, light), _, side_key = get_zobrist(dimension)
+        symmetries = get_symmetries(dimension)
+        n = dimension * dimension
+        packed = []
+        for keys in (dark, light):
+            packed.append([sum(keys[mapping[k]] << (64 * t) for t, mapping in enumerate(symmetries)) for k in range(n)])
+        flip_keys = [packed[0][k] ^ packed[1][k] for k in range(n)]
+        packed_side = sum(side_key << (64 * t) for t in range(SYMMETRIES))
+        _symmetric_zobrist[dimension] = ((None, packed[0], packed[1]), flip_keys, packed_side)
+    return _symmetric_zobrist[dimension]
+
+
+def symmetric_hash(board, player):
+    """
+    Symmetric hash of a tuple board with player to move.
+    """
+    dimension = len(board)
+    square_keys, _, side_key = get_symmetric_zobrist(dimension)
+    key = side_key if player == 2 else 0
+    for j, row in enumerate(board):
+        for i, cell in enumerate(row):
+            if cell:
+                key ^= square_keys[cell][j * dimension + i]
+    return key
+
+
+def update_symmetric_hash(key, dimension, player, i, j, flips):
+    """
+    Like update_hash, for a symmetric hash.
+    """
+    square_keys, flip_keys, side_key = get_symmetric_zobrist(dimension)
+    key ^= square_keys[player][j * dimension + i] ^ side_key
+    while flips:
+        bit = flips & -flips
+        key ^= flip_keys[bit.bit_length() - 1]
+        flips ^= bit
+    return key
+
+
+def canonical_hash(key):
+    """
+    Return (hash, symmetry) for a symmetric hash: the smallest of its 8
+    lanes, which is the same for all rotations and reflections of the
+    board, and the index of the symmetry that gives it.
+    """
+    lanes = [(key >> (64 * t)) & LANE for t in range(SYMMETRIES)]
+    smallest = min(lanes)
+    return smallest, lanes.index(smallest)
+
+
+def transform_move(move, symmetry, dimension):
+    """
+    Return the (column,row) move moved by the symmetry with the given index.
+    """
+    if move is None:
+        return None
+    k = get_symmetries(dimension)[symmetry][move[1] * dimension + move[0]]
+    return k % dimension, k // dimension
+
+
+def inverse_move(move, symmetry, dimension):
+    """
+    Undo transform_move.
+    """
+    return transform_move(move, INVERSE[symmetry], dimension)
+
+
+class TranspositionTable(object):
+    """
+    A fixed size table of search results, indexed by Zobrist hash.
+
+    Entries are tuples (key, depth, flag, value, best_move, generation). The
+    table has two slots per bucket: the first keeps the deepest result
+    (depth-preferred), the second takes whatever did not go into the first
+    (always-replace). Results of earlier searches (an older generation) are
+    replaced first, so memory stays at size entries for the whole game.
+    """
+
+    def __init__(self, size = 1 << 18):
+        buckets = 1
+        while buckets * 2 <= max(1, size // 2):
+            buckets *= 2
+        self.mask = buckets - 1
+        self.slots = [None] * (2 * buckets)
+        self.generation = 0
+
+    def __len__(self):
+        return sum(1 for entry in self.slots if entry is not None)
+
+    def new_search(self):
+        """
+        Mark the entries stored so far as belonging to an earlier search.
+        """
+        self.generation += 1
+
+    def clear(self):
+        self.slots = [None] * len(self.slots)
+        self.generation = 0
+
+    def probe(self, key):
+        """
+        Return the entry stored for key, or None.
+        """
+        index = (key & self.mask) << 1
+        entry = self.slots[index]
+        if entry is not None and entry[0] == key:
+            return entry
+        entry = self.slots[index + 1]
+        if entry is not None and entry[0] == key:
+            return entry
+        return None
+
+    def store(self, key, depth, flag, value, best_move):
+        index = (key & self.mask) << 1
+        entry = (key, depth, flag, value, best_move, self.generation)
+        old = self.slots[index]
+        if old is None or old[0] == key or old[5] != self.generation or depth >= old[1]:
+            self.slots[index] = entry
+        else:
+            self.slots[index + 1] = entry
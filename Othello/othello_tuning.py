@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Self-play training data and offline tuning of the evaluation weights.
+
+generate plays games between copies of the agent (compute_heuristic at a
+fixed depth, with a few random opening moves and occasional random moves
+later on, so that the games differ) on a pool of worker processes, and saves
+every position with its label: the final disk difference for the player to
+move, or, once few squares are empty, the exact value from the endgame solver
+(which then plays the rest of the game perfectly). Positions are stored
+column by column in a compressed .npz file:
+
+  boards   (N, d, d) int8, 0 empty, 1 dark, 2 light
+  players  (N,) int8, the player to move
+  labels   (N,) float32, disk difference for the player to move
+  exact    (N,) bool, whether the label was solved exactly
+  games    (N,) int32, the game each position comes from
+
+fit solves for the compute_heuristic weights (see HEURISTIC_FEATURES in
+agent.py, with -t also the STABILITY_FEATURES of compute_stability_heuristic)
+on all positions at once, either by least squares on the labels,
+which keeps the evaluation in disk-difference units like the utility of
+finished games, or by logistic regression on win/draw/loss, rescaled to the
+same units. The weights are written as JSON and loaded by the agent with a
+weights=<file> field. fit-patterns fits the pattern tables of
+othello_patterns.py to the same labels by gradient descent.
+
+The last tenth of the games is held out and the error on it is reported.
+"""
+
+import sys, getopt
+import json
+import multiprocessing
+import random
+import time
+
+import numpy as np
+
+import agent
+from othello_batch import legal_moves_batch
+from othello_bitboard import Board, get_possible_moves, get_score, play_move, popcount
+from othello_endgame import EndgameSolver
+from othello_features import frontier_disks, stable_disks
+from othello_game import OthelloGameManager
+from othello_patterns import PatternEvaluator
+from othello_transposition import TranspositionTable
+
+# Size of the transposition table of each worker
+TT_SIZE = 1 << 16
+
+# Fraction of the games held out to measure the error of a fit
+HOLDOUT = 0.1
+
+# Ridge penalty of the least-squares and logistic fits
+RIDGE = 1e-3
+
+
+############ SELF-PLAY ##########################
+
+def play_game(args):
+    """
+    Play one self-play game and return the (boards, players, labels, exact)
+    lists of its positions.
+    """
+    dimension, limit, weights, seed, opening_plies, noise, exact_empties = args
+    rng = random.Random(seed)
+    agent.evaluate, agent.evaluate_batch = agent.use_heuristic_weights(weights), None
+    agent.tt = TranspositionTable(TT_SIZE)
+    solver = EndgameSolver()
+
+    boards = []
+    players = []
+    values = []
+    board = tuple(tuple(row) for row in OthelloGameManager(dimension).board)
+    color = 1
+    ply = 0
+    while True:
+        possible_moves = get_possible_moves(board, color)
+        if not possible_moves:
+            break
+        boards.append(board)
+        players.append(color)
+        if sum(row.count(0) for row in board) <= exact_empties:
+            move, value = solver.select_move(Board.from_tuple(board), color)
+            values.append(value)
+        else:
+            values.append(None)
+            if ply < opening_plies or rng.random() < noise:
+                move = rng.choice(possible_moves)
+            else:
+                move = agent.select_move_alphabeta(board, color, limit, 1, 1)
+        board = play_move(board, color, move[0], move[1])
+        color = 3 - color
+        ply += 1
+
+    dark_score, light_score = get_score(board)
+    labels = []
+    for player, value in zip(players, values):
+        if value is None:
+            value = dark_score - light_score if player == 1 else light_score - dark_score
+        labels.append(value)
+    return boards, players, labels, [value is not None for value in values]
+
+
+def generate(dimension, games, limit = 2, weights = agent.HEURISTIC_WEIGHTS, opening_plies = 4, noise = 0.1,
+             exact_empties = 10, workers = None, seed = 0):
+    """
+    Play games self-play games on a pool of worker processes and return the
+    data as a dict of arrays (see the module docstring).
+    """
+    tasks = [(dimension, limit, weights, seed + game, opening_plies, noise, exact_empties) for game in range(games)]
+    boards = []
+    players = []
+    labels = []
+    exact = []
+    game_ids = []
+    pool = multiprocessing.Pool(workers)
+    try:
+        for game, (game_boards, game_players, game_labels, game_exact) in enumerate(pool.imap(play_game, tasks)):
+            boards += game_boards
+            players += game_players
+            labels += game_labels
+            exact += game_exact
+            game_ids += [game] * len(game_boards)
+    finally:
+        pool.terminate()
+    return {"boards": np.array(boards, dtype=np.int8).reshape(-1, dimension, dimension),
+            "players": np.array(players, dtype=np.int8),
+            "labels": np.array(labels, dtype=np.float32),
+            "exact": np.array(exact, dtype=bool),
+            "games": np.array(game_ids, dtype=np.int32)}
+
+
+def save_data(path, data):
+    np.savez_compressed(path, **data)
+
+
+def load_data(paths):
+    """
+    Load and concatenate the data files in paths, which must have the same
+    board dimension. Game numbers are made unique across files.
+    """
+    parts = []
+    games = 0
+    for path in paths:
+        with np.load(path) as saved:
+            part = {name: saved[name] for name in saved.files}
+        part["games"] = part["games"] + games
+        games = int(part["games"].max()) + 1 if len(part["games"]) else games
+        parts.append(part)
+    dimensions = set(part["boards"].shape[1] for part in parts)
+    if len(dimensions) != 1:
+        raise ValueError("data files have different board dimensions {}".format(sorted(dimensions)))
+    return {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+
+
+def split_data(data):
+    """
+    Return (training, held out) masks of the positions, holding out the last
+    HOLDOUT of the games (positions of one game are strongly correlated).
+    """
+    cut = int(data["games"].max() * (1 - HOLDOUT)) if len(data["games"]) else 0
+    held_out = data["games"] > cut
+    if held_out.all() or not held_out.any():
+        return np.ones(len(held_out), dtype=bool), np.zeros(len(held_out), dtype=bool)
+    return ~held_out, held_out
+
+
+############ HEURISTIC WEIGHTS ##########################
+
+def square_mask(bitboard, dimension):
+    """
+    Return a (d, d) bool array of the squares of a bitboard.
+    """
+    bits = [(bitboard >> k) & 1 for k in range(dimension * dimension)]
+    return np.array(bits, dtype=bool).reshape(dimension, dimension)
+
+
+def heuristic_features(boards, players):
+    """
+    Return the (N, len(HEURISTIC_FEATURES)) array of the terms of
+    compute_heuristic for the player to move, so that compute_heuristic is
+    features @ heuristic_weights.
+    """
+    d = boards.shape[1]
+    players = players.reshape(-1, 1, 1)
+    own = boards == players
+    opp = (boards != 0) & ~own
+    features = np.zeros((len(boards), len(agent.HEURISTIC_FEATURES)))
+    features[:, 0] = own.sum(axis=(1, 2)) - opp.sum(axis=(1, 2))
+    features[:, 1] = legal_moves_batch(boards, players).sum(axis=(1, 2)) - legal_moves_batch(boards, 3 - players).sum(axis=(1, 2))
+    if d >= 4:
+        # Same board size check as compute_heuristic
+        for k, bitboard in enumerate(agent.get_heuristic_masks(d)):
+            mask = square_mask(bitboard, d)
+            features[:, 2 + k] = (own & mask).sum(axis=(1, 2)) - (opp & mask).sum(axis=(1, 2))
+    return features
+
+
+def stability_features(boards, players):
+    """
+    Return the (N, len(STABILITY_FEATURES)) array of the stable and frontier
+    disk differences for the player to move (see
+    compute_stability_heuristic).
+    """
+    n, d, _ = boards.shape
+    own = np.packbits((boards == players.reshape(-1, 1, 1)).reshape(n, -1), axis=1, bitorder="little")
+    opp = np.packbits(((boards != 0) & (boards != players.reshape(-1, 1, 1))).reshape(n, -1), axis=1, bitorder="little")
+    features = np.zeros((n, len(agent.STABILITY_FEATURES)))
+    for k in range(n):
+        own_disks = int.from_bytes(own[k].tobytes(), "little")
+        opp_disks = int.from_bytes(opp[k].tobytes(), "little")
+        own_stable, opp_stable = stable_disks(own_disks, opp_disks, d)
+        features[k, 0] = popcount(own_stable) - popcount(opp_stable)
+        features[k, 1] = popcount(frontier_disks(own_disks, opp_disks, d)) - popcount(frontier_disks(opp_disks, own_disks, d))
+    return features
+
+
+def fit_least_squares(features, labels):
+    """
+    Return the weights minimizing the squared error to labels (with a small
+    ridge penalty, for features that never vary, e.g. corners on tiny boards).
+    """
+    gram = features.T @ features
+    gram += RIDGE * np.trace(gram) / len(gram) * np.eye(len(gram))
+    return np.linalg.solve(gram, features.T @ labels)
+
+
+def fit_logistic(features, labels, iterations = 25):
+    """
+    Return the weights of a logistic regression of the game result (1 for a
+    win, 0.5 for a draw, 0 for a loss) on features by Newton's method,
+    rescaled by least squares to disk-difference units.
+    """
+    results = np.where(labels > 0, 1.0, np.where(labels < 0, 0.0, 0.5))
+    scale = features.std(axis=0)
+    scale[scale == 0] = 1
+    x = features / scale
+    weights = np.zeros(x.shape[1])
+    for _ in range(iterations):
+        p = 1 / (1 + np.exp(-(x @ weights)))
+        gradient = x.T @ (p - results) + RIDGE * len(x) * weights
+        hessian = (x * (p * (1 - p))[:, None]).T @ x + RIDGE * len(x) * np.eye(len(weights))
+        step = np.linalg.solve(hessian, gradient)
+        weights -= step
+        if np.abs(step).max() < 1e-8:
+            break
+    weights /= scale
+    # The search compares evaluations with the disk difference of finished
+    # games, so the log-odds are brought to that scale
+    values = features @ weights
+    weights *= (values @ labels) / (values @ values) if values.any() else 1.0
+    return weights
+
+
+def report(name, values, labels):
+    if len(labels) == 0:
+        return
+    rmse = np.sqrt(np.mean((values - labels) ** 2))
+    decided = labels != 0
+    accuracy = np.mean(np.sign(values[decided]) == np.sign(labels[decided])) if decided.any() else 0.0
+    print("{}: {} positions, rmse {:.2f} disks, winner predicted {:.1%}".format(name, len(labels), rmse, accuracy))
+
+
+def save_weights(path, features, weights, dimension, method):
+    with open(path, "w") as f:
+        json.dump({"features": list(features), "weights": [float(w) for w in weights],
+                   "dimension": dimension, "method": method}, f, indent=1)
+        f.write("\n")
+
+
+############ PATTERN WEIGHTS ##########################
+
+def pattern_cells(boards, players):
+    """
+    Return the cell array of othello_patterns (1 own, 2 opponent, padded)
+    for the player to move of every board.
+    """
+    flat = boards.reshape(len(boards), -1)
+    players = players.reshape(-1, 1)
+    cells = np.zeros((len(boards), flat.shape[1] + 1), dtype=np.int64)
+    cells[:, :-1] = np.where(flat == players, 1, np.where(flat != 0, 2, 0))
+    return cells
+
+
+def fit_patterns(boards, players, labels, epochs = 200, learning_rate = 0.5, ridge = RIDGE):
+    """
+    Fit the pattern tables to labels by full-batch gradient descent on the
+    squared error. Each entry's step is divided by the number of times it
+    occurs, so that rare entries learn as fast as common ones; entries that
+    never occur stay 0. Returns a PatternEvaluator.
+    """
+    evaluator = PatternEvaluator(boards.shape[1], np.zeros(PatternEvaluator(boards.shape[1]).layout.size))
+    indices = evaluator.layout.indices(pattern_cells(boards, players))
+    flat = indices.ravel()
+    counts = np.bincount(flat, minlength=evaluator.layout.size)
+    rate = learning_rate / (np.maximum(counts, 1) * indices.shape[1])
+    weights = np.zeros(evaluator.layout.size)
+    for _ in range(epochs):
+        errors = weights[indices].sum(axis=1) - labels
+        gradient = np.bincount(flat, weights=np.repeat(errors, indices.shape[1]), minlength=len(weights))
+        weights -= rate * (gradient + ridge * counts * weights)
+    evaluator.weights = weights.astype(np.float32)
+    return evaluator
+
+
+############ COMMAND LINE ##########################
+
+def main(argv):
+    usage = ('othello_tuning.py generate -d <dimension> -o <data.npz> [-n <games> -l <depth-limit> -r <random-plies> '
+             '-x <random-move-rate> -e <exact-empties> -i <weights.json> -w <workers> -s <seed>]\n'
+             'othello_tuning.py fit -i <data.npz> [-i <data.npz> ...] -o <weights.json> [-m least-squares|logistic -t]\n'
+             'othello_tuning.py fit-patterns -i <data.npz> [-i <data.npz> ...] -o <pattern-file> [-p <epochs>]')
+    if not argv or argv[0] not in ("generate", "fit", "fit-patterns"):
+        print(usage)
+        sys.exit(2)
+    command = argv[0]
+
+    dimension = 0
+    output = None
+    inputs = []
+    games = 100
+    limit = 2
+    opening_plies = 4
+    noise = 0.1
+    exact_empties = 10
+    workers = None
+    seed = 0
+    method = "least-squares"
+    stability = False
+    epochs = 200
+
+    try:
+        opts, args = getopt.getopt(argv[1:],"hd:o:i:n:l:r:x:e:w:s:m:tp:",["dimension=","output=","input=","games=","limit=",
+                                   "random-plies=","random-moves=","exact=","workers=","seed=","method=","stability","epochs="])
+    except getopt.GetoptError:
+        print(usage)
+        sys.exit(2)
+    for opt, arg in opts:
+        if opt == '-h':
+            print(usage)
+            sys.exit()
+        elif opt in ("-d", "--dimension"):
+            dimension = int(arg)
+        elif opt in ("-o", "--output"):
+            output = arg
+        elif opt in ("-i", "--input"):
+            inputs.append(arg)
+        elif opt in ("-n", "--games"):
+            games = int(arg)
+        elif opt in ("-l", "--limit"):
+            limit = int(arg)
+        elif opt in ("-r", "--random-plies"):
+            opening_plies = int(arg)
+        elif opt in ("-x", "--random-moves"):
+            noise = float(arg)
+        elif opt in ("-e", "--exact"):
+            exact_empties = int(arg)
+        elif opt in ("-w", "--workers"):
+            workers = int(arg)
+        elif opt in ("-s", "--seed"):
+            seed = int(arg)
+        elif opt in ("-m", "--method"):
+            method = arg
+        elif opt in ("-t", "--stability"):
+            stability = True
+        elif opt in ("-p", "--epochs"):
+            epochs = int(arg)
+
+    if output is None or (command == "generate" and dimension <= 0) or (command != "generate" and not inputs) \
+            or method not in ("least-squares", "logistic"):
+        print(usage)
+        sys.exit(2)
+
+    start = time.time()
+    if command == "generate":
+        # Self-play with the default weights, or with weights from an earlier fit
+        weights = agent.load_heuristic_weights(inputs[0], dimension) if inputs else agent.HEURISTIC_WEIGHTS
+        data = generate(dimension, games, limit, weights, opening_plies, noise, exact_empties, workers, seed)
+        save_data(output, data)
+        print("Wrote {} positions of {} games ({} solved exactly) to {} in {:.1f}s".format(
+            len(data["labels"]), games, int(data["exact"].sum()), output, time.time() - start))
+        return
+
+    data = load_data(inputs)
+    train, test = split_data(data)
+    labels = data["labels"].astype(np.float64)
+    if command == "fit":
+        features = heuristic_features(data["boards"], data["players"])
+        names = agent.HEURISTIC_FEATURES
+        defaults = agent.HEURISTIC_WEIGHTS
+        if stability:
+            # Weights for compute_stability_heuristic
+            features = np.hstack([features, stability_features(data["boards"], data["players"])])
+            names += agent.STABILITY_FEATURES
+            defaults += agent.STABILITY_WEIGHTS
+        fit = fit_least_squares if method == "least-squares" else fit_logistic
+        weights = fit(features[train], labels[train])
+        for name, w in zip(names, weights):
+            print("{:>13} {:10.4f}".format(name, w))
+        report("training", features[train] @ weights, labels[train])
+        report("held out", features[test] @ weights, labels[test])
+        report("held out, default weights", features[test] @ np.array(defaults, dtype=float), labels[test])
+        save_weights(output, names, weights, data["boards"].shape[1], method)
+    else:
+        evaluator = fit_patterns(data["boards"][train], data["players"][train], labels[train], epochs)
+        for name, mask in (("training", train), ("held out", test)):
+            if mask.any():
+                values = evaluator.evaluate_cells(pattern_cells(data["boards"][mask], data["players"][mask]))
+                report(name, values, labels[mask])
+        evaluator.save(output)
+    print("Wrote {} in {:.1f}s".format(output, time.time() - start))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
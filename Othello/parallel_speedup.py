@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Reports how well the parallel root split search in agent.py scales.
+
+For the opening position of the 6x6 and 8x8 boards, the move is searched with
+select_move_alphabeta on one core and with select_move_parallel on 1, 2, 4, ...
+worker processes, and the speedup over the sequential search is printed.
+"""
+import sys, getopt
+import time
+
+import agent
+from othello_game import OthelloGameManager
+
+# Default depth limit for each board dimension
+LIMITS = {6: 9, 8: 8}
+
+
+def time_search(search, *args):
+    start = time.time()
+    move = search(*args)
+    return move, time.time() - start
+
+
+def report(dimension, limit, caching, ordering, max_workers):
+    board = tuple(tuple(row) for row in OthelloGameManager(dimension).board)
+
+    agent.tt.clear()
+    move, sequential = time_search(agent.select_move_alphabeta, board, 1, limit, caching, ordering)
+    print("{0}x{0} opening, depth {1}: sequential {2:.3f}s, plays {3}".format(dimension, limit, sequential, move))
+
+    workers = 1
+    while workers <= max_workers:
+        # A depth 1 search starts the pool, so that process startup is not
+        # part of the timing.
+        agent.select_move_parallel(board, 1, 1, caching, ordering, workers)
+        move, parallel = time_search(agent.select_move_parallel, board, 1, limit, caching, ordering, workers)
+        print("  {:2d} workers: {:.3f}s, speedup {:.2f}, plays {}".format(workers, parallel, sequential / parallel, move))
+        workers *= 2
+        agent.worker_pool.terminate()
+        agent.worker_pool = None
+
+
+def main(argv):
+    caching = 0
+    ordering = 0
+    limit = None
+    max_workers = agent.multiprocessing.cpu_count()
+
+    try:
+        opts, args = getopt.getopt(argv,"hcol:w:",["limit=","workers="])
+    except getopt.GetoptError:
+        print('parallel_speedup.py [-l <depth-limit> -w <max-workers> -c -o]')
+        sys.exit(2)
+    for opt, arg in opts:
+        if opt == '-h':
+            print('parallel_speedup.py [-l <depth-limit> -w <max-workers> -c -o]')
+            sys.exit()
+        elif opt in ("-c", "--caching"):
+            caching = 1
+        elif opt in ("-o", "--ordering"):
+            ordering = 1
+        elif opt in ("-l", "--limit"):
+            limit = int(arg)
+        elif opt in ("-w", "--workers"):
+            max_workers = int(arg)
+
+    print("{} cores available".format(agent.multiprocessing.cpu_count()))
+    for dimension in (6, 8):
+        report(dimension, limit or LIMITS[dimension], caching, ordering, max_workers)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,91 @@
+"""
+Tests that the agent's search modes agree: alpha-beta (with and without
+caching, ordering and symmetric hashing), iterative deepening, principal
+variation search and the parallel search all find the minimax value.
+"""
+
+import unittest
+
+import agent
+from othello_bitboard import play_move
+from test_othello_bitboard import random_positions
+
+DEPTHS = (1, 2, 3, 4)
+
+
+def minimax_value(board, color, limit):
+    return agent.negamax_node(board, color, color, float('-inf'), float('inf'), limit, 0, 0, None, False)[1]
+
+
+def move_value(board, color, move, limit):
+    # Value for color of playing move, searched to limit plies in all
+    return -minimax_value(play_move(board, color, move[0], move[1]), 3 - color, limit - 1) if limit > 1 else \
+        agent.evaluate(play_move(board, color, move[0], move[1]), color)
+
+
+class TestSearchModes(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # Positions with moves from every stage of 6x6 games
+        cls.positions = [(board, color) for board, color in random_positions(6, 4)[::5]
+                         if agent.get_possible_moves(board, color)]
+
+    @classmethod
+    def tearDownClass(cls):
+        if agent.worker_pool is not None:
+            agent.worker_pool.terminate()
+            agent.worker_pool = None
+
+    def setUp(self):
+        agent.evaluate, agent.evaluate_batch = agent.compute_heuristic, None
+        agent.symmetry = 0
+        agent.probcut = None
+        agent.tt.clear()
+
+    def tearDown(self):
+        agent.evaluate = agent.compute_utility
+        agent.symmetry = 0
+        agent.tt.clear()
+
+    def check_values(self):
+        for board, color in self.positions:
+            for limit in DEPTHS:
+                value = minimax_value(board, color, limit)
+                for caching in (0, 1):
+                    for ordering in (0, 1):
+                        agent.tt.clear()
+                        _, alphabeta = agent.negamax_node(board, color, color, float('-inf'), float('inf'), limit,
+                                                          caching, ordering)
+                        self.assertEqual(alphabeta, value, (board, color, limit, caching, ordering))
+
+    def test_alphabeta_values(self):
+        self.check_values()
+
+    def test_symmetric_hashing(self):
+        agent.symmetry = 1
+        self.check_values()
+
+    def test_selected_moves(self):
+        searches = {
+            "minimax": lambda board, color, limit: agent.select_move_minimax(board, color, limit, 1),
+            "alphabeta": lambda board, color, limit: agent.select_move_alphabeta(board, color, limit, 1, 1),
+            "iterative": lambda board, color, limit: agent.select_move_iterative(board, color, 60, limit, 1),
+            "pvs": lambda board, color, limit: agent.select_move_pvs(board, color, limit),
+            "parallel": lambda board, color, limit: agent.select_move_parallel(board, color, limit, 1, 1, 2),
+        }
+        for board, color in self.positions:
+            for limit in DEPTHS:
+                value = minimax_value(board, color, limit)
+                for name, search in searches.items():
+                    # A deeper result in the table may settle a shallower
+                    # search, so every search starts with empty tables, in the
+                    # workers too
+                    agent.tt.clear()
+                    agent.game_number += 1
+                    move = search(board, color, limit)
+                    self.assertEqual(move_value(board, color, move, limit), value, (name, board, color, limit))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+"""
+Tests of the bitboard functions against the tuple board versions in
+othello_shared, on positions of random games.
+"""
+
+import random
+import unittest
+
+import othello_bitboard
+import othello_shared
+from othello_game import OthelloGameManager
+
+DIMENSIONS = (4, 6, 8, 10)
+
+
+def random_positions(dimension, games, seed = 0):
+    """
+    Return the (board, player) positions of random games played to the end,
+    the final positions included.
+    """
+    rng = random.Random(seed + dimension)
+    positions = []
+    for _ in range(games):
+        board = tuple(tuple(row) for row in OthelloGameManager(dimension).board)
+        player = 1
+        while True:
+            positions.append((board, player))
+            moves = othello_shared.get_possible_moves(board, player)
+            if not moves:
+                break
+            board = othello_shared.play_move(board, player, *rng.choice(moves))
+            player = 3 - player
+    return positions
+
+
+class TestBitboard(unittest.TestCase):
+
+    def test_conversions(self):
+        for dimension in DIMENSIONS:
+            for board, _ in random_positions(dimension, 2):
+                dark, light = othello_bitboard.to_bitboards(board)
+                self.assertEqual(othello_bitboard.from_bitboards(dark, light, dimension), board)
+                self.assertEqual(othello_bitboard.Board(dark, light, dimension).to_tuple(), board)
+
+    def test_same_as_othello_shared(self):
+        for dimension in DIMENSIONS:
+            for board, player in random_positions(dimension, 3):
+                self.assertEqual(othello_bitboard.get_score(board), othello_shared.get_score(board))
+                moves = othello_shared.get_possible_moves(board, player)
+                self.assertEqual(othello_bitboard.get_possible_moves(board, player), moves)
+                self.assertEqual(othello_bitboard.get_possible_moves(board, 3 - player),
+                                 othello_shared.get_possible_moves(board, 3 - player))
+                for i in range(dimension):
+                    for j in range(dimension):
+                        if board[j][i] == 0:
+                            self.assertEqual(othello_bitboard.find_lines(board, i, j, player),
+                                             othello_shared.find_lines(board, i, j, player))
+                for i, j in moves:
+                    self.assertEqual(othello_bitboard.play_move(board, player, i, j),
+                                     othello_shared.play_move(board, player, i, j))
+
+
+class TestBoard(unittest.TestCase):
+
+    def test_make_and_undo(self):
+        for dimension in DIMENSIONS:
+            for board, player in random_positions(dimension, 2)[::2]:
+                mutable = othello_bitboard.Board.from_tuple(board)
+                for i, j in othello_shared.get_possible_moves(board, player):
+                    after = othello_shared.play_move(board, player, i, j)
+                    mutable.make_move(player, i, j)
+                    self.assertEqual(mutable.to_tuple(), after)
+                    # One more move on top, then both back
+                    replies = othello_shared.get_possible_moves(after, 3 - player)
+                    if replies:
+                        mutable.make_move(3 - player, *replies[0])
+                        mutable.undo_move()
+                        self.assertEqual(mutable.to_tuple(), after)
+                    mutable.undo_move()
+                    self.assertEqual(mutable.to_tuple(), board)
+                self.assertEqual(mutable.history, [])
+
+    def check_features(self, mutable, board):
+        dimension = len(board)
+        self.assertEqual(tuple(mutable.counts[1:]), othello_shared.get_score(board))
+        self.assertEqual(mutable.empty_count(), sum(row.count(0) for row in board))
+        for player in (1, 2):
+            self.assertEqual(mutable.mobility_count(player), len(othello_shared.get_possible_moves(board, player)))
+            frontier = 0
+            for j in range(dimension):
+                for i in range(dimension):
+                    if board[j][i] == player and any(board[v][u] == 0
+                                                     for u in range(max(0, i - 1), min(dimension, i + 2))
+                                                     for v in range(max(0, j - 1), min(dimension, j + 2))):
+                        frontier += 1
+            self.assertEqual(mutable.frontier(player), frontier)
+
+    def test_features(self):
+        for dimension in DIMENSIONS:
+            for seed in range(2):
+                # One game, played on the same Board
+                positions = random_positions(dimension, 1, seed)
+                mutable = othello_bitboard.Board.from_tuple(positions[0][0])
+                for (board, player), (after, _) in zip(positions, positions[1:]):
+                    move = next(move for move in othello_shared.get_possible_moves(board, player)
+                                if othello_shared.play_move(board, player, *move) == after)
+                    # The features are cached per position, so check them
+                    # before and after the move and after taking it back
+                    self.check_features(mutable, board)
+                    mutable.make_move(player, *move)
+                    self.check_features(mutable, after)
+                    mutable.undo_move()
+                    self.check_features(mutable, board)
+                    mutable.make_move(player, *move)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+"""
+Tests of opening book files: writing and reading them back, and probing a
+built book from the agent.
+"""
+
+import os
+import random
+import tempfile
+import unittest
+
+import agent
+from othello_book import OpeningBook, build_book, write_book
+from othello_game import OthelloGameManager
+from othello_shared import get_possible_moves, play_move
+
+PLIES = 4
+DEPTH = 2
+
+
+def search(board, color):
+    return agent.select_move_alphabeta(board, color, DEPTH)
+
+
+def move_value(board, color, move):
+    # Value of move in a search to DEPTH
+    nxt_board = play_move(board, color, move[0], move[1])
+    return -agent.negamax_node(nxt_board, 3 - color, color, float('-inf'), float('inf'), DEPTH - 1)[1]
+
+
+class TestOpeningBook(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "book.bin")
+
+    def tearDown(self):
+        agent.book = None
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        rng = random.Random(0)
+        entries = {rng.getrandbits(64): (rng.randrange(8), rng.randrange(8)) for _ in range(500)}
+        for canonical in (True, False):
+            write_book(self.path, 8, entries, canonical)
+            book = OpeningBook(self.path)
+            try:
+                self.assertEqual((len(book), book.dimension, book.canonical), (len(entries), 8, canonical))
+                for key, move in entries.items():
+                    self.assertEqual(book.probe(key), move)
+                for key in range(100):
+                    self.assertIsNone(book.probe(key))
+            finally:
+                book.close()
+
+    def test_not_a_book(self):
+        with open(self.path, "wb") as f:
+            f.write(b"OTGR" + bytes(20))
+        with self.assertRaises(ValueError):
+            OpeningBook(self.path)
+
+    def test_book_moves(self):
+        write_book(self.path, 6, build_book(6, PLIES, search))
+        agent.book = OpeningBook(self.path)
+        rng = random.Random(1)
+        initial = tuple(tuple(row) for row in OthelloGameManager(6).board)
+        for book_side in (1, 2):
+            for _ in range(5):
+                board, color = initial, 1
+                for _ in range(PLIES):
+                    moves = get_possible_moves(board, color)
+                    if color == book_side:
+                        # The book was searched on one of the symmetric
+                        # boards, which may break ties another way
+                        move = agent.probe_book(board, color)
+                        self.assertIn(move, moves)
+                        self.assertEqual(move_value(board, color, move), max(move_value(board, color, other) for other in moves))
+                    else:
+                        move = rng.choice(moves)
+                    board, color = play_move(board, color, *move), 3 - color
+        agent.book.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+"""
+Tests of the endgame solver against a plain search of the whole game tree.
+"""
+
+import unittest
+
+from othello_bitboard import Board
+from othello_endgame import EndgameSolver, SolverTimeout
+from othello_shared import get_possible_moves, get_score, play_move
+from test_othello_bitboard import random_positions
+
+
+def final_difference(board, player):
+    """
+    Return the final disk difference for player with perfect play, by
+    searching every line of the game.
+    """
+    moves = get_possible_moves(board, player)
+    if not moves:
+        dark, light = get_score(board)
+        return dark - light if player == 1 else light - dark
+    return max(-final_difference(play_move(board, player, i, j), 3 - player) for i, j in moves)
+
+
+def endgame_positions(dimension, games, empties):
+    return [(board, player) for board, player in random_positions(dimension, games)
+            if sum(row.count(0) for row in board) <= empties]
+
+
+class TestEndgameSolver(unittest.TestCase):
+
+    def test_solved_values(self):
+        solver = EndgameSolver()
+        for board, player in endgame_positions(4, 6, 9) + endgame_positions(6, 4, 8):
+            value = final_difference(board, player)
+            move, solved = solver.select_move(Board.from_tuple(board), player)
+            self.assertEqual(solved, value, board)
+            if move is None:
+                self.assertEqual(get_possible_moves(board, player), [])
+            else:
+                self.assertEqual(-final_difference(play_move(board, player, move[0], move[1]), 3 - player), value)
+            # Win, draw or loss only
+            _, sign = solver.select_move(Board.from_tuple(board), player, exact=False)
+            self.assertEqual((sign > 0) - (sign < 0), (value > 0) - (value < 0), board)
+
+    def test_timeout(self):
+        board, player = endgame_positions(8, 1, 16)[0]
+        with self.assertRaises(SolverTimeout):
+            EndgameSolver().select_move(Board.from_tuple(board), player, deadline=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
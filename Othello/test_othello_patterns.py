@@ -0,0 +1,63 @@
+"""
+Tests of the pattern evaluator: symmetric boards get the same value whatever
+the tables hold, and all the ways of evaluating boards agree.
+"""
+
+import os
+import tempfile
+import unittest
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from test_othello_bitboard import random_positions
+from test_othello_transposition import transform_board
+
+if np is not None:
+    from othello_patterns import PatternEvaluator
+
+DIMENSIONS = (4, 6, 8)
+
+
+@unittest.skipIf(np is None, "othello_patterns needs NumPy")
+class TestPatterns(unittest.TestCase):
+
+    def random_evaluator(self, dimension):
+        # Small integer weights, so that float32 sums are exact in any order
+        size = PatternEvaluator(dimension).layout.size
+        return PatternEvaluator(dimension, np.random.RandomState(dimension).randint(-100, 100, size))
+
+    def test_symmetric_boards(self):
+        for dimension in DIMENSIONS:
+            for evaluator in (PatternEvaluator(dimension), self.random_evaluator(dimension)):
+                for board, player in random_positions(dimension, 2)[::3]:
+                    value = evaluator.evaluate(board, player)
+                    for symmetry in range(8):
+                        self.assertEqual(evaluator.evaluate(transform_board(board, symmetry), player), value)
+
+    def test_batch(self):
+        for dimension in DIMENSIONS:
+            evaluator = self.random_evaluator(dimension)
+            positions = random_positions(dimension, 2)
+            for color in (1, 2):
+                boards = [board for board, _ in positions]
+                values = [evaluator.evaluate(board, color) for board in boards]
+                self.assertEqual(list(evaluator.evaluate_batch(boards, color)), values)
+                self.assertEqual(list(evaluator.evaluate_batch(np.array(boards), color)), values)
+
+    def test_save_and_load(self):
+        evaluator = self.random_evaluator(6)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "patterns.bin")
+            evaluator.save(path)
+            loaded = PatternEvaluator.load(path)
+        self.assertEqual(loaded.layout.dimension, 6)
+        self.assertTrue(np.array_equal(loaded.weights, evaluator.weights))
+        with self.assertRaises(ValueError):
+            PatternEvaluator(8, evaluator.weights)
+
+
+if __name__ == "__main__":
+    unittest.main()
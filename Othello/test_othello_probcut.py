@@ -0,0 +1,69 @@
+"""
+Tests of the Multi-ProbCut calibration: fitting the cut table, saving and
+loading it, and the checks deeper searches get.
+"""
+
+import os
+import random
+import tempfile
+import unittest
+
+from othello_probcut import MIN_DEPTH, fit_line, fit_probcut, load_probcut, shallow_depths
+
+
+def synthetic_records(count, max_depth, seed = 0):
+    # Values that grow by 2 and 10 with every ply, with noise of deviation 5
+    rng = random.Random(seed)
+    records = []
+    for _ in range(count):
+        value = rng.uniform(-100, 100)
+        records.append({"dimension": 8, "evaluation": "heuristic=1", "empties": rng.randrange(1, 61),
+                        "values": [2 * depth * value + 10 * depth + rng.gauss(0, 5) for depth in range(max_depth + 1)]})
+    return records
+
+
+class TestProbCut(unittest.TestCase):
+
+    def test_fit_line(self):
+        a, b, sigma = fit_line([(x, 3 * x - 2) for x in range(10)])
+        self.assertAlmostEqual(a, 3)
+        self.assertAlmostEqual(b, -2)
+        self.assertAlmostEqual(sigma, 0)
+
+    def test_fit_and_load(self):
+        probcut = fit_probcut(synthetic_records(400, 6), 1.2)
+        self.assertEqual((probcut.dimension, probcut.evaluation, probcut.min_depth, probcut.max_depth),
+                         (8, "heuristic=1", MIN_DEPTH, 6))
+        for stage, depth, shallow, a, b, sigma, samples in probcut.pairs:
+            self.assertIn(shallow, shallow_depths(depth))
+            self.assertAlmostEqual(a / (depth / shallow), 1, delta=0.05)
+            # The noise of both values, the shallow one scaled by a
+            self.assertLess(sigma, 1.5 * 5 * (1 + a * a) ** 0.5)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "probcut.json")
+            probcut.save(path)
+            loaded = load_probcut(path)
+            self.assertEqual((loaded.threshold, loaded.path), (1.2, path))
+            self.assertEqual(loaded.checks, probcut.checks)
+            self.assertEqual(load_probcut(path, 0.5).threshold, 0.5)
+
+    def test_checks(self):
+        probcut = fit_probcut(synthetic_records(400, 6))
+        for empties in (50, 10):
+            # Nothing to check below the shallowest calibrated depth
+            self.assertEqual(probcut.get_checks(empties, MIN_DEPTH - 1), ())
+            checks = probcut.get_checks(empties, 6)
+            self.assertEqual([shallow for shallow, _, _, _ in checks], [2, 4])
+            # Deeper searches reuse the deepest checks as many plies deeper
+            self.assertEqual(probcut.get_checks(empties, 9), [(shallow + 3, a, b, margin) for shallow, a, b, margin in checks])
+
+    def test_mixed_records(self):
+        records = synthetic_records(100, 4)
+        records[0]["dimension"] = 6
+        with self.assertRaises(ValueError):
+            fit_probcut(records)
+
+
+if __name__ == "__main__":
+    unittest.main()
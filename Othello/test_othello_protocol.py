@@ -0,0 +1,78 @@
+"""
+Tests of the binary protocol: frames must decode to what was encoded, also
+when the stream delivers them a few bytes at a time like a pipe, and the
+version is only agreed when the AI announces it.
+"""
+
+import io
+import unittest
+
+from othello_protocol import (BOARD, FINAL, MOVE, UPDATE, VERSION, decode_board, decode_move, decode_scores,
+                              decode_update, encode_board, encode_final, encode_move, encode_update, introduction,
+                              parse_introduction, read_frame)
+from test_othello_bitboard import random_positions
+
+
+class ChunkedStream(object):
+    """
+    A stream that returns at most size bytes per read.
+    """
+
+    def __init__(self, data, size):
+        self.stream = io.BytesIO(data)
+        self.size = size
+
+    def read(self, size):
+        return self.stream.read(min(size, self.size))
+
+
+class TestProtocol(unittest.TestCase):
+
+    def test_frames(self):
+        frames = []
+        expected = []
+        for dimension in (4, 6, 8, 10):
+            for board, _ in random_positions(dimension, 1)[::4]:
+                frames.append(encode_board(dimension * 3, 255 + dimension, board))
+                expected.append((BOARD, (dimension * 3, 255 + dimension, board)))
+        moves = [(1 + k % 2, k % 16, k // 16) for k in range(255)]
+        frames.append(encode_update(0, 65535, moves))
+        expected.append((UPDATE, (0, 65535, moves)))
+        frames.append(encode_update(2, 2, []))
+        expected.append((UPDATE, (2, 2, [])))
+        frames.append(encode_move(15, 0))
+        expected.append((MOVE, (15, 0)))
+        frames.append(encode_final(10, 54))
+        expected.append((FINAL, (10, 54)))
+
+        for size in (1, 3, 1 << 16):
+            stream = ChunkedStream(b"".join(frames), size)
+            for kind, values in expected:
+                found, payload = read_frame(stream)
+                self.assertEqual(found, kind)
+                if kind == BOARD:
+                    dark_score, light_score, board = decode_board(payload)
+                    self.assertEqual((dark_score, light_score, board.to_tuple()), values)
+                elif kind == UPDATE:
+                    self.assertEqual(decode_update(payload), values)
+                elif kind == MOVE:
+                    self.assertEqual(decode_move(payload), values)
+                else:
+                    self.assertEqual(decode_scores(payload), values)
+            with self.assertRaises(EOFError):
+                read_frame(stream)
+
+    def test_truncated_frame(self):
+        with self.assertRaises(EOFError):
+            read_frame(io.BytesIO(encode_move(1, 2)[:-1]))
+
+    def test_introduction(self):
+        self.assertEqual(parse_introduction(introduction("Othello AI") + "\n"), ("Othello AI", VERSION))
+        self.assertEqual(parse_introduction("Randy\n"), ("Randy", 0))
+        self.assertEqual(parse_introduction("Future,protocol=99"), ("Future", VERSION))
+        self.assertEqual(parse_introduction("Odd,protocol=x"), ("Odd", 0))
+        self.assertEqual(parse_introduction("Other,colour=red,protocol"), ("Other", 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+"""
+Tests of game record files and the position index: games written must read
+back and replay to the same positions, and the index must find every
+position of every game.
+"""
+
+import os
+import random
+import tempfile
+import unittest
+
+from othello_game import OthelloGameManager
+from othello_records import GameIndex, GameRecordWriter, build_index, read_game, read_games
+from othello_shared import get_possible_moves, get_score, play_move
+from othello_transposition import zobrist_hash
+
+
+def random_game(dimension, seed):
+    """
+    Return the moves of a random game and its (board, player) positions,
+    before every move and the final one.
+    """
+    rng = random.Random(seed)
+    board = tuple(tuple(row) for row in OthelloGameManager(dimension).board)
+    player = 1
+    moves = []
+    positions = [(board, player)]
+    while True:
+        possible_moves = get_possible_moves(board, player)
+        if not possible_moves:
+            return moves, positions
+        moves.append(rng.choice(possible_moves))
+        board = play_move(board, player, *moves[-1])
+        player = 3 - player
+        positions.append((board, player))
+
+
+class TestGameRecords(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.records = os.path.join(self.directory.name, "games.otgr")
+        self.index = os.path.join(self.directory.name, "games.otgi")
+        self.games = [(dimension, "dark {}".format(k), "light é") + random_game(dimension, k)
+                      for k, dimension in enumerate((4, 6, 8, 10, 8, 16))]
+        writer = GameRecordWriter(self.records)
+        for dimension, dark, light, moves, positions in self.games[:3]:
+            writer.write(dimension, dark, light, *get_score(positions[-1][0]), moves)
+        writer.close()
+        # Appending to an existing file
+        writer = GameRecordWriter(self.records)
+        for dimension, dark, light, moves, positions in self.games[3:]:
+            writer.write(dimension, dark, light, *get_score(positions[-1][0]), moves)
+        writer.close()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_read_and_replay(self):
+        records = list(read_games(self.records))
+        self.assertEqual(len(records), len(self.games))
+        for record, (dimension, dark, light, moves, positions) in zip(records, self.games):
+            self.assertEqual((record.dimension, record.dark, record.light, record.moves), (dimension, dark, light, moves))
+            self.assertEqual((record.dark_score, record.light_score), get_score(positions[-1][0]))
+            self.assertEqual([(board, player) for _, board, player, _ in record.replay()], positions)
+            self.assertEqual([key for _, key in record.hashes()],
+                             [zobrist_hash(board, player) for board, player in positions])
+            self.assertEqual(read_game(self.records, record.offset).moves, moves)
+
+    def test_index(self):
+        games, positions = build_index(self.records, self.index)
+        self.assertEqual(games, len(self.games))
+        self.assertEqual(positions, sum(len(game[4]) for game in self.games))
+        index = GameIndex(self.index)
+        try:
+            self.assertEqual(len(index), positions)
+            for game, (_, _, _, moves, game_positions) in enumerate(self.games):
+                self.assertEqual(read_game(self.records, index.game_offset(game)).moves, moves)
+                for ply, (board, player) in enumerate(game_positions):
+                    occurrences = index.lookup(zobrist_hash(board, player))
+                    self.assertIn((game, ply), occurrences)
+                    # Every occurrence is the same position
+                    for other, other_ply in occurrences:
+                        self.assertEqual(self.games[other][4][other_ply], (board, player))
+            self.assertEqual(index.lookup(0), [])
+        finally:
+            index.close()
+
+    def test_not_a_record_file(self):
+        with open(self.index, "wb") as f:
+            f.write(b"OTBK" + bytes(20))
+        with self.assertRaises(ValueError):
+            list(read_games(self.index))
+        with self.assertRaises(ValueError):
+            GameIndex(self.index)
+
+
+if __name__ == "__main__":
+    unittest.main()
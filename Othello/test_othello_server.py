@@ -0,0 +1,68 @@
+"""
+Tests of the match server: games between AI subprocesses, and how a game
+ends when an AI misbehaves.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+
+from othello_server import play_match, run_league
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# An AI that answers every board with a square off the board
+BAD_MOVE_AI = """
+print("Bad")
+input()
+while True:
+    status = input().split()[0]
+    if status == "FINAL":
+        break
+    input()
+    print("99 99", flush=True)
+"""
+
+
+class TestServer(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.bad_ai = os.path.join(self.directory.name, "bad_ai.py")
+        with open(self.bad_ai, "w") as f:
+            f.write(BAD_MOVE_AI)
+        self.cwd = os.getcwd()
+        os.chdir(HERE) # players are given as files next to the server
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.directory.cleanup()
+
+    def test_game_between_ais(self):
+        result = asyncio.run(play_match(4, "agent.py,limit=2", "randy_ai.py", stderr=asyncio.subprocess.DEVNULL))
+        self.assertEqual(result["reason"], "end")
+        self.assertLessEqual(result["dark_score"] + result["light_score"], 16)
+        self.assertEqual(result["winner"], 1 if result["dark_score"] > result["light_score"] else
+                         2 if result["light_score"] > result["dark_score"] else 0)
+
+    def test_move_off_the_board_loses(self):
+        result = asyncio.run(play_match(4, self.bad_ai, "randy_ai.py"))
+        self.assertEqual(result["reason"], "invalid move")
+        self.assertEqual(result["loser"], 1)
+        self.assertEqual(result["winner"], 2)
+
+    def test_bad_move_does_not_stop_the_league(self):
+        with open(os.devnull, "w") as output:
+            sys.stdout, stdout = output, sys.stdout
+            try:
+                results = asyncio.run(run_league([self.bad_ai, "randy_ai.py"], 4, 2, None, 2))
+            finally:
+                sys.stdout = stdout
+        self.assertEqual(len(results), 2)
+        self.assertEqual(sorted(result["reason"] for result in results), ["invalid move", "invalid move"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+"""
+Tests of the ray tables in othello_shared against the original
+direction-by-direction scan.
+"""
+
+import unittest
+
+from othello_shared import find_lines, get_possible_moves, is_legal_move
+from test_othello_bitboard import DIMENSIONS, random_positions
+
+
+def scan_lines(board, i, j, player):
+    # find_lines as it was before the ray tables
+    lines = []
+    for xdir, ydir in [[0, 1], [1, 1], [1, 0], [1, -1], [0, -1], [-1, -1], [-1, 0], [-1, 1]]:
+        u = i + xdir
+        v = j + ydir
+        line = []
+        found = False
+        while u >= 0 and u < len(board) and v >= 0 and v < len(board):
+            if board[v][u] == 0:
+                break
+            elif board[v][u] == player:
+                found = True
+                break
+            else:
+                line.append((u, v))
+            u += xdir
+            v += ydir
+        if found and line:
+            lines.append(line)
+    return lines
+
+
+class TestRays(unittest.TestCase):
+
+    def test_same_as_scan(self):
+        for dimension in DIMENSIONS:
+            for board, player in random_positions(dimension, 3):
+                for color in (player, 3 - player):
+                    moves = []
+                    for i in range(dimension):
+                        for j in range(dimension):
+                            if board[j][i] != 0:
+                                continue
+                            lines = scan_lines(board, i, j, color)
+                            self.assertEqual(find_lines(board, i, j, color), lines)
+                            self.assertEqual(is_legal_move(board, i, j, color), bool(lines))
+                            if lines:
+                                moves.append((i, j))
+                    self.assertEqual(get_possible_moves(board, color), moves)
+
+
+if __name__ == "__main__":
+    unittest.main()
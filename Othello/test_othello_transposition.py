@@ -0,0 +1,123 @@
+"""
+Tests of the Zobrist hashes and the transposition table.
+"""
+
+import random
+import unittest
+
+from othello_bitboard import Board, play_move
+from othello_game import OthelloGameManager
+from othello_transposition import (EXACT, LANE, LOWER, SYMMETRIES, UPPER, TranspositionTable, canonical_hash,
+                                   get_symmetries, inverse_move, symmetric_hash, transform_move, update_hash,
+                                   update_symmetric_hash, zobrist_hash)
+from test_othello_bitboard import DIMENSIONS
+
+
+def random_game(dimension, rng):
+    """
+    Play a random game on a Board and return its (board, player, i, j,
+    flips) moves, with the tuple board before each, and the final board.
+    """
+    board = Board.from_tuple(tuple(tuple(row) for row in OthelloGameManager(dimension).board))
+    player = 1
+    moves = []
+    while True:
+        legal = board.get_possible_moves(player)
+        if not legal:
+            return moves, board.to_tuple()
+        i, j = rng.choice(legal)
+        before = board.to_tuple()
+        moves.append((before, player, i, j, board.make_move(player, i, j)))
+        player = 3 - player
+
+
+class TestZobrist(unittest.TestCase):
+
+    def test_update_hash(self):
+        rng = random.Random(0)
+        for dimension in DIMENSIONS:
+            for _ in range(3):
+                moves, final = random_game(dimension, rng)
+                boards = [board for board, _, _, _, _ in moves] + [final]
+                key = zobrist_hash(boards[0], 1)
+                for k, (_, player, i, j, flips) in enumerate(moves):
+                    key = update_hash(key, dimension, player, i, j, flips)
+                    self.assertEqual(key, zobrist_hash(boards[k + 1], 3 - player))
+
+    def test_side_to_move(self):
+        for dimension in DIMENSIONS:
+            board = random_game(dimension, random.Random(dimension))[0][4][0]
+            self.assertNotEqual(zobrist_hash(board, 1), zobrist_hash(board, 2))
+
+
+def transform_board(board, symmetry):
+    dimension = len(board)
+    cells = [0] * (dimension * dimension)
+    for k, image in enumerate(get_symmetries(dimension)[symmetry]):
+        cells[image] = board[k // dimension][k % dimension]
+    return tuple(tuple(cells[j * dimension:(j + 1) * dimension]) for j in range(dimension))
+
+
+class TestSymmetricHash(unittest.TestCase):
+
+    def test_update_symmetric_hash(self):
+        rng = random.Random(1)
+        for dimension in DIMENSIONS:
+            moves, final = random_game(dimension, rng)
+            boards = [board for board, _, _, _, _ in moves] + [final]
+            key = symmetric_hash(boards[0], 1)
+            for k, (_, player, i, j, flips) in enumerate(moves):
+                key = update_symmetric_hash(key, dimension, player, i, j, flips)
+                self.assertEqual(key, symmetric_hash(boards[k + 1], 3 - player))
+                # The first lane is the plain hash
+                self.assertEqual(key & LANE, zobrist_hash(boards[k + 1], 3 - player))
+
+    def test_symmetric_boards(self):
+        rng = random.Random(2)
+        for dimension in DIMENSIONS:
+            moves, _ = random_game(dimension, rng)
+            for board, player, i, j, _ in moves[::3]:
+                canonical, symmetry = canonical_hash(symmetric_hash(board, player))
+                after = canonical_hash(symmetric_hash(play_move(board, player, i, j), 3 - player))[0]
+                # A move stored in the canonical orientation, read back on any
+                # symmetric board, leads to a position symmetric to the one
+                # after the move itself
+                canonical_move = transform_move((i, j), symmetry, dimension)
+                self.assertEqual(inverse_move(canonical_move, symmetry, dimension), (i, j))
+                for t in range(SYMMETRIES):
+                    image = transform_board(board, t)
+                    image_canonical, image_symmetry = canonical_hash(symmetric_hash(image, player))
+                    self.assertEqual(image_canonical, canonical)
+                    u, v = inverse_move(canonical_move, image_symmetry, dimension)
+                    self.assertEqual(canonical_hash(symmetric_hash(play_move(image, player, u, v), 3 - player))[0], after)
+
+
+class TestTranspositionTable(unittest.TestCase):
+
+    def test_store_and_probe(self):
+        tt = TranspositionTable(1 << 8)
+        tt.store(12345, 3, EXACT, 10, (2, 3))
+        self.assertEqual(tt.probe(12345)[:5], (12345, 3, EXACT, 10, (2, 3)))
+        self.assertIsNone(tt.probe(54321))
+        tt.clear()
+        self.assertIsNone(tt.probe(12345))
+        self.assertEqual(len(tt), 0)
+
+    def test_replacement(self):
+        tt = TranspositionTable(2)
+        # With a single bucket, all keys collide
+        tt.store(1, 5, LOWER, 10, None)
+        tt.store(2, 2, UPPER, 20, None)
+        self.assertEqual(tt.probe(1)[1], 5) # the deeper result stays in the first slot
+        self.assertEqual(tt.probe(2)[1], 2)
+        tt.store(3, 1, EXACT, 30, None)
+        self.assertIsNotNone(tt.probe(1))
+        self.assertIsNone(tt.probe(2)) # the second slot is always replaced
+        tt.new_search()
+        tt.store(4, 1, EXACT, 40, None)
+        self.assertIsNone(tt.probe(1)) # results of earlier searches go first
+        self.assertEqual(tt.probe(4)[3], 40)
+
+
+if __name__ == "__main__":
+    unittest.main()